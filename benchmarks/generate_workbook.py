@@ -0,0 +1,175 @@
+"""
+Synthetic bSDD workbooks for benchmarks.
+
+Writes workbooks in the layout of the Excel template: the seven sheets with
+their instruction rows and header row copied from a reference workbook, and
+generated rows below. The number of Classes, Properties, ClassProperties per
+Class, AllowedValues per Property and relations per Class and Property are
+set independently. Every origin code refers to an existing Class or
+Property, so the workbooks convert without errors.
+
+    python benchmarks/generate_workbook.py out.xlsx --classes 10000 --properties 2000
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from openpyxl import Workbook
+from bsddconverter.loader import open_workbook, HEADER_ROW, SHEETS
+
+REFERENCE_WORKBOOK = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data', 'test_excel_dd.xlsx')
+URI = "https://identifier.buildingsmart.org/uri/bench/bench/1.0"
+DATA_TYPES = ("String", "Real", "Integer", "Boolean")
+
+
+def _template_rows(reference):
+    """Sheet name -> the instruction rows and the header row of the reference workbook."""
+    workbook = open_workbook(reference)
+    try:
+        return {
+            sheet_name: [list(row) for row in workbook[sheet_name].iter_rows(max_row=HEADER_ROW, values_only=True)]
+            for key, sheet_name, usecols, text_columns in SHEETS
+        }
+    finally:
+        workbook.close()
+
+def _date(i):
+    return datetime(2024, 1, 1) + timedelta(days=i % 365)
+
+def _dictionary_rows():
+    yield {
+        'OrganizationCode': "bench", 'DictionaryCode': "bench", 'DictionaryName': "Benchmark",
+        'DictionaryVersion': "1.0", 'LanguageIsoCode': "en-US", 'LanguageOnly': False,
+        'UseOwnUri': False, 'ReleaseDate': datetime(2024, 1, 1), 'Status': "Preview",
+    }
+
+def _class_rows(classes):
+    for i in range(classes):
+        yield {
+            'Code': f"C{i}", 'Name': f"Class {i}", 'ClassType': "Class",
+            'Definition': f"Synthetic class number {i} of the benchmark dictionary.",
+            # Every tenth Class is the parent of the nine after it
+            'ParentClassCode': f"C{i - i % 10}" if i % 10 else None,
+            'RelatedIfcEntityNamesList': '["IfcBuildingElementProxy"]', 'CountriesOfUse': '["US"]',
+            'CountryOfOrigin': "US", 'CreatorLanguageIsoCode': "en-US", 'ActivationDateUtc': _date(i),
+            'RevisionNumber': 1, 'Status': "Active",
+        }
+
+def _property_rows(properties):
+    for i in range(properties):
+        data_type = DATA_TYPES[i % len(DATA_TYPES)]
+        yield {
+            'Code': f"P{i}", 'Name': f"Property {i}", 'DataType': data_type,
+            'Definition': f"Synthetic property number {i} of the benchmark dictionary.",
+            'Units': '["m"]' if data_type == "Real" else None, 'CountriesOfUse': '["US"]',
+            'CountryOfOrigin': "US", 'CreatorLanguageIsoCode': "en-US", 'ActivationDateUtc': _date(i),
+            'DimensionLength': 1 if data_type == "Real" else None, 'Status': "Active",
+        }
+
+def _class_property_rows(classes, properties, per_class):
+    for i in range(classes):
+        for k in range(per_class):
+            j = (i * per_class + k) % properties
+            yield {
+                '(Origin Class Code)': f"C{i}", 'Code': f"C{i}-P{j}", 'PropertyCode': f"P{j}",
+                'PropertySet': "Pset_Benchmark", 'IsRequired': k % 2 == 0, 'IsWritable': True,
+                'PropertyType': "Property", 'SortNumber': k + 1,
+            }
+
+def _class_relation_rows(classes, per_class):
+    for i in range(classes):
+        for k in range(per_class):
+            related = (i + k + 1) % classes
+            yield {
+                '(Origin Class Code)': f"C{i}", 'RelationType': "HasReference",
+                'RelatedClassUri': f"{URI}/class/C{related}", 'RelatedClassName': f"Class {related}",
+            }
+
+def _allowed_value_rows(properties, per_property):
+    for i in range(properties):
+        for k in range(per_property):
+            yield {
+                '(Origin Property Code)': f"P{i}", 'Value': f"Value {k}", 'Code': str(k),
+                'Description': f"Allowed value {k} of property {i}", 'SortNumber': k + 1,
+            }
+
+def _property_relation_rows(properties, per_property):
+    for i in range(properties):
+        for k in range(per_property):
+            related = (i + k + 1) % properties
+            yield {
+                '(Origin Property Code)': f"P{i}", 'RelatedPropertyName': f"P{related}",
+                'RelatedPropertyUri': f"{URI}/prop/P{related}", 'RelationType': "HasReference",
+            }
+
+def generate_workbook(path, classes=1000, properties=200, class_properties=5, allowed_values=3, class_relations=1, property_relations=1, reference=REFERENCE_WORKBOOK):
+    """
+    Writes a synthetic workbook based on the Excel template.
+
+    :param path: Path of the .xlsx file to write
+    :type path: str
+    :param classes: Number of Classes
+    :type classes: int
+    :param properties: Number of Properties
+    :type properties: int
+    :param class_properties: ClassProperties per Class
+    :type class_properties: int
+    :param allowed_values: AllowedValues per Property
+    :type allowed_values: int
+    :param class_relations: ClassRelations per Class
+    :type class_relations: int
+    :param property_relations: PropertyRelations per Property
+    :type property_relations: int
+    :param reference: Workbook to copy the sheet layout from
+    :type reference: str
+    :return: Number of generated rows per sheet key
+    :rtype: dict
+    """
+
+    if classes < 1 or properties < 1:
+        raise ValueError("A benchmark workbook needs at least one Class and one Property.")
+
+    rows = {
+        'dictionary': _dictionary_rows(),
+        'class': _class_rows(classes),
+        'property': _property_rows(properties),
+        'classproperty': _class_property_rows(classes, properties, class_properties),
+        'classrelation': _class_relation_rows(classes, class_relations),
+        'allowedvalue': _allowed_value_rows(properties, allowed_values),
+        'propertyrelation': _property_relation_rows(properties, property_relations),
+    }
+
+    template_rows = _template_rows(reference)
+    workbook = Workbook(write_only=True)
+    counts = {}
+    for key, sheet_name, usecols, text_columns in SHEETS:
+        worksheet = workbook.create_sheet(sheet_name)
+        header = template_rows[sheet_name][-1]
+        for row in template_rows[sheet_name]:
+            worksheet.append(row)
+        counts[key] = 0
+        for values in rows[key]:
+            worksheet.append([values.get(name) if name is not None else None for name in header])
+            counts[key] += 1
+    workbook.save(path)
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic workbook based on the bSDD Excel template.")
+    parser.add_argument("output", help="path of the .xlsx file to write")
+    parser.add_argument("--classes", type=int, default=1000)
+    parser.add_argument("--properties", type=int, default=200)
+    parser.add_argument("--class-properties", type=int, default=5, help="ClassProperties per Class")
+    parser.add_argument("--allowed-values", type=int, default=3, help="AllowedValues per Property")
+    parser.add_argument("--class-relations", type=int, default=1, help="ClassRelations per Class")
+    parser.add_argument("--property-relations", type=int, default=1, help="PropertyRelations per Property")
+    args = parser.parse_args(argv)
+
+    counts = generate_workbook(args.output, args.classes, args.properties, args.class_properties, args.allowed_values, args.class_relations, args.property_relations)
+    print(f"{args.output}: " + ", ".join(f"{count} {key}" for key, count in counts.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
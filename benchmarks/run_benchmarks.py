@@ -0,0 +1,208 @@
+"""
+Benchmark suite.
+
+Generates a synthetic workbook per scale (see generate_workbook.py) and times
+the stages of a conversion separately: load_excel, map_data per sheet, the
+linking done by excel2bsdd, clean_nones and serialization. The streaming
+conversion (convert_to_file) is timed as a whole as well. Every scale runs in
+fresh processes, so the peak RSS after each stage belongs to that scale only.
+
+Results are written as JSON, to compare releases:
+
+    python benchmarks/run_benchmarks.py --scales 1k 10k --output benchmark-results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+RESULTS_FORMAT = 1
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'templates', 'bsdd-import-model.json')
+
+# Workbook sizes, see generate_workbook.generate_workbook
+SCALES = {
+    "1k": {"classes": 1000, "properties": 200, "class_properties": 5, "allowed_values": 3, "class_relations": 1, "property_relations": 1},
+    "10k": {"classes": 10000, "properties": 2000, "class_properties": 5, "allowed_values": 3, "class_relations": 1, "property_relations": 1},
+    "100k": {"classes": 100000, "properties": 20000, "class_properties": 5, "allowed_values": 3, "class_relations": 1, "property_relations": 1},
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it is not available."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class _Stages:
+    """Collects the time and peak RSS of consecutive stages."""
+
+    def __init__(self):
+        self.results = {}
+
+    def run(self, name, function, *args, **kwargs):
+        start = time.perf_counter()
+        value = function(*args, **kwargs)
+        self.results[name] = {"seconds": round(time.perf_counter() - start, 4), "peak_rss_mb": peak_rss_mb()}
+        return value
+
+def measure_stages(excel_path, reader="openpyxl", serializer="auto"):
+    """
+    Runs the conversion stage by stage in this process.
+
+    :param excel_path: Workbook to convert
+    :type excel_path: str
+    :param reader: Excel reader, "openpyxl" or "pandas"
+    :type reader: str
+    :param serializer: JSON backend, see bsddconverter.writer
+    :type serializer: str
+    :return: Stage name -> seconds and peak RSS, and the rows per sheet
+    :rtype: dict
+    """
+
+    from bsddconverter.mapper import assemble_bsdd, clean_nones, load_excel, map_sheet
+    from bsddconverter.plans import load_template, SHEET_PARTS
+    from bsddconverter.writer import write_bsdd
+
+    stages = _Stages()
+    template = stages.run("load_template", load_template, TEMPLATE)
+    excel = stages.run("load_excel", load_excel, excel_path, reader)
+    mapped = {key: stages.run(f"map_data.{key}", map_sheet, excel[key], template, key) for key in SHEET_PARTS}
+    del excel
+    rows = {key: len(items) for key, items in mapped.items()}
+    result = stages.run("excel2bsdd.link", assemble_bsdd, mapped)
+    cleaned = stages.run("clean_nones", clean_nones, result)
+    del cleaned
+
+    with tempfile.TemporaryDirectory() as directory:
+        stages.run("serialize", write_bsdd, result, os.path.join(directory, "result.json"), serializer=serializer)
+    return {"stages": stages.results, "rows": rows}
+
+def measure_conversion(excel_path, reader="openpyxl", serializer="auto"):
+    """Times the streaming conversion of a workbook as a whole, without the sheet cache."""
+    from bsddconverter.mapper import convert_to_file
+    from bsddconverter.plans import load_template
+
+    stages = _Stages()
+    template = load_template(TEMPLATE)
+    with tempfile.TemporaryDirectory() as directory:
+        stages.run("convert_to_file", convert_to_file, excel_path, template, os.path.join(directory, "result.json"), reader=reader, serializer=serializer)
+    return {"stages": stages.results}
+
+def _measure_in_subprocess(mode, excel_path, reader, serializer):
+    command = [sys.executable, os.path.abspath(__file__), "--measure", mode, excel_path, "--reader", reader, "--serializer", serializer]
+    completed = subprocess.run(command, capture_output=True, text=True, check=False)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark of {excel_path} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.splitlines()[-1])
+
+def _versions():
+    versions = {}
+    for name in ("openpyxl", "pandas", "numpy", "orjson", "ujson"):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return versions
+
+def run_benchmarks(scales=("1k",), output_path="benchmark-results.json", reader="openpyxl", serializer="auto", workdir=None, custom=None):
+    """
+    Generates a workbook per scale, measures it and writes the results.
+
+    :param scales: Names from SCALES
+    :type scales: list
+    :param output_path: JSON file for the results
+    :type output_path: str
+    :param reader: Excel reader, "openpyxl" or "pandas"
+    :type reader: str
+    :param serializer: JSON backend, see bsddconverter.writer
+    :type serializer: str
+    :param workdir: Folder for the generated workbooks, a temporary folder by default
+    :type workdir: str
+    :param custom: Extra scale as keyword arguments of generate_workbook, named "custom"
+    :type custom: dict
+    :return: The results
+    :rtype: dict
+    """
+
+    from generate_workbook import generate_workbook
+    from bsddconverter.writer import resolve_serializer
+
+    sizes = [(name, SCALES[name]) for name in scales]
+    if custom:
+        sizes.append(("custom", custom))
+
+    results = {
+        "format": RESULTS_FORMAT,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "versions": _versions(),
+        "reader": reader,
+        "serializer": resolve_serializer(serializer),
+        "scales": [],
+    }
+
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = workdir or temporary
+        os.makedirs(directory, exist_ok=True)
+        for name, params in sizes:
+            excel_path = os.path.join(directory, f"bench-{name}.xlsx")
+            start = time.perf_counter()
+            generate_workbook(excel_path, **params)
+            generate_seconds = round(time.perf_counter() - start, 3)
+
+            measured = _measure_in_subprocess("stages", excel_path, reader, serializer)
+            measured["stages"].update(_measure_in_subprocess("conversion", excel_path, reader, serializer)["stages"])
+            results["scales"].append({
+                "name": name,
+                "params": params,
+                "workbook_bytes": os.path.getsize(excel_path),
+                "generate_seconds": generate_seconds,
+                "rows": measured["rows"],
+                "stages": measured["stages"],
+            })
+            print(f"{name}: " + ", ".join(f"{stage} {values['seconds']}s" for stage, values in measured["stages"].items()))
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bSDD converter on synthetic workbooks.")
+    parser.add_argument("--scales", nargs="*", default=["1k", "10k"], choices=sorted(SCALES), help="workbook sizes (default: 1k 10k)")
+    parser.add_argument("--classes", type=int, default=None, help="add a custom scale with this many Classes")
+    parser.add_argument("--properties", type=int, default=None, help="Properties of the custom scale (default: Classes / 5)")
+    parser.add_argument("--output", default="benchmark-results.json", help="results file")
+    parser.add_argument("--reader", choices=("openpyxl", "pandas"), default="openpyxl")
+    parser.add_argument("--serializer", choices=("auto", "orjson", "ujson", "json"), default="auto")
+    parser.add_argument("--workdir", default=None, help="keep the generated workbooks in this folder")
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "WORKBOOK"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        mode, excel_path = args.measure
+        measure = measure_stages if mode == "stages" else measure_conversion
+        print(json.dumps(measure(excel_path, args.reader, args.serializer)))
+        return 0
+
+    custom = None
+    if args.classes:
+        custom = dict(SCALES["1k"], classes=args.classes, properties=args.properties or max(args.classes // 5, 1))
+    run_benchmarks(args.scales, args.output, args.reader, args.serializer, args.workdir, custom)
+    print(f"Results saved to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+import sys
+from bsddconverter.cli import main
+
+sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Batch conversion of many workbooks with one parsed template and one shared
+worker pool. Every workbook is converted in its own task, so a broken
+workbook is reported in the summary without stopping the others.
+
+A worker process that dies, e.g. out of memory, breaks the whole pool and
+fails every task still in it. The unfinished workbooks are then converted
+again in a new pool. A workbook that was unfinished in BREAK_LIMIT broken
+pools is converted alone, so only the workbook that kills its worker is
+reported as failed.
+"""
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bsddconverter.diagnostics import Diagnostics
+from bsddconverter.mapper import convert_to_file, sheet_cache
+from bsddconverter.plans import load_template
+
+# Broken pools a workbook may be unfinished in before it is converted alone
+BREAK_LIMIT = 2
+
+
+def expand_workbooks(workbooks):
+    """
+    Expands file paths, glob patterns and directories into a list of excel files.
+
+    :param workbooks: Paths, glob patterns (e.g. "data/*.xlsx") or directories
+    :type workbooks: list
+    :return: Excel file paths in the given order, without duplicates
+    :rtype: list
+    """
+
+    if isinstance(workbooks, str):
+        workbooks = [workbooks]
+
+    excel_paths = []
+    for entry in workbooks:
+        if os.path.isdir(entry):
+            matches = sorted(glob.glob(os.path.join(entry, "*.xlsx")))
+        elif glob.has_magic(entry):
+            matches = sorted(glob.glob(entry, recursive=True))
+        else:
+            matches = [entry]
+        for path in matches:
+            # Skip the lock files Excel leaves next to open workbooks
+            if os.path.basename(path).startswith("~$"):
+                continue
+            if path not in excel_paths:
+                excel_paths.append(path)
+    return excel_paths
+
+def _output_paths(excel_paths, output_dir):
+    """Names every output after its workbook, numbering duplicate names."""
+    outputs = []
+    used = set()
+    for excel_path in excel_paths:
+        stem = os.path.splitext(os.path.basename(excel_path))[0]
+        name = stem
+        count = 1
+        while name in used:
+            count += 1
+            name = f"{stem}-{count}"
+        used.add(name)
+        outputs.append(os.path.join(output_dir, f"{name}.json"))
+    return outputs
+
+def _convert_one(excel_path, bsdd_template, output_path, remove_nulls, engine, reader, serializer, compact, cache=None):
+    # Runs in a worker process; never raises, failures end up in the report
+    report = {"excel_path": excel_path, "output_path": output_path}
+    start = time.perf_counter()
+    try:
+        row_counts = {}
+        diagnostics = Diagnostics()
+        convert_to_file(excel_path, bsdd_template, output_path, remove_nulls=remove_nulls, engine=engine, reader=reader, row_counts=row_counts, serializer=serializer, compact=compact, cache=cache, diagnostics=diagnostics)
+        report["status"] = "ok"
+        report["rows"] = row_counts
+        report["diagnostics"] = diagnostics.to_list()
+    except Exception as e:
+        report["status"] = "failed"
+        report["error"] = f"{type(e).__name__}: {e}"
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+def _failed(excel_path, output_path, error):
+    return {"excel_path": excel_path, "output_path": output_path, "status": "failed", "error": f"{type(error).__name__}: {error}", "seconds": None}
+
+def _convert_all(tasks, executor, new_executor, on_report):
+    """
+    Converts every (excel_path, output_path, args) task in the pool and
+    returns the reports in task order. Replaces the pool when a worker dies,
+    see the module docstring; new_executor makes a new pool, which is shut
+    down here. Calls on_report in task order as soon as it can.
+    """
+
+    reports = [None] * len(tasks)
+    breaks = [0] * len(tasks)
+    pending = list(range(len(tasks)))
+    alone = []
+    reported = 0
+    replacement = None
+    try:
+        while pending or alone:
+            # Workbooks that broke pools before are converted one at a time
+            current = pending if pending else [alone.pop(0)]
+            pending = []
+            futures = [executor.submit(_convert_one, *tasks[index][2]) for index in current]
+            broken = False
+            for index, future in zip(current, futures):
+                excel_path, output_path, args = tasks[index]
+                try:
+                    reports[index] = future.result()
+                except BrokenProcessPool as e:
+                    broken = True
+                    breaks[index] += 1
+                    if breaks[index] > BREAK_LIMIT:
+                        # Broke a pool on its own
+                        reports[index] = _failed(excel_path, output_path, e)
+                    elif breaks[index] >= BREAK_LIMIT:
+                        alone.append(index)
+                    else:
+                        pending.append(index)
+                except Exception as e:
+                    reports[index] = _failed(excel_path, output_path, e)
+                while reported < len(reports) and reports[reported] is not None:
+                    if on_report is not None:
+                        on_report(reports[reported])
+                    reported += 1
+            if broken:
+                # A worker died, e.g. out of memory: continue in a new pool
+                if replacement is not None:
+                    replacement.shutdown(wait=False)
+                executor = replacement = new_executor()
+    finally:
+        if replacement is not None:
+            replacement.shutdown()
+    return reports
+
+def run_batch(workbooks, template_path, output_dir, remove_nulls=False, workers=None, engine="columnar", reader="openpyxl", summary_path=None, executor=None, on_report=None, serializer="auto", compact=False, cache=True):
+    """
+    Converts many excel files with the same template, concurrently.
+
+    :param workbooks: Paths, glob patterns or directories of excel files
+    :type workbooks: list
+    :param template_path: Path to JSON template file, parsed once for all workbooks
+    :type template_path: str
+    :param output_dir: Folder for the output JSON files, named after the workbooks
+    :type output_dir: str
+    :param remove_nulls: Drop empty fields from the results
+    :type remove_nulls: bool
+    :param workers: Size of the worker pool, defaults to the number of CPUs
+    :type workers: int
+    :param engine: Mapping engine passed to map_data, "columnar" or "row"
+    :type engine: str
+    :param reader: Excel reader, "openpyxl" or "pandas"
+    :type reader: str
+    :param summary_path: Where to write the JSON summary, defaults to batch-summary.json in output_dir
+    :type summary_path: str
+    :param executor: Existing process pool to use instead of creating one; it is replaced by a new pool of the given size if a worker dies
+    :param on_report: Called with each per-file report, in workbook order
+    :type on_report: callable
+    :param serializer: JSON backend, see bsddconverter.writer
+    :type serializer: str
+    :param compact: Write the JSON without indentation
+    :type compact: bool
+    :param cache: Reuse parsed sheets from the on-disk cache, see mapper.run_excel2bsdd_conversion
+    :return: Summary with per-file status, timing and row counts
+    :rtype: dict
+    """
+
+    excel_paths = expand_workbooks(workbooks)
+    if not excel_paths:
+        raise FileNotFoundError(f"No excel files found in: {', '.join(workbooks) if not isinstance(workbooks, str) else workbooks}")
+    if not os.path.exists(template_path):
+        raise FileNotFoundError(f"Template file not found: {template_path}")
+
+    tpl = load_template(template_path)
+    cache = sheet_cache(cache)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_paths = _output_paths(excel_paths, output_dir)
+
+    start = time.perf_counter()
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    tasks = [
+        (excel_path, output_path, (excel_path, tpl, output_path, remove_nulls, engine, reader, serializer, compact, cache))
+        for excel_path, output_path in zip(excel_paths, output_paths)
+    ]
+    try:
+        reports = _convert_all(tasks, executor, lambda: ProcessPoolExecutor(max_workers=workers), on_report)
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    summary = {
+        "template_path": template_path,
+        "workers": workers or os.cpu_count(),
+        "seconds": round(time.perf_counter() - start, 3),
+        "converted": sum(1 for report in reports if report["status"] == "ok"),
+        "failed": sum(1 for report in reports if report["status"] != "ok"),
+        "files": reports,
+    }
+
+    if summary_path is None:
+        summary_path = os.path.join(output_dir, "batch-summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    return summary
@@ -0,0 +1,272 @@
+"""
+On-disk cache of parsed sheets.
+
+Parsing the workbook is the slowest stage of a conversion, and editors often
+convert the same workbook again after touching a single sheet. Parsed and
+normalised sheets are therefore pickled to a cache directory, keyed by what
+their values depend on inside the .xlsx (a zip of XML parts):
+
+* the XML part of the sheet itself,
+* the shared strings the sheet refers to (cells only hold their index),
+* styles.xml (number formats decide which numbers are dates) and the
+  workbook's 1904 date system flag,
+* the reader and the versions of the libraries and of this cache format.
+
+A sheet whose key is unchanged is loaded from the cache even if other sheets
+of the workbook changed. An index keyed by the hash of the whole file skips
+even the key computation for workbooks that did not change at all.
+
+Entries are evicted least recently used first once the directory grows over
+its size limit. Several processes, e.g. the workers of a batch, may share the
+directory: entries are written to temporary files that eviction leaves alone
+until they are stale. Set BSDD_CACHE_DIR to move the cache.
+"""
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+import time
+import zipfile
+from xml.etree import ElementTree
+from bsddconverter.loader import sheet_parts, SHEETS
+
+# Bump whenever the loaders produce different values for the same workbook
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Age after which a temporary file is left over from a crashed writer
+STALE_SECONDS = 3600
+
+_SHARED_STRING = re.compile(rb"<si\b[^>]*/>|<si\b[^>]*>.*?</si>", re.S)
+_SHARED_STRING_CELL = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
+
+
+def default_cache_dir():
+    """Cache folder: BSDD_CACHE_DIR, or bsddconverter in the user's cache folder."""
+    if os.environ.get("BSDD_CACHE_DIR"):
+        return os.environ["BSDD_CACHE_DIR"]
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "bsddconverter")
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _library_versions(reader):
+    import openpyxl
+    versions = [f"cache-{CACHE_VERSION}", reader, f"openpyxl-{openpyxl.__version__}"]
+    if reader == "pandas":
+        import pandas
+        versions.append(f"pandas-{pandas.__version__}")
+    return "|".join(versions).encode()
+
+def _read_part(archive, name):
+    try:
+        return archive.read(name)
+    except KeyError:
+        return b""
+
+def sheet_digests(EXCEL_PATH, reader):
+    """
+    Computes the cache key of every template sheet of a workbook.
+
+    :param EXCEL_PATH: Path to an .xlsx file
+    :type EXCEL_PATH: str
+    :param reader: "openpyxl" or "pandas"
+    :type reader: str
+    :return: Sheet key -> hex digest
+    :rtype: dict
+    """
+
+    with zipfile.ZipFile(EXCEL_PATH) as archive:
+        parts, date1904 = sheet_parts(archive)
+        shared = _read_part(archive, "xl/sharedStrings.xml")
+        common = hashlib.sha256(_library_versions(reader))
+        common.update(hashlib.sha256(_read_part(archive, "xl/styles.xml")).digest())
+        common.update(b"1904" if date1904 else b"1900")
+
+        strings = _SHARED_STRING.findall(shared)
+        # Only split the shared strings if every entry was recognised
+        split = shared.count(b"<si") == len(strings)
+        all_strings = hashlib.sha256(shared).digest()
+
+        digests = {}
+        for key, sheet_name, usecols, text_columns in SHEETS:
+            digest = common.copy()
+            digest.update(f"{sheet_name}|{usecols}|{','.join(text_columns)}".encode())
+            part = parts.get(sheet_name)
+            xml = _read_part(archive, part) if part else b""
+            digest.update(hashlib.sha256(xml).digest())
+
+            indices = sorted({int(index) for index in _SHARED_STRING_CELL.findall(xml)})
+            if split and xml.count(b't="s"') == len(_SHARED_STRING_CELL.findall(xml)) and all(index < len(strings) for index in indices):
+                for index in indices:
+                    digest.update(b"%d:" % index + strings[index])
+            else:
+                digest.update(all_strings)
+            digests[key] = digest.hexdigest()
+    return digests
+
+class SheetCache:
+    """
+    Directory of pickled sheets with least-recently-used eviction.
+
+    :ivar directory: Cache folder
+    :ivar max_bytes: Size limit of the folder
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _path(self, kind, digest):
+        return os.path.join(self.directory, kind, digest[:2], digest + ".pkl")
+
+    def _get(self, kind, digest):
+        path = self._path(kind, digest)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated or unreadable entry, parse again
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def _put(self, kind, digest, value):
+        path = self._path(kind, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except FileNotFoundError:
+            # Another process removed the temporary file, e.g. clear(); the entry is just not stored
+            self._remove(temporary)
+        except BaseException:
+            self._remove(temporary)
+            raise
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _digests(self, EXCEL_PATH, reader):
+        """Sheet keys of a workbook, looked up by the hash of the whole file first."""
+        book = hashlib.sha256(_file_digest(EXCEL_PATH).encode() + _library_versions(reader)).hexdigest()
+        digests = self._get("workbooks", book)
+        if digests is None:
+            digests = sheet_digests(EXCEL_PATH, reader)
+            self._put("workbooks", book, digests)
+        return digests
+
+    def iter_sheets(self, EXCEL_PATH, reader, read_sheets):
+        """
+        Yields the template sheets of a workbook, from the cache where possible.
+
+        :param EXCEL_PATH: Path to an .xlsx file
+        :type EXCEL_PATH: str
+        :param reader: "openpyxl" or "pandas"
+        :type reader: str
+        :param read_sheets: Called with a list of sheet keys, yields (key, sheet) for them in order
+        :type read_sheets: callable
+        :return: (key, sheet) pairs in SHEETS order
+        :rtype: generator
+        """
+
+        try:
+            digests = self._digests(EXCEL_PATH, reader)
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+            # Not a workbook this cache understands; the reader reports real errors
+            yield from read_sheets([key for key, sheet_name, usecols, text_columns in SHEETS])
+            return
+
+        cached = {key: self._get("sheets", digest) for key, digest in digests.items()}
+        # The workbook is only opened if a sheet is missing
+        missing = read_sheets([key for key, value in cached.items() if value is None])
+        written = False
+        for key, sheet_name, usecols, text_columns in SHEETS:
+            if cached[key] is not None:
+                yield key, cached[key]
+                continue
+            read_key, sheet = next(missing)
+            self._put("sheets", digests[read_key], sheet)
+            written = True
+            yield read_key, sheet
+        if written:
+            self.evict()
+
+    def load_sheet(self, EXCEL_PATH, reader, key, read_sheet):
+        """
+        Returns one template sheet of a workbook, from the cache where possible.
+
+        :param EXCEL_PATH: Path to an .xlsx file
+        :type EXCEL_PATH: str
+        :param reader: "openpyxl" or "pandas"
+        :type reader: str
+        :param key: Sheet key, e.g. "classproperty"
+        :type key: str
+        :param read_sheet: Called without arguments to parse the sheet on a miss
+        :type read_sheet: callable
+        """
+
+        try:
+            digest = self._digests(EXCEL_PATH, reader)[key]
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+            return read_sheet()
+
+        sheet = self._get("sheets", digest)
+        if sheet is None:
+            sheet = read_sheet()
+            self._put("sheets", digest, sheet)
+            self.evict()
+        return sheet
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the folder fits max_bytes.
+        Temporary files other processes may still be writing are skipped, and
+        removed once they are STALE_SECONDS old.
+        """
+
+        entries = []
+        stale = time.time() - STALE_SECONDS
+        for root, dirs, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith(".pkl"):
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                elif stat.st_mtime < stale:
+                    self._remove(path)
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """Removes every entry."""
+        for root, dirs, files in os.walk(self.directory):
+            for name in files:
+                self._remove(os.path.join(root, name))
@@ -0,0 +1,218 @@
+"""
+Command line interface. Without arguments the GUI is started, as before.
+
+    bsdd-converter convert data.xlsx template.json out/data.json
+    bsdd-converter batch "data/*.xlsx" --template template.json --output-dir out --workers 4
+    bsdd-converter convert data.xlsx template.json out/changes.json --delta-from out/data.json
+    bsdd-converter apply-delta out/data.json out/changes.json out/new.json
+    bsdd-converter convert data.xlsx template.json out/data.json --format shards --shard-bytes 50MB
+    bsdd-converter convert exported_tables/ template.json out/data.json
+    bsdd-converter validate data.xlsx
+    bsdd-converter export out/data.json data.xlsx --reference template.xlsx
+    bsdd-converter serve --workers 4 --template template.json
+    bsdd-converter submit data.xlsx template.json out/data.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+
+
+def _byte_size(text):
+    """Parses a size such as 5000000, 512K, 50MB or 1G."""
+    units = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    number = text.upper().rstrip("B")
+    unit = number[-1:] if number[-1:] in units else ""
+    try:
+        size = int(float(number[:len(number) - len(unit)]) * units[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: '{text}'")
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"invalid size: '{text}'")
+    return size
+
+def _add_conversion_options(parser):
+    parser.add_argument("--remove-nulls", action="store_true", help="drop empty fields from the output")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--engine", choices=("columnar", "row"), default="columnar", help="mapping engine")
+    parser.add_argument("--reader", choices=("openpyxl", "pandas", "csv", "parquet"), default="openpyxl", help="excel reader; a directory of sheet files is read as CSV or Parquet")
+    parser.add_argument("--serializer", choices=("auto", "orjson", "ujson", "json"), default="auto", help="JSON backend (auto: orjson if installed)")
+    parser.add_argument("--compact", action="store_true", help="write JSON without indentation")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="always parse the workbook, without the on-disk sheet cache")
+
+def build_parser():
+    """Builds the argument parser for the ``bsdd-converter`` command."""
+    parser = argparse.ArgumentParser(prog="bsdd-converter", description="Convert Excel bSDD templates to JSON.")
+    commands = parser.add_subparsers(dest="command")
+
+    convert = commands.add_parser("convert", help="convert a single excel file")
+    convert.add_argument("excel", help="excel file based on the bSDD template, or a directory of CSV or Parquet files, one per sheet")
+    convert.add_argument("template", help="JSON template file")
+    convert.add_argument("output", help="output JSON file")
+    convert.add_argument("--delta-from", default=None, metavar="PREVIOUS", help="write only the changes against an earlier output file")
+    convert.add_argument("--profile", action="store_true", help="print the time, CPU time, rows and memory peak of every stage")
+    convert.add_argument("--profile-output", default=None, metavar="PATH", help="save the stage measurements as JSON")
+    convert.add_argument("--cprofile", default=None, metavar="PATH", help="dump cProfile statistics of the mapping and writing stages")
+    convert.add_argument("--format", dest="output_format", choices=("json", "shards", "ndjson"), default="json", help="one JSON file, part files listed by OUTPUT, or NDJSON with a byte offset index")
+    convert.add_argument("--shard-size", type=int, default=None, metavar="N", help="most Classes and Properties per part (--format shards)")
+    convert.add_argument("--shard-bytes", type=_byte_size, default=None, metavar="SIZE", help="most bytes per part, e.g. 50MB (--format shards)")
+    _add_conversion_options(convert)
+
+    batch = commands.add_parser("batch", help="convert many excel files with one worker pool")
+    batch.add_argument("workbooks", nargs="+", help="excel files, glob patterns or directories")
+    batch.add_argument("--template", required=True, help="JSON template file")
+    batch.add_argument("--output-dir", required=True, help="folder for the output JSON files")
+    batch.add_argument("--summary", default=None, help="summary file (default: OUTPUT_DIR/batch-summary.json)")
+    _add_conversion_options(batch)
+
+    apply = commands.add_parser("apply-delta", help="rebuild the full JSON from an earlier output and a change set")
+    apply.add_argument("previous", help="earlier output JSON file")
+    apply.add_argument("delta", help="change set from convert --delta-from")
+    apply.add_argument("output", help="rebuilt JSON file")
+    apply.add_argument("--serializer", choices=("auto", "orjson", "ujson", "json"), default="auto", help="JSON backend (auto: orjson if installed)")
+    apply.add_argument("--compact", action="store_true", help="write JSON without indentation")
+
+    validate = commands.add_parser("validate", help="check the references between the sheets without converting")
+    validate.add_argument("excel", help="excel file based on the bSDD template")
+    validate.add_argument("--output", default=None, metavar="PATH", help="also save the problems as JSON")
+
+    export = commands.add_parser("export", help="write a bSDD JSON file back to the excel template")
+    export.add_argument("json", help="bSDD JSON file, e.g. an earlier output")
+    export.add_argument("excel", help="excel file to write")
+    export.add_argument("--reference", default=None, metavar="XLSX", help="copy the instruction rows and headers from this workbook, e.g. the empty template")
+
+    serve = commands.add_parser("serve", help="run a local conversion service with warm worker processes")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on (default: this machine only)")
+    serve.add_argument("--port", type=int, default=8765, help="port to listen on")
+    serve.add_argument("--workers", type=int, default=None, help="worker processes, i.e. jobs running at a time (default: number of CPUs)")
+    serve.add_argument("--max-queue", type=int, default=100, help="most jobs waiting to start")
+    serve.add_argument("--template", action="append", default=[], help="template to compile in every worker at start-up (repeatable)")
+    serve.add_argument("--token", default=os.environ.get("BSDD_SERVICE_TOKEN"), help="require this bearer token on every request (default: BSDD_SERVICE_TOKEN, or a new random token that is printed)")
+
+    submit = commands.add_parser("submit", help="convert through a running conversion service")
+    submit.add_argument("excel", help="excel file based on the bSDD template")
+    submit.add_argument("template", help="JSON template file")
+    submit.add_argument("output", help="output JSON file")
+    submit.add_argument("--server", default="http://127.0.0.1:8765", help="address of the service")
+    submit.add_argument("--token", default=os.environ.get("BSDD_SERVICE_TOKEN"), help="bearer token of the service (default: BSDD_SERVICE_TOKEN)")
+    submit.add_argument("--no-wait", dest="wait", action="store_false", help="print the job id instead of waiting for the result")
+    submit.add_argument("--remove-nulls", action="store_true", help="drop empty fields from the output")
+    submit.add_argument("--serializer", choices=("auto", "orjson", "ujson", "json"), default="auto", help="JSON backend (auto: orjson if installed)")
+    submit.add_argument("--compact", action="store_true", help="write JSON without indentation")
+
+    commands.add_parser("gui", help="start the graphical interface")
+    return parser
+
+def _print_report(report):
+    if report["status"] == "ok":
+        rows = sum(report["rows"].values())
+        warnings = sum(entry["count"] for entry in report["diagnostics"])
+        note = f", {warnings} warning{'s' if warnings != 1 else ''}" if report["diagnostics"] else ""
+        print(f"ok      {report['excel_path']} -> {report['output_path']} ({rows} rows{note}, {report['seconds']}s)")
+    else:
+        print(f"failed  {report['excel_path']}: {report['error']}", file=sys.stderr)
+
+def main(argv=None):
+    """Entry point of the ``bsdd-converter`` command. Returns the exit code."""
+    multiprocessing.freeze_support()
+    args = build_parser().parse_args(argv)
+    # Conversion warnings are logged as one summary per workbook
+    logging.basicConfig(format="%(message)s")
+
+    if args.command in (None, "gui"):
+        from bsddconverter import gui
+        gui.main()
+        return 0
+
+    if args.command == "convert":
+        from bsddconverter.instrument import Profile
+        from bsddconverter.mapper import run_excel2bsdd_conversion
+        profile = None
+        if args.profile or args.profile_output or args.cprofile:
+            profile = Profile(memory=bool(args.profile or args.profile_output), cprofile_path=args.cprofile)
+        try:
+            run_excel2bsdd_conversion(args.excel, args.template, args.output, remove_nulls=args.remove_nulls, engine=args.engine, reader=args.reader, workers=args.workers, serializer=args.serializer, compact=args.compact, cache=args.cache, previous_path=args.delta_from, observer=profile, output_format=args.output_format, shard_size=args.shard_size, shard_bytes=args.shard_bytes)
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"JSON file saved to: {args.output}")
+        if args.profile:
+            print(profile.report(), file=sys.stderr)
+        if args.profile_output:
+            profile.save(args.profile_output)
+        return 0
+
+    if args.command == "apply-delta":
+        from bsddconverter.delta import rebuild_bsdd
+        try:
+            rebuild_bsdd(args.previous, args.delta, args.output, serializer=args.serializer, compact=args.compact)
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"JSON file saved to: {args.output}")
+        return 0
+
+    if args.command == "validate":
+        from bsddconverter.validate import check_references, format_problems
+        try:
+            problems = check_references(args.excel)
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(format_problems(problems))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(problems, f, indent=2, ensure_ascii=False)
+        return 1 if problems else 0
+
+    if args.command == "export":
+        from bsddconverter.export import run_bsdd2excel_conversion
+        try:
+            run_bsdd2excel_conversion(args.json, args.excel, reference=args.reference)
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"Excel file saved to: {args.excel}")
+        return 0
+
+    if args.command == "serve":
+        from bsddconverter.service import serve
+        serve(args.host, args.port, workers=args.workers, max_queue=args.max_queue, template_paths=args.template, token=args.token)
+        return 0
+
+    if args.command == "submit":
+        from bsddconverter.service import submit_job, wait_for_job
+        try:
+            job = submit_job(args.excel, args.template, args.output, server=args.server, token=args.token, remove_nulls=args.remove_nulls, serializer=args.serializer, compact=args.compact)
+            if not args.wait:
+                print(job["id"])
+                return 0
+            job = wait_for_job(job["id"], server=args.server, token=args.token)
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        if job["status"] != "done":
+            print(f"Error: {job['error'] or job['status']}", file=sys.stderr)
+            return 1
+        if job["diagnostics"]:
+            from bsddconverter.diagnostics import Diagnostics
+            diagnostics = Diagnostics()
+            diagnostics.extend(job["diagnostics"])
+            print(diagnostics.summary(), file=sys.stderr)
+        print(f"JSON file saved to: {job['output_path']}")
+        return 0
+
+    from bsddconverter.batch import run_batch
+    try:
+        summary = run_batch(args.workbooks, args.template, args.output_dir, remove_nulls=args.remove_nulls, workers=args.workers, engine=args.engine, reader=args.reader, summary_path=args.summary, on_report=_print_report, serializer=args.serializer, compact=args.compact, cache=args.cache)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"{summary['converted']} converted, {summary['failed']} failed in {summary['seconds']}s")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
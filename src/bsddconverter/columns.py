@@ -0,0 +1,94 @@
+"""
+Compact column stores for mapped sheets.
+
+A converted column is mostly made of a few distinct values: empty cells,
+flags, units, the "None" of an empty Uid, the same PredefinedValue on
+thousands of ClassProperties. compact_column keeps one object per distinct
+value instead of one per cell:
+
+* equal strings are interned in a pool shared by the columns of a sheet;
+* lists of strings (or None) are stored as shared tuples and copied back
+  into a new list by SheetTable for every row it builds, so rows never
+  share a list;
+* a column holding the same value in every row becomes a RepeatedValue,
+  which stores the value once instead of a pointer per row.
+
+Nothing else changes: the rows, and so the JSON output, are the same.
+"""
+from itertools import repeat
+
+# List items kept in shared tuples. Numbers are left out, as equal numbers
+# of different spelling (1, 1.0, True) would be merged by the pool.
+_SHAREABLE_ITEMS = (str, type(None))
+
+
+class RepeatedValue:
+    """
+    Read-only sequence of one value repeated, standing in for a column list.
+
+    :ivar value: The value of every row
+    :ivar length: Number of rows
+    """
+
+    __slots__ = ("value", "length")
+
+    def __init__(self, value, length):
+        self.value = value
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return repeat(self.value, self.length)
+
+    def __getitem__(self, position):
+        if not -self.length <= position < self.length:
+            raise IndexError("list index out of range")
+        return self.value
+
+    def __reduce__(self):
+        return RepeatedValue, (self.value, self.length)
+
+def _shared_list(value, strings):
+    # Tuple of the list items, or None if the list holds other values
+    items = []
+    for item in value:
+        if type(item) not in _SHAREABLE_ITEMS:
+            return None
+        items.append(item if item is None else strings.setdefault(item, item))
+    key = tuple(items)
+    return strings.setdefault(key, key)
+
+def compact_column(values, strings):
+    """
+    Stores a converted column compactly, see the module docstring.
+
+    :param values: Converted values of the column
+    :type values: list
+    :param strings: Pool of the distinct strings and list tuples, shared between columns
+    :type strings: dict
+    :return: The column, and whether it holds shared list tuples
+    :rtype: tuple
+    """
+
+    has_lists = False
+    compacted = []
+    for value in values:
+        if type(value) is str:
+            value = strings.setdefault(value, value)
+        elif type(value) is list:
+            shared = _shared_list(value, strings)
+            if shared is not None:
+                value = shared
+                has_lists = True
+        compacted.append(value)
+    if compacted and all(value is compacted[0] for value in compacted):
+        return RepeatedValue(compacted[0], len(compacted)), has_lists
+    return compacted, has_lists
+
+def materialize(value):
+    """Row value of a column value: a new list for a shared list tuple."""
+    if type(value) is tuple:
+        return list(value)
+    return value
@@ -0,0 +1,200 @@
+"""
+Per-column value converters used by the columnar mapping engine.
+
+Every converter reproduces, for a single column, the chain of checks the
+row-by-row engine in ``mapper.map_data`` runs on each cell. The checks only
+depend on the column name, so they are resolved once per column instead of
+once per cell.
+"""
+import re
+import numpy as np
+import pandas as pd
+from ast import literal_eval
+from copy import deepcopy
+from functools import lru_cache
+
+INT_COLUMNS = ("RevisionNumber", "VersionNumber", "SortNumber")
+STR_COLUMNS = ("Uid", "Example", "Value", "PredefinedValue")
+LIST_COLUMNS = ("RelatedIfcEntityNamesList", "Units", "ReplacedObjectCodes", "ReplacingObjectCodes", "CountriesOfUse", "SubdivisionsOfUse")
+ORIGIN_COLUMNS = ("(Origin Class Code)", "(Origin Property Code)", "(Origin ClassProperty Code)")
+
+_Timestamp = pd._libs.tslibs.timestamps.Timestamp
+
+# Distinct list cells remembered by parse_list
+LIST_CACHE_SIZE = 4096
+
+# Elements of the lists the template uses: quoted text without escapes,
+# decimal numbers and True/False/None. Anything else goes to literal_eval.
+_ITEM = r"""'[^'\\\n\r]*'|"[^"\\\n\r]*"|[+-]?(?:\d+\.\d*|\.\d+|\d+(?=[eE]))(?:[eE][+-]?\d+)?|[+-]?(?:0+|[1-9]\d*)|True|False|None"""
+_SPACE = r"[ \t\n]*"
+_SIMPLE_LIST = re.compile(rf"\[{_SPACE}(?:(?:{_ITEM}){_SPACE}(?:,{_SPACE}(?:{_ITEM}){_SPACE})*,?{_SPACE})?\]")
+_TOKEN = re.compile(rf"""'([^'\\\n\r]*)'|"([^"\\\n\r]*)"|([+-]?(?:\d+\.\d*|\.\d+|\d+(?=[eE]))(?:[eE][+-]?\d+)?)|([+-]?\d+)|(True|False|None)""")
+_KEYWORDS = {"True": True, "False": False, "None": None}
+_IMMUTABLE = (str, int, float, bool, type(None))
+# Kinds of cached results
+_FLAT, _NESTED, _NOT_A_LIST = range(3)
+
+
+def is_int_column(column_name):
+    """Returns True for columns whose values are converted to integers."""
+    return column_name in INT_COLUMNS or (column_name[0:9] == "Dimension" and len(column_name) > 9)
+
+def _parse_simple_list(value):
+    """Parses a list of plain literals like literal_eval does, or returns None for other text."""
+    if not _SIMPLE_LIST.fullmatch(value):
+        return None
+    items = []
+    for single, double, number, integer, keyword in _TOKEN.findall(value):
+        if number:
+            items.append(float(number))
+        elif integer:
+            items.append(int(integer))
+        elif keyword:
+            items.append(_KEYWORDS[keyword])
+        else:
+            # The empty group is the other quote style
+            items.append(single or double)
+    return items
+
+@lru_cache(maxsize=LIST_CACHE_SIZE)
+def _parse_list_cached(value):
+    items = _parse_simple_list(value)
+    if items is not None:
+        return _FLAT, tuple(items)
+    content = literal_eval(value)
+    if not isinstance(content, list):
+        return _NOT_A_LIST, None
+    if all(isinstance(item, _IMMUTABLE) for item in content):
+        return _FLAT, tuple(content)
+    return _NESTED, content
+
+def parse_list(value):
+    """
+    Turns a '[...]' cell into a list. '[]' becomes None and anything that does
+    not evaluate to a list is returned unchanged. Gives the same result as
+    ast.literal_eval; simple lists are parsed without it and every distinct
+    text is parsed once. Each call returns a new list.
+    """
+
+    if value == "[]":
+        return None
+    kind, content = _parse_list_cached(value)
+    if kind == _FLAT:
+        return list(content)
+    if kind == _NESTED:
+        return deepcopy(content)
+    return value
+
+def _to_date(value):
+    return pd.to_datetime(value, origin='1899-12-30', unit='D').isoformat()
+
+def _is_serial(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value == value
+
+def convert_date_column(values, convert):
+    """
+    Converts a date column. The distinct Excel serials are converted in one
+    pd.to_datetime call and every distinct value is converted once; the
+    strings are identical to converting cell by cell with ``convert``.
+
+    :param values: Cell values of the column
+    :type values: list
+    :param convert: Converter of the column from column_converter
+    :type convert: callable
+    :rtype: list
+    """
+
+    results = {}
+    serials = list(dict.fromkeys(value for value in values if value and _is_serial(value)))
+    if serials:
+        try:
+            stamps = pd.to_datetime(np.array(serials, dtype="float64"), origin='1899-12-30', unit='D')
+        except (ValueError, OverflowError):
+            # Out of range somewhere: the cell by cell conversion raises at the right cell
+            stamps = ()
+        for value, stamp in zip(serials, stamps):
+            results[(value.__class__, value)] = stamp.isoformat()
+
+    converted = []
+    for value in values:
+        if not value:
+            converted.append(convert(value))
+            continue
+        # The type is part of the key, so that 1, 1.0 and True stay apart
+        key = (value.__class__, value)
+        result = results.get(key, results)
+        if result is results:
+            result = results[key] = convert(value)
+        converted.append(result)
+    return converted
+
+def column_converter(column_name):
+    """
+    Compiles the converter for one template column.
+
+    :param column_name: Name of a column that exists in the JSON template
+    :type column_name: str
+    :return: Function converting a single (already blank-normalised) cell value
+    :rtype: callable
+    """
+
+    if "Date" in column_name:
+        def typed(value):
+            if isinstance(value, _Timestamp):
+                return value.isoformat()
+            if value:
+                return _to_date(value)
+            return value
+    elif is_int_column(column_name):
+        def typed(value):
+            if isinstance(value, _Timestamp):
+                return value.isoformat()
+            if value is not None:
+                return int(value)
+            return value
+    elif column_name in STR_COLUMNS:
+        def typed(value):
+            if isinstance(value, _Timestamp):
+                return value.isoformat()
+            if not isinstance(value, str):
+                return str(value)
+            return value
+    else:
+        def typed(value):
+            if isinstance(value, _Timestamp):
+                return value.isoformat()
+            return value
+
+    if column_name in LIST_COLUMNS:
+        def convert(value):
+            value = typed(value)
+            if isinstance(value, str) and value.startswith("[") and value.endswith("]"):
+                value = parse_list(value)
+            if not isinstance(value, list):
+                value = [value]
+            return value
+    else:
+        def convert(value):
+            value = typed(value)
+            if isinstance(value, str) and value.startswith("[") and value.endswith("]"):
+                value = parse_list(value)
+            return value
+    return convert
+
+def convert_values(column_name, values, convert):
+    """
+    Applies a compiled converter to a whole column; date columns are
+    converted with convert_date_column.
+
+    :param column_name: Name of the column
+    :type column_name: str
+    :param values: Cell values of the column
+    :type values: list
+    :param convert: Converter of the column from column_converter
+    :type convert: callable
+    :rtype: list
+    """
+
+    if "Date" in column_name:
+        return convert_date_column(values, convert)
+    return [convert(value) for value in values]
@@ -0,0 +1,226 @@
+"""
+Change sets between two versions of a bSDD dictionary.
+
+Classes and Properties are matched by their Code, and so are the
+ClassProperties of a Class and the AllowedValues of a Property, so a change
+set lists what was added, changed or removed instead of a diff of the whole
+tree. A change set looks like::
+
+    {
+      "DeltaFormat": 1,
+      "Dictionary": {"Fields": {"DictionaryVersion": "1.1"}},
+      "Classes": {
+        "Added": [{...complete Class...}],
+        "Changed": [{"Code": "C1", "Fields": {"Name": "New name"},
+                     "ClassProperties": {"Removed": ["P2"]}}],
+        "Removed": ["C3"]
+      }
+    }
+
+``Fields`` holds new values of changed fields, ``RemovedFields`` the fields
+that disappeared. ``Order`` lists all Codes when the order of a list changed
+in another way than by appending, and ``Keys`` the field order of an object
+when it changed. A list whose items cannot be told apart by Code (missing
+or duplicate Codes) is stored completely as ``Replace``. Applying the change
+set to the previous document gives the new document, with the same order of
+items and fields.
+"""
+import json
+import os
+from bsddconverter.writer import write_document
+
+DELTA_FORMAT = 1
+
+# Lists of items matched by Code, with the lists matched by Code inside them
+CODE_LISTS = {
+    'Classes': {'ClassProperties': {}},
+    'Properties': {'AllowedValues': {}},
+}
+
+
+def _index_codes(items):
+    """Code -> item, or None if the Codes do not identify the items."""
+    index = {}
+    for item in items:
+        code = item.get('Code') if isinstance(item, dict) else None
+        if code is None or code in index:
+            return None
+        index[code] = item
+    return index
+
+def _diff_fields(old, new, lists):
+    """Changes between two objects, see the module docstring; empty if they are equal."""
+    change = {}
+    fields = {}
+    for key, value in new.items():
+        if key in lists and isinstance(value, list) and isinstance(old.get(key), list):
+            items = _diff_items(old[key], value, lists[key])
+            if items:
+                change[key] = items
+        elif key not in old or old[key] != value:
+            fields[key] = value
+    removed = [key for key in old if key not in new]
+    if fields:
+        change['Fields'] = fields
+    if removed:
+        change['RemovedFields'] = removed
+
+    kept = [key for key in old if key in new]
+    if kept + [key for key in new if key not in old] != list(new):
+        change['Keys'] = list(new)
+    return change
+
+def _diff_items(old_items, new_items, lists):
+    """Changes between two lists of items with a Code; empty if they are equal."""
+    old_index, new_index = _index_codes(old_items), _index_codes(new_items)
+    if old_index is None or new_index is None:
+        return {} if old_items == new_items else {'Replace': new_items}
+
+    added, changed = [], []
+    for code, item in new_index.items():
+        if code not in old_index:
+            added.append(item)
+            continue
+        change = _diff_fields(old_index[code], item, lists)
+        if change:
+            changed.append(dict({'Code': code}, **change))
+    removed = [code for code in old_index if code not in new_index]
+
+    items = {}
+    if added:
+        items['Added'] = added
+    if changed:
+        items['Changed'] = changed
+    if removed:
+        items['Removed'] = removed
+    expected = [code for code in old_index if code in new_index] + [item['Code'] for item in added]
+    if expected != list(new_index):
+        items['Order'] = list(new_index)
+    return items
+
+def diff_bsdd(previous, current):
+    """
+    Computes the change set that turns one bSDD dictionary into another.
+
+    :param previous: Earlier bSDD JSON structure
+    :type previous: dict
+    :param current: New bSDD JSON structure
+    :type current: dict
+    :return: Change set, see the module docstring
+    :rtype: dict
+    """
+
+    change = _diff_fields(previous, current, CODE_LISTS)
+    delta = {'DeltaFormat': DELTA_FORMAT}
+    header = {key: change.pop(key) for key in ('Fields', 'RemovedFields', 'Keys') if key in change}
+    if header:
+        delta['Dictionary'] = header
+    delta.update(change)
+    return delta
+
+def _apply_fields(old, change, lists):
+    new = {key: value for key, value in old.items() if key not in change.get('RemovedFields', ())}
+    for key in lists:
+        if key in change:
+            new[key] = _apply_items(new.get(key, []), change[key], lists[key])
+    new.update(change.get('Fields', {}))
+    if 'Keys' in change:
+        new = {key: new[key] for key in change['Keys']}
+    return new
+
+def _apply_items(old_items, change, lists):
+    if 'Replace' in change:
+        return change['Replace']
+    index = _index_codes(old_items)
+    if index is None:
+        raise ValueError("Change set does not match the previous document: items without unique Codes.")
+
+    for code in change.get('Removed', ()):
+        index.pop(code, None)
+    for item_change in change.get('Changed', ()):
+        code = item_change['Code']
+        if code not in index:
+            raise ValueError(f"Change set does not match the previous document: no item with Code '{code}'.")
+        index[code] = _apply_fields(index[code], {key: value for key, value in item_change.items() if key != 'Code'}, lists)
+    for item in change.get('Added', ()):
+        index[item['Code']] = item
+
+    if 'Order' in change:
+        return [index[code] for code in change['Order']]
+    return list(index.values())
+
+def apply_delta(previous, delta):
+    """
+    Rebuilds a bSDD dictionary from an earlier version and a change set.
+
+    :param previous: Earlier bSDD JSON structure, left unchanged
+    :type previous: dict
+    :param delta: Change set from diff_bsdd
+    :type delta: dict
+    :return: The new bSDD JSON structure
+    :rtype: dict
+    """
+
+    if delta.get('DeltaFormat') != DELTA_FORMAT:
+        raise ValueError(f"Unsupported change set format: {delta.get('DeltaFormat')}")
+    change = dict(delta.get('Dictionary', {}))
+    change.update((key, value) for key, value in delta.items() if key in CODE_LISTS)
+    return _apply_fields(previous, change, CODE_LISTS)
+
+def load_json(path):
+    """Reads a JSON file, with orjson when it is installed."""
+    with open(path, "rb") as f:
+        content = f.read()
+    try:
+        import orjson
+    except ImportError:
+        return json.loads(content.decode("utf-8"))
+    return orjson.loads(content)
+
+def write_delta(previous_path, current, delta_path, serializer="auto", compact=False):
+    """
+    Writes the change set from a previous output file to a new bSDD dictionary.
+
+    :param previous_path: Path to the previous output JSON file
+    :type previous_path: str
+    :param current: New bSDD JSON structure
+    :type current: dict
+    :param delta_path: Path to the change set JSON file
+    :type delta_path: str
+    :param serializer: JSON backend, see bsddconverter.writer
+    :type serializer: str
+    :param compact: Write the JSON without indentation
+    :type compact: bool
+    :return: The change set
+    :rtype: dict
+    """
+
+    delta = diff_bsdd(load_json(previous_path), current)
+    _make_parent_dir(delta_path)
+    write_document(delta.items(), delta_path, serializer=serializer, compact=compact)
+    return delta
+
+def rebuild_bsdd(previous_path, delta_path, output_path, serializer="auto", compact=False):
+    """
+    Writes the full bSDD JSON file from a previous output file and a change set.
+
+    :param previous_path: Path to the previous output JSON file
+    :type previous_path: str
+    :param delta_path: Path to the change set JSON file
+    :type delta_path: str
+    :param output_path: Path to the rebuilt JSON file
+    :type output_path: str
+    :param serializer: JSON backend, see bsddconverter.writer
+    :type serializer: str
+    :param compact: Write the JSON without indentation
+    :type compact: bool
+    """
+
+    result = apply_delta(load_json(previous_path), load_json(delta_path))
+    _make_parent_dir(output_path)
+    write_document([(key, iter(value) if isinstance(value, list) else value) for key, value in result.items()], output_path, serializer=serializer, compact=compact)
+
+def _make_parent_dir(output_path):
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
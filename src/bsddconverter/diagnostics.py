@@ -0,0 +1,129 @@
+"""
+Conversion diagnostics.
+
+Problems that do not stop a conversion, such as a column the JSON template
+has no field for, are collected instead of printed cell by cell. Every kind
+of problem in a sheet and column is one entry, counted over all its rows,
+with the numbers of the first few rows::
+
+    {"severity": "warning", "code": "unknown-column", "sheet": "Class",
+     "column": "Comment", "message": "No such property as 'Comment' in the
+     JSON template! It will NOT be added to the JSON file.", "count": 1200,
+     "rows": [8, 9, 10, 11, 12, 13, 14, 15, 16, 17]}
+
+Rows are numbered as in the workbook: the header is row 7, so the first
+data row is row 8.
+"""
+
+# In the order entries are listed
+SEVERITIES = ("error", "warning", "info")
+
+# Row numbers kept per entry
+MAX_ROWS = 10
+
+
+def _occurrences(entry):
+    # "120 cells in rows 8, 9, ..." or "2 rows: 12, 15"
+    count = entry["count"]
+    text = f"{count} {'cell' if entry['column'] else 'row'}{'s' if count != 1 else ''}"
+    if entry["rows"]:
+        rows = ", ".join(str(row) for row in entry["rows"]) + (", ..." if count > len(entry["rows"]) else "")
+        text += f" in row{'s' if len(entry['rows']) > 1 else ''} {rows}" if entry["column"] else f": {rows}"
+    return text
+
+class Diagnostics:
+    """
+    Diagnostics of one conversion, aggregated by code, sheet and column.
+
+    :ivar max_rows: Row numbers kept per entry
+    """
+
+    def __init__(self, max_rows=MAX_ROWS):
+        self.max_rows = max_rows
+        self._entries = {}
+
+    def add(self, code, message, sheet=None, column=None, rows=(), count=None, severity="warning"):
+        """
+        Records a problem, or more occurrences of one already recorded.
+
+        :param code: Kind of problem, e.g. "unknown-column"
+        :type code: str
+        :param message: Description for people
+        :type message: str
+        :param sheet: Name of the sheet, e.g. "ClassProperty"
+        :type sheet: str
+        :param column: Name of the column
+        :type column: str
+        :param rows: Row numbers of the occurrences; only the first max_rows are kept
+        :type rows: iterable
+        :param count: Number of occurrences, defaults to the number of rows
+        :type count: int
+        :param severity: "error", "warning" or "info"
+        :type severity: str
+        """
+
+        if severity not in SEVERITIES:
+            raise ValueError(f"Unknown severity: '{severity}'. Use one of {', '.join(SEVERITIES)}.")
+        entry = self._entries.get((code, sheet, column))
+        if entry is None:
+            entry = self._entries[(code, sheet, column)] = {
+                "severity": severity, "code": code, "sheet": sheet, "column": column,
+                "message": message, "count": 0, "rows": [],
+            }
+        rows = list(rows)
+        entry["count"] += len(rows) if count is None else count
+        entry["rows"].extend(rows[:self.max_rows - len(entry["rows"])])
+
+    def extend(self, entries):
+        """
+        Adds the entries of another Diagnostics, e.g. sent back by a worker process.
+
+        :param entries: Entries as returned by to_list
+        :type entries: iterable
+        """
+
+        for entry in entries:
+            self.add(entry["code"], entry["message"], entry["sheet"], entry["column"], entry["rows"], entry["count"], entry["severity"])
+
+    def to_list(self):
+        """
+        The entries, most severe first and otherwise in the order found.
+
+        :rtype: list
+        """
+
+        entries = sorted(self._entries.values(), key=lambda entry: SEVERITIES.index(entry["severity"]))
+        return [dict(entry, rows=list(entry["rows"])) for entry in entries]
+
+    def count(self, severity=None):
+        """Number of occurrences, of one severity or of all."""
+        return sum(entry["count"] for entry in self._entries.values() if severity in (None, entry["severity"]))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def summary(self, limit=None):
+        """
+        Readable summary: one line per entry, at most limit lines.
+
+        :param limit: Most entries listed, defaults to all
+        :type limit: int
+        :rtype: str
+        """
+
+        entries = self.to_list()
+        if not entries:
+            return "No warnings."
+        lines = []
+        for entry in entries[:limit]:
+            place = ", ".join(part for part in (entry["sheet"], entry["column"] and f"column '{entry['column']}'") if part)
+            line = f"{entry['severity'].upper()}: {place + ': ' if place else ''}{entry['message']}"
+            if entry["count"]:
+                line += f" ({_occurrences(entry)})"
+            lines.append(line)
+        if limit is not None and len(entries) > limit:
+            lines.append(f"... and {len(entries) - limit} more")
+        return "\n".join(lines)
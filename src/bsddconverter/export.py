@@ -0,0 +1,237 @@
+"""
+bSDD JSON back to the Excel template.
+
+Flattens a bSDD dictionary into the seven template sheets, so a published
+dictionary can be edited in Excel and converted again: Classes and
+Properties get a row each, and their ClassProperties, ClassRelations,
+AllowedValues and PropertyRelations a row in their own sheet with the
+``(Origin ... Code)`` column pointing at the parent. Rows are streamed into
+an openpyxl write-only workbook, so the workbook is never held in memory.
+
+The sheets are laid out like the template: row 7 holds the header, from
+column C on, and the rows above it are left empty unless a reference
+workbook (e.g. the empty template) is given to copy them from.
+
+Cells are written so that converting the workbook gives the dictionary back:
+
+* lists become cells such as ``['IfcWall', 'IfcSlab']``; lists with only
+  None, which blank list cells are converted to, become blank cells;
+* dates become date cells;
+* an AllowedValue of a ClassProperty is written once per ClassProperty
+  code with ``(Origin ClassProperty Code)``, as the converter attaches it to
+  the ClassProperties with that code in every Class.
+"""
+import json
+import os
+from datetime import datetime, timezone
+from itertools import chain
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from bsddconverter.loader import open_workbook, HEADER_ROW, SHEETS
+
+# Header of every sheet, from column C on, as in the Excel template
+SHEET_COLUMNS = {
+    'dictionary': (
+        'OrganizationCode', 'DictionaryCode', 'DictionaryName', 'DictionaryVersion', 'LanguageIsoCode',
+        'LanguageOnly', 'UseOwnUri', 'DictionaryUri', 'License', 'LicenseUrl', 'ChangeRequestEmailAddress',
+        'MoreInfoUrl', 'QualityAssuranceProcedure', 'QualityAssuranceProcedureUrl', 'ReleaseDate', 'Status',
+    ),
+    'class': (
+        'Code', 'Name', 'ClassType', 'Definition', 'Description', 'ParentClassCode', 'RelatedIfcEntityNamesList',
+        'Synonyms', 'ActivationDateUtc', 'ReferenceCode', 'CountriesOfUse', 'CountryOfOrigin',
+        'CreatorLanguageIsoCode', 'DeActivationDateUtc', 'DeprecationExplanation', 'DocumentReference', 'OwnedUri',
+        'ReplacedObjectCodes', 'ReplacingObjectCodes', 'RevisionDateUtc', 'RevisionNumber', 'Status',
+        'SubdivisionsOfUse', 'Uid', 'VersionDateUtc', 'VersionNumber', 'VisualRepresentationUri',
+    ),
+    'property': (
+        'Code', 'Name', 'Definition', 'Description', 'DataType', 'Units', 'Example', 'ActivationDateUtc',
+        'ConnectedPropertyCodes', 'CountriesOfUse', 'CountryOfOrigin', 'CreatorLanguageIsoCode',
+        'DeActivationDateUtc', 'DeprecationExplanation', 'Dimension', 'DimensionLength', 'DimensionMass',
+        'DimensionTime', 'DimensionElectricCurrent', 'DimensionThermodynamicTemperature',
+        'DimensionAmountOfSubstance', 'DimensionLuminousIntensity', 'DocumentReference',
+        'DynamicParameterPropertyCodes', 'IsDynamic', 'MaxExclusive', 'MaxInclusive', 'MinExclusive',
+        'MinInclusive', 'MethodOfMeasurement', 'OwnedUri', 'Pattern', 'PhysicalQuantity', 'PropertyValueKind',
+        'ReplacedObjectCodes', 'ReplacingObjectCodes', 'RevisionDateUtc', 'RevisionNumber', 'Status',
+        'SubdivisionsOfUse', 'TextFormat', 'Uid', 'VersionDateUtc', 'VersionNumber', 'VisualRepresentationUri',
+    ),
+    'classproperty': (
+        '(Origin Class Code)', 'Code', 'PropertyCode', 'PropertyUri', 'Description', 'PropertySet', 'Unit',
+        'PredefinedValue', 'IsRequired', 'IsWritable', 'MaxExclusive', 'MaxInclusive', 'MinExclusive',
+        'MinInclusive', 'Pattern', 'OwnedUri', 'PropertyType', 'SortNumber', 'Symbol',
+    ),
+    'classrelation': ('(Origin Class Code)', 'RelationType', 'RelatedClassUri', 'RelatedClassName', 'Fraction', 'OwnedUri'),
+    'allowedvalue': (
+        '(Origin Property Code)', '(Origin ClassProperty Code)', 'Value', 'Code', 'Description', 'Uri',
+        'SortNumber', 'OwnedUri',
+    ),
+    'propertyrelation': ('(Origin Property Code)', 'RelatedPropertyName', 'RelatedPropertyUri', 'RelationType', 'OwnedUri'),
+}
+
+SHEET_NAMES = {key: sheet_name for key, sheet_name, usecols, text_columns in SHEETS}
+
+
+def _with_origin(items, key, origin_column):
+    for item in items:
+        for child in item.get(key) or ():
+            yield {origin_column: item.get('Code'), **child}
+
+def _class_property_values(classes):
+    # Once per ClassProperty code: the converter attaches them to all ClassProperties with the code
+    seen = set()
+    for cls in classes:
+        for cls_prop in cls.get('ClassProperties') or ():
+            code = cls_prop.get('Code')
+            if code in seen:
+                continue
+            seen.add(code)
+            for allowed_value in cls_prop.get('AllowedValues') or ():
+                yield {'(Origin ClassProperty Code)': code, **allowed_value}
+
+def iter_sheet_rows(bsdd_data):
+    """
+    Flattens a bSDD dictionary into the rows of the template sheets.
+
+    :param bsdd_data: bSDD dictionary, as written by run_excel2bsdd_conversion
+    :type bsdd_data: dict
+    :return: (key, rows) per sheet in SHEETS order; rows is a generator of dicts keyed by column
+    :rtype: generator
+    """
+
+    classes = bsdd_data.get('Classes') or []
+    properties = bsdd_data.get('Properties') or []
+    allowed_values = _with_origin(properties, 'AllowedValues', '(Origin Property Code)')
+    rows = {
+        'dictionary': iter([bsdd_data]),
+        'class': iter(classes),
+        'property': iter(properties),
+        'classproperty': _with_origin(classes, 'ClassProperties', '(Origin Class Code)'),
+        'classrelation': _with_origin(classes, 'ClassRelations', '(Origin Class Code)'),
+        'allowedvalue': chain(allowed_values, _class_property_values(classes)),
+        'propertyrelation': _with_origin(properties, 'PropertyRelations', '(Origin Property Code)'),
+    }
+    for key, sheet_name, usecols, text_columns in SHEETS:
+        yield key, rows[key]
+
+def _date_cell(value):
+    try:
+        date = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+def cell_value(column_name, value):
+    """
+    Value of a template cell for a JSON value, see the module docstring.
+
+    :param column_name: Name of the column
+    :type column_name: str
+    :param value: JSON value of the field
+    :return: Value to write to the cell
+    """
+
+    if isinstance(value, list):
+        if all(item is None for item in value):
+            return None
+        return repr(value)
+    if isinstance(value, dict):
+        return repr(value)
+    if isinstance(value, str):
+        if "Date" in column_name and value:
+            return _date_cell(value)
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+def _cell(worksheet, value):
+    if isinstance(value, str) and value.startswith("="):
+        # Text, not a formula
+        cell = WriteOnlyCell(worksheet, value)
+        cell.data_type = "s"
+        return cell
+    return value
+
+def _layout_rows(reference):
+    """Sheet name -> the rows above the header and the header of the reference workbook."""
+    if reference is None:
+        return {
+            sheet_name: ([[]] * (HEADER_ROW - 1), [None, None, *SHEET_COLUMNS[key]])
+            for key, sheet_name, usecols, text_columns in SHEETS
+        }
+    workbook = open_workbook(reference)
+    try:
+        layout = {}
+        for key, sheet_name, usecols, text_columns in SHEETS:
+            rows = [list(row) for row in workbook[sheet_name].iter_rows(max_row=HEADER_ROW, values_only=True)]
+            rows += [[]] * (HEADER_ROW - len(rows))
+            layout[sheet_name] = (rows[:-1], rows[-1])
+        return layout
+    finally:
+        workbook.close()
+
+def write_excel(bsdd_data, excel_path, reference=None):
+    """
+    Writes a bSDD dictionary as a workbook in the layout of the Excel template.
+
+    :param bsdd_data: bSDD dictionary
+    :type bsdd_data: dict
+    :param excel_path: Path of the .xlsx file to write
+    :type excel_path: str
+    :param reference: Workbook to copy the instruction rows and header from, e.g. the empty template
+    :type reference: str
+    :return: Number of rows written per sheet key
+    :rtype: dict
+    """
+
+    layout = _layout_rows(reference)
+    workbook = Workbook(write_only=True)
+    counts = {}
+    for key, rows in iter_sheet_rows(bsdd_data):
+        sheet_name = SHEET_NAMES[key]
+        above, header = layout[sheet_name]
+        worksheet = workbook.create_sheet(sheet_name)
+        for row in above:
+            worksheet.append(row)
+        worksheet.append(header)
+        counts[key] = 0
+        for item in rows:
+            worksheet.append([
+                None if name is None else _cell(worksheet, cell_value(name, item.get(name)))
+                for name in header
+            ])
+            counts[key] += 1
+
+    output_dir = os.path.dirname(excel_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    part = excel_path + ".part"
+    try:
+        workbook.save(part)
+        os.replace(part, excel_path)
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+    return counts
+
+def run_bsdd2excel_conversion(json_path, excel_path, reference=None):
+    """
+    Converts a bSDD JSON file back to a workbook, see write_excel.
+
+    :param json_path: Path to a bSDD JSON file
+    :type json_path: str
+    :param excel_path: Path of the .xlsx file to write
+    :type excel_path: str
+    :param reference: Workbook to copy the instruction rows and header from
+    :type reference: str
+    :return: Number of rows written per sheet key
+    :rtype: dict
+    """
+
+    if not os.path.exists(json_path):
+        raise FileNotFoundError(f"JSON file not found: {json_path}")
+    if reference is not None and not os.path.exists(reference):
+        raise FileNotFoundError(f"Reference workbook not found: {reference}")
+    with open(json_path, encoding="utf-8") as f:
+        bsdd_data = json.load(f)
+    return write_excel(bsdd_data, excel_path, reference)
@@ -1,11 +1,21 @@
 import os
+import queue
 import sys
-from tkinter import Tk, Frame, Label, Entry, Button, Checkbutton, BooleanVar, END, filedialog, messagebox
-from bsddconverter.mapper import run_excel2bsdd_conversion
+import threading
+import time
+from tkinter import Tk, Frame, Label, Entry, Button, Checkbutton, BooleanVar, END, DISABLED, NORMAL, filedialog, messagebox, ttk
 
 HERE = os.path.dirname(__file__)
 PROJECT_ROOT = os.path.abspath(os.path.join(HERE, os.pardir, os.pardir))
 
+# How often the Tk loop looks at the worker's progress events, in milliseconds
+POLL_MS = 100
+# Part of the progress bar used by reading and mapping the sheets; writing the
+# Classes and Properties fills the rest
+SHEETS_SHARE = 0.7
+# Warnings listed in the message box after a conversion
+WARNINGS_SHOWN = 8
+
 def select_file(entry):
     """
     Opens a file dialog and returns the selected file path for the Excel file.
@@ -33,9 +43,11 @@ def select_output_file(entry):
         entry.delete(0, END)
         entry.insert(0, filename)
 
-def run_converter(excel_entry, template_entry, output_path_entry, nulls_var):
+def run_converter(excel_entry, template_entry, output_path_entry, nulls_var, ui):
     """
-    Runs the conversion process when the Run Converter button is clicked.
+    Runs the conversion process when the Run Converter button is clicked. The
+    conversion runs in a background thread; the Tk loop polls its progress
+    events, so the window stays responsive.
     """
     excel_path = excel_entry.get().strip()
     template_path = template_entry.get().strip()
@@ -52,17 +64,118 @@ def run_converter(excel_entry, template_entry, output_path_entry, nulls_var):
         messagebox.showerror("Missing Info", "Please provide an output path.")
         return
 
+    events = queue.Queue()
+    ui["cancel"] = threading.Event()
+    ui["started"] = time.monotonic()
+    ui["fraction"] = 0.0
+    ui["stage"] = "Reading sheets"
+    _set_running(ui, True)
+    worker = threading.Thread(
+        target=convert_in_background,
+        args=(excel_path, template_path, output_path, without_nulls, events, ui["cancel"]),
+        daemon=True,
+    )
+    worker.start()
+    ui["app"].after(POLL_MS, poll_events, ui, events, output_path)
+
+def convert_in_background(excel_path, template_path, output_path, remove_nulls, events, cancel):
+    """
+    Worker thread: runs the conversion and puts its progress and outcome on
+    the events queue. Tk widgets are never touched from here.
+    """
+
+    # Imported here: pandas and NumPy are only needed once a conversion starts
+    from bsddconverter.mapper import run_excel2bsdd_conversion, ConversionCancelled
+
+    def progress(stage, done, total):
+        events.put(("progress", stage, done, total))
+
     try:
-        run_excel2bsdd_conversion(excel_path, template_path, output_path, remove_nulls=without_nulls)
-        messagebox.showinfo("Success", f"JSON file saved to:\n{output_path}")
+        diagnostics = run_excel2bsdd_conversion(excel_path, template_path, output_path, remove_nulls=remove_nulls, progress=progress, cancel=cancel)
+    except ConversionCancelled:
+        events.put(("cancelled",))
     except Exception as e:
-        messagebox.showerror("Error", str(e))
+        events.put(("error", str(e)))
+    else:
+        events.put(("done", diagnostics.count(), diagnostics.summary(limit=WARNINGS_SHOWN) if len(diagnostics) else None))
+
+def cancel_converter(ui):
+    """Asks the running conversion to stop after the current sheet or row batch."""
+    if ui.get("cancel") is not None:
+        ui["cancel"].set()
+        ui["status"].config(text="Cancelling...")
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+def _show_progress(ui):
+    elapsed = time.monotonic() - ui["started"]
+    text = f"{ui['stage']} - elapsed {_format_seconds(elapsed)}"
+    if ui["fraction"] > 0.02:
+        remaining = elapsed * (1 - ui["fraction"]) / ui["fraction"]
+        text += f", about {_format_seconds(remaining)} left"
+    ui["progressbar"]["value"] = ui["fraction"] * 100
+    if not ui["cancel"].is_set():
+        ui["status"].config(text=text)
+
+def _set_running(ui, running):
+    ui["run_button"].config(state=DISABLED if running else NORMAL)
+    ui["cancel_button"].config(state=NORMAL if running else DISABLED)
+
+def poll_events(ui, events, output_path):
+    """
+    Applies the worker's queued events to the window and schedules itself
+    again until the conversion has finished.
+    """
+
+    outcome = None
+    while True:
+        try:
+            event = events.get_nowait()
+        except queue.Empty:
+            break
+        if event[0] != "progress":
+            outcome = event
+            continue
+        stage, done, total = event[1:]
+        if stage == "sheets":
+            ui["stage"] = f"Reading sheets ({done}/{total})"
+            ui["fraction"] = SHEETS_SHARE * done / total
+        else:
+            ui["stage"] = f"Writing classes and properties ({done}/{total})"
+            ui["fraction"] = SHEETS_SHARE + (1 - SHEETS_SHARE) * done / total
+
+    if outcome is None:
+        _show_progress(ui)
+        ui["app"].after(POLL_MS, poll_events, ui, events, output_path)
+        return
+
+    _set_running(ui, False)
+    ui["cancel"] = None
+    elapsed = _format_seconds(time.monotonic() - ui["started"])
+    if outcome[0] == "done":
+        ui["progressbar"]["value"] = 100
+        warnings, summary = outcome[1:]
+        if summary is None:
+            ui["status"].config(text=f"Done in {elapsed}")
+            messagebox.showinfo("Success", f"JSON file saved to:\n{output_path}")
+        else:
+            ui["status"].config(text=f"Done in {elapsed}, {warnings} warning{'s' if warnings != 1 else ''}")
+            messagebox.showwarning("Done with warnings", f"JSON file saved to:\n{output_path}\n\n{summary}")
+    elif outcome[0] == "cancelled":
+        ui["progressbar"]["value"] = 0
+        ui["status"].config(text=f"Cancelled after {elapsed}")
+    else:
+        ui["progressbar"]["value"] = 0
+        ui["status"].config(text="Failed")
+        messagebox.showerror("Error", outcome[1])
 
 def main():
     """Main function for the GUI."""
     app = Tk()
     app.title("Excel2bSDD Converter")
-    app.geometry("600x225")
+    app.geometry("600x300")
 
     mainframe = Frame(app)
     mainframe.pack(padx=20, pady=25)
@@ -85,9 +198,19 @@ def main():
     nulls_var = BooleanVar()
     Checkbutton(mainframe, text="Remove nulls", variable=nulls_var).grid(row=3, column=1, sticky="w")
 
-    Button(mainframe, text="Run Converter", bg="green", fg="white", 
-           command=lambda: run_converter(excel_entry, template_entry, output_name_entry, nulls_var)
-           ).grid(row=5, column=1, pady=20)
+    ui = {"app": app, "cancel": None}
+    ui["progressbar"] = ttk.Progressbar(mainframe, length=420, maximum=100)
+    ui["progressbar"].grid(row=4, column=1, pady=(10, 0))
+    ui["status"] = Label(mainframe, text="")
+    ui["status"].grid(row=5, column=1)
+
+    buttons = Frame(mainframe)
+    buttons.grid(row=6, column=1, pady=15)
+    ui["run_button"] = Button(buttons, text="Run Converter", bg="green", fg="white",
+           command=lambda: run_converter(excel_entry, template_entry, output_name_entry, nulls_var, ui))
+    ui["run_button"].pack(side="left", padx=5)
+    ui["cancel_button"] = Button(buttons, text="Cancel", state=DISABLED, command=lambda: cancel_converter(ui))
+    ui["cancel_button"].pack(side="left", padx=5)
 
     app.mainloop()
 
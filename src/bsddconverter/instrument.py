@@ -0,0 +1,139 @@
+"""
+Instrumentation of the conversion stages.
+
+A Profile records a span for every stage of a conversion: "load" and "map"
+for each sheet, then "link" and "write". A span is a dictionary::
+
+    {"name": "map", "sheet": "classproperty", "wall_seconds": 0.41,
+     "cpu_seconds": 0.40, "rows": 52000, "peak_memory_bytes": 18350080}
+
+``peak_memory_bytes`` is the tracemalloc peak during the span, recorded with
+``memory=True`` only, as tracing slows Python down noticeably. ``cpu_seconds``
+is the CPU time of the whole process. With ``cprofile_path`` the map, link
+and write stages also run under cProfile and the statistics are dumped to
+that file.
+
+Spans are recorded per sheet and stage, never per row, and nothing at all
+is recorded without a Profile.
+"""
+import cProfile
+import json
+import time
+import tracemalloc
+
+# Stages run under cProfile when a dump is requested
+HOT_STAGES = ("map", "link", "write")
+
+
+class Profile:
+    """
+    Collects the spans of one or more conversions.
+
+    :ivar spans: Finished spans, in order
+    :ivar observer: Called with every finished span
+    :ivar memory: Record tracemalloc peaks
+    :ivar cprofile_path: Where to dump the cProfile statistics of the hot stages
+    """
+
+    def __init__(self, observer=None, memory=False, cprofile_path=None):
+        self.spans = []
+        self.observer = observer
+        self.memory = memory
+        self.cprofile_path = cprofile_path
+        self._profiler = cProfile.Profile() if cprofile_path else None
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self._profiler is not None:
+            self._profiler.dump_stats(self.cprofile_path)
+
+    def start(self, name, sheet=None):
+        """Starts a span; returns the token for finish."""
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        if self._profiler is not None and name in HOT_STAGES:
+            self._profiler.enable()
+        return name, sheet, time.perf_counter(), time.process_time()
+
+    def finish(self, token, rows=None, sheet=None):
+        """
+        Finishes a span and reports it.
+
+        :param token: Returned by start
+        :param rows: Number of rows handled in the span
+        :type rows: int
+        :param sheet: Sheet key, if it was not known at the start
+        :type sheet: str
+        :return: The span
+        :rtype: dict
+        """
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        name, start_sheet, start_wall, start_cpu = token
+        if self._profiler is not None and name in HOT_STAGES:
+            self._profiler.disable()
+        peak = None
+        if self.memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+        return self.add({
+            "name": name,
+            "sheet": sheet or start_sheet,
+            "wall_seconds": round(wall - start_wall, 6),
+            "cpu_seconds": round(cpu - start_cpu, 6),
+            "rows": rows,
+            "peak_memory_bytes": peak,
+        })
+
+    def add(self, span):
+        """Records a span measured elsewhere, e.g. in a worker process."""
+        self.spans.append(span)
+        if self.observer is not None:
+            self.observer(span)
+        return span
+
+    def report(self):
+        """Returns the spans as a text table with a total line."""
+        lines = [f"{'stage':<8}{'sheet':<18}{'wall s':>10}{'cpu s':>10}{'rows':>10}{'peak MB':>10}"]
+        for span in self.spans + [self.total()]:
+            peak = "" if span["peak_memory_bytes"] is None else f"{span['peak_memory_bytes'] / 1048576:.1f}"
+            rows = "" if span["rows"] is None else span["rows"]
+            lines.append(f"{span['name']:<8}{span['sheet'] or '':<18}{span['wall_seconds']:>10.3f}{span['cpu_seconds']:>10.3f}{rows:>10}{peak:>10}")
+        return "\n".join(lines)
+
+    def total(self):
+        """Sums the spans into one, with the highest memory peak."""
+        peaks = [span["peak_memory_bytes"] for span in self.spans if span["peak_memory_bytes"] is not None]
+        return {
+            "name": "total",
+            "sheet": None,
+            "wall_seconds": round(sum(span["wall_seconds"] for span in self.spans), 6),
+            "cpu_seconds": round(sum(span["cpu_seconds"] for span in self.spans), 6),
+            "rows": None,
+            "peak_memory_bytes": max(peaks) if peaks else None,
+        }
+
+    def save(self, path):
+        """Writes the spans to a JSON file."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"spans": self.spans, "total": self.total()}, f, indent=2)
+
+def as_profile(observer):
+    """Profile for an observer option: None, a callable receiving spans, or a Profile."""
+    if observer is None or isinstance(observer, Profile):
+        return observer
+    return Profile(observer)
+
+def sheet_rows(sheet):
+    """Number of rows of a loaded sheet: typed columns or a DataFrame."""
+    if isinstance(sheet, dict):
+        return len(next(iter(sheet.values()), ()))
+    return len(sheet)
@@ -0,0 +1,331 @@
+"""
+Streaming workbook loader.
+
+Reads the seven template sheets with openpyxl in read-only mode, row by row,
+without building pandas DataFrames. Values are typed the same way
+``pd.read_excel`` and ``mapper._normalize_blanks`` type them, so the mapping
+stage produces identical output for both loaders.
+"""
+import math
+import posixpath
+import re
+import warnings
+from datetime import datetime
+from xml.etree import ElementTree
+from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+# Header row of every template sheet (the first six rows hold instructions)
+HEADER_ROW = 7
+
+# (key, sheet name, column range, columns read as text)
+SHEETS = (
+    ('dictionary', 'Dictionary', "C:R", ('DictionaryVersion',)),
+    ('class', 'Class', "C:AC", ('Uid',)),
+    ('property', 'Property', "C:AU", ()),
+    ('classproperty', 'ClassProperty', "C:U", ()),
+    ('classrelation', 'ClassRelation', "C:H", ()),
+    ('allowedvalue', 'AllowedValue', "C:J", ()),
+    ('propertyrelation', 'PropertyRelation', "C:G", ()),
+)
+
+# read_only mode with values_only returns error cells as their text
+EXCEL_ERRORS = frozenset(('#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A', '#GETTING_DATA'))
+
+# pandas parses true_values="TRUE" as the characters of the string
+TRUE_STRINGS = frozenset(('True', 'TRUE', 'true', 'T', 'R', 'U', 'E'))
+FALSE_STRINGS = frozenset(('False', 'FALSE', 'false'))
+
+# XML namespaces of the workbook parts
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_NUMBER = re.compile(r'\s*[+-]?(?:(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|inf|infinity)\s*', re.IGNORECASE)
+_INTEGER = re.compile(r'\s*[+-]?\d+\s*')
+_INT64_MIN, _INT64_MAX = -2**63, 2**63 - 1
+
+
+def convert_cell(value):
+    """
+    Types a raw openpyxl value like pandas' openpyxl reader does: empty
+    cells become '', whole floats ints and error texts NaN.
+    """
+
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value.is_integer():
+            return int(value)
+        return value
+    if isinstance(value, str) and value in EXCEL_ERRORS:
+        return math.nan
+    return value
+
+def is_blank(value):
+    """True for cells normalize_column turns into None: empty, whitespace only or NaN."""
+    return value is None or (isinstance(value, str) and (not value or value.isspace())) or (isinstance(value, float) and math.isnan(value))
+
+def _parse_numbers(values):
+    """
+    Column-wide numeric parsing of the pandas text parser. Returns None when
+    any value is not numeric.
+    """
+
+    parsed = []
+    is_float = False
+    all_bool = True
+    for value in values:
+        if isinstance(value, bool):
+            parsed.append(value)
+            continue
+        all_bool = False
+        if isinstance(value, int):
+            parsed.append(value)
+            if not _INT64_MIN <= value <= _INT64_MAX:
+                is_float = True
+        elif isinstance(value, float):
+            parsed.append(value)
+            is_float = True
+        elif isinstance(value, str) and _NUMBER.fullmatch(value):
+            if _INTEGER.fullmatch(value):
+                parsed.append(int(value))
+            else:
+                parsed.append(float(value))
+                is_float = True
+        else:
+            return None
+    if all_bool:
+        return parsed
+    if is_float:
+        return [float(value) for value in parsed]
+    return [int(value) for value in parsed]
+
+def _parse_bools(values):
+    """Column-wide boolean parsing of the pandas text parser, or None."""
+    parsed = []
+    for value in values:
+        if isinstance(value, bool):
+            parsed.append(value)
+        elif isinstance(value, str) and value in TRUE_STRINGS:
+            parsed.append(True)
+        elif isinstance(value, str) and value in FALSE_STRINGS:
+            parsed.append(False)
+        else:
+            return None
+    return parsed
+
+def normalize_column(values, as_text=False):
+    """
+    Types one column of raw cell values the way ``pd.read_excel(...,
+    true_values="TRUE", keep_default_na=False)`` followed by
+    ``mapper._normalize_blanks`` does: blank cells become None, all-numeric
+    columns are parsed as numbers, integers in columns with blanks become
+    floats and date columns become Timestamps.
+
+    :param values: Cell values as returned by convert_cell
+    :type values: list
+    :param as_text: Read the column as text, like a ``str`` converter
+    :type as_text: bool
+    :return: Typed values
+    :rtype: list
+    """
+
+    if as_text:
+        return [None if is_blank(value) else value for value in (str(value) for value in values)]
+
+    if values:
+        parsed = _parse_numbers(values)
+        if parsed is None:
+            parsed = _parse_bools(values)
+        if parsed is not None:
+            return parsed
+
+    # pandas memoizes object values, so equal values such as 1 and True all
+    # become the first one seen in the column
+    memo = {}
+    values = [None if is_blank(value) else memo.setdefault(value, value) for value in values]
+    present = [value for value in values if value is not None]
+    if not present:
+        return values
+    if len(present) < len(values) and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return [None if value is None else float(value) for value in values]
+    if all(isinstance(value, datetime) for value in present):
+        from pandas import Timestamp
+        return [None if value is None else Timestamp(value) for value in values]
+    return values
+
+def column_names(header, first_col):
+    """Names the columns like pandas: blank headers become 'Unnamed: n' and duplicates get a '.n' suffix."""
+    names = []
+    counts = {}
+    for offset, name in enumerate(header):
+        if name == "":
+            name = f"Unnamed: {first_col - 1 + offset}"
+        if name in counts:
+            counts[name] += 1
+            name = f"{name}.{counts[name]}"
+        counts.setdefault(name, 0)
+        names.append(name)
+    return names
+
+def _filled_width(row):
+    # Position after the last non-empty cell
+    for position in range(len(row), 0, -1):
+        if row[position - 1] != "":
+            return position
+    return 0
+
+def read_sheet(workbook, sheet_name, usecols, text_columns=()):
+    """
+    Reads one template sheet into typed columns. Rows are streamed into the
+    columns one at a time; trailing empty rows are dropped, as pandas does.
+
+    :param workbook: Workbook opened with ``read_only=True``
+    :param sheet_name: Name of the sheet, e.g. "ClassProperty"
+    :type sheet_name: str
+    :param usecols: Excel column range, e.g. "C:R"
+    :type usecols: str
+    :param text_columns: Columns to keep as text
+    :type text_columns: tuple
+    :return: Column name -> list of values, in sheet order
+    :rtype: dict
+    """
+
+    first, last = usecols.split(":")
+    start, stop = column_index_from_string(first) - 1, column_index_from_string(last)
+    header = None
+    # Cell values typed like pandas' openpyxl reader ('' for empty cells), per column of the range
+    cells = [[] for _ in range(stop - start)]
+    width = 0
+    # Empty rows not yet followed by a filled one
+    blank = 0
+    for row in workbook[sheet_name].iter_rows(min_row=HEADER_ROW, values_only=True):
+        if not any(value is not None and value != "" for value in row):
+            blank += 1
+            continue
+        selected = [convert_cell(value) for value in row[start:stop]]
+        width = max(width, _filled_width(selected))
+        if header is None:
+            if not blank:
+                header = selected
+                continue
+            # The header row itself is empty
+            header, blank = [], blank - 1
+        if blank:
+            for column in cells:
+                column.extend([""] * blank)
+            blank = 0
+        for position, column in enumerate(cells):
+            column.append(selected[position] if position < len(selected) else "")
+    if header is None:
+        return {}
+
+    names = column_names(header[:width] + [""] * (width - len(header)), start + 1)
+    columns = {}
+    for position, name in enumerate(names):
+        values, cells[position] = cells[position], None
+        columns[name] = normalize_column(values, as_text=name in text_columns)
+    return columns
+
+def sheet_parts(archive):
+    """
+    Finds the XML part of every sheet of an .xlsx file.
+
+    :param archive: The workbook, opened as a zip file
+    :type archive: zipfile.ZipFile
+    :return: (sheet name -> path of its XML part, True for the 1904 date system)
+    :rtype: tuple
+    """
+
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{PKG_REL_NS}Relationship")}
+
+    parts = {}
+    for sheet in workbook.iter(f"{MAIN_NS}sheet"):
+        target = targets.get(sheet.get(f"{REL_NS}id"))
+        if target is None:
+            continue
+        if target.startswith("/"):
+            parts[sheet.get("name")] = target.lstrip("/")
+        else:
+            parts[sheet.get("name")] = posixpath.normpath(posixpath.join("xl", target))
+
+    properties = workbook.find(f"{MAIN_NS}workbookPr")
+    date1904 = properties is not None and properties.get("date1904") in ("1", "true")
+    return parts, date1904
+
+def open_workbook(EXCEL_PATH):
+    """
+    Opens a workbook the way the loaders read it: read-only, with the cached
+    values of formulas and without external links.
+
+    :param EXCEL_PATH: Path to an excel file
+    :type EXCEL_PATH: str
+    :raises Exception: if the file is locked because it is open in Excel
+    """
+
+    try:
+        return load_workbook(EXCEL_PATH, read_only=True, data_only=True, keep_links=False)
+    except PermissionError:
+        raise Exception("Excel file is open. Please close it and try again.")
+
+def load_sheet(EXCEL_PATH, key):
+    """
+    Streams a single template sheet of an excel file.
+
+    :param EXCEL_PATH: Path to an excel file
+    :type EXCEL_PATH: str
+    :param key: Sheet key as used by load_excel, e.g. "classproperty"
+    :type key: str
+    :return: Typed columns of the sheet
+    :rtype: dict
+    """
+
+    for sheet_key, sheet_name, usecols, text_columns in SHEETS:
+        if sheet_key == key:
+            break
+    else:
+        raise ValueError(f"Unknown sheet key: '{key}'")
+
+    workbook = open_workbook(EXCEL_PATH)
+    try:
+        return read_sheet(workbook, sheet_name, usecols, text_columns)
+    finally:
+        workbook.close()
+
+def iter_sheets(EXCEL_PATH, keys=None):
+    """
+    Streams the seven template sheets of an excel file one after another.
+
+    :param EXCEL_PATH: Path to an excel file
+    :type EXCEL_PATH: str
+    :param keys: Only read these sheet keys, defaults to all
+    :type keys: list
+    :return: (key, typed columns) per sheet, in SHEETS order
+    :rtype: generator
+    """
+
+    workbook = open_workbook(EXCEL_PATH)
+    try:
+        for key, sheet_name, usecols, text_columns in SHEETS:
+            if keys is not None and key not in keys:
+                continue
+            yield key, read_sheet(workbook, sheet_name, usecols, text_columns)
+    finally:
+        workbook.close()
+
+def load_sheets(EXCEL_PATH):
+    """
+    Streams all seven template sheets of an excel file.
+
+    :param EXCEL_PATH: Path to an excel file
+    :type EXCEL_PATH: str
+    :return: Dictionary of typed columns per sheet, keyed like load_excel
+    :rtype: dict
+    """
+
+    return dict(iter_sheets(EXCEL_PATH))
@@ -1,24 +1,67 @@
 import os
-import json
+import logging
+from contextlib import nullcontext
 import numpy as np
 import pandas as pd
 from ast import literal_eval
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
+from itertools import compress, islice
 from tqdm import tqdm
+from bsddconverter.cache import SheetCache
+from bsddconverter.columns import compact_column, materialize, RepeatedValue
+from bsddconverter.converters import convert_values, ORIGIN_COLUMNS
+from bsddconverter.delta import write_delta
+from bsddconverter.diagnostics import Diagnostics, MAX_ROWS
+from bsddconverter.instrument import as_profile, sheet_rows, Profile
+from bsddconverter.loader import iter_sheets, load_sheet, load_sheets, SHEETS, HEADER_ROW
+from bsddconverter.plans import load_template, row_plan, RowPlan, SHEET_PARTS
+from bsddconverter.tables import iter_tables, load_table, TABLE_READERS
+from bsddconverter.writer import check_output_format, write_output, drop_empty, is_empty
 import warnings
 
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
-def run_excel2bsdd_conversion(excel_path, template_path, output_path, remove_nulls=False):
+logger = logging.getLogger(__name__)
+
+def run_excel2bsdd_conversion(excel_path, template_path, output_path, remove_nulls=False, engine="columnar", reader="openpyxl", workers=None, serializer="auto", compact=False, progress=None, cancel=None, cache=True, previous_path=None, observer=None, output_format="json", shard_size=None, shard_bytes=None):
     """
     Main function to map excel file to bsdd json file
 
-    :param excel_path: Path to an excel file 
+    :param excel_path: Path to an excel file, or to a directory of CSV or Parquet files, see bsddconverter.tables
     :type excel_path: str
     :param template_path: Path to JSON template file
     :type template_path: str
     :param output_path: Path to output JSON file
     :type output_path: str
+    :param remove_nulls: Drop empty fields from the result
+    :type remove_nulls: bool
+    :param engine: Mapping engine passed to map_data, "columnar" or "row"
+    :type engine: str
+    :param reader: Reader passed to load_excel, "openpyxl", "pandas", "csv" or "parquet"
+    :type reader: str
+    :param workers: Number of worker processes that parse and map the sheets concurrently; None or 1 runs serially
+    :type workers: int
+    :param serializer: JSON backend, "auto" (orjson if installed), "orjson", "ujson" or "json"; see bsddconverter.writer
+    :type serializer: str
+    :param compact: Write the JSON without indentation
+    :type compact: bool
+    :param progress: Called as progress(stage, done, total), see convert_to_file
+    :type progress: callable
+    :param cancel: Event that stops the conversion between sheets and row batches when set
+    :param cache: Reuse parsed sheets from the on-disk cache: True for the default folder, False, or a SheetCache
+    :param previous_path: Earlier output JSON file; if given, output_path receives the change set against it, see bsddconverter.delta
+    :type previous_path: str
+    :param observer: Called with a span (dict) for every stage and sheet, or a bsddconverter.instrument.Profile
+    :param output_format: "json", "shards" (output_path lists the part files) or "ndjson"; see bsddconverter.writer
+    :type output_format: str
+    :param shard_size: Most Classes and Properties per part of sharded output
+    :type shard_size: int
+    :param shard_bytes: Most bytes per part of sharded output
+    :type shard_bytes: int
+    :raises ConversionCancelled: if cancel was set
+    :return: Warnings of the conversion, such as columns the template has no field for
+    :rtype: bsddconverter.diagnostics.Diagnostics
     """
 
     # Check if files exist
@@ -26,79 +69,461 @@ def run_excel2bsdd_conversion(excel_path, template_path, output_path, remove_nul
         raise FileNotFoundError(f"Excel file not found: {excel_path}")
     if not os.path.exists(template_path):
         raise FileNotFoundError(f"Template file not found: {template_path}")
+    if previous_path is not None and not os.path.exists(previous_path):
+        raise FileNotFoundError(f"Previous output file not found: {previous_path}")
+    check_output_format(output_format, shard_size, shard_bytes)
+    if previous_path is not None and output_format != "json":
+        raise ValueError("Change sets are always written as a single JSON file.")
 
-    # Load files
-    with open(template_path, encoding="utf-8") as f:
-        tpl = json.load(f)
+    # Load files; compiled templates are cached by file hash
+    tpl = load_template(template_path)
+    cache = sheet_cache(cache)
+    profile = as_profile(observer)
+    diagnostics = Diagnostics()
 
-    excel = load_excel(excel_path)
-    result = excel2bsdd(excel, tpl)
+    with profile or nullcontext():
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                convert_to_file(excel_path, tpl, output_path, remove_nulls=remove_nulls, engine=engine, reader=reader, executor=executor, serializer=serializer, compact=compact, progress=progress, cancel=cancel, cache=cache, previous_path=previous_path, profile=profile, output_format=output_format, shard_size=shard_size, shard_bytes=shard_bytes, diagnostics=diagnostics)
+        else:
+            convert_to_file(excel_path, tpl, output_path, remove_nulls=remove_nulls, engine=engine, reader=reader, serializer=serializer, compact=compact, progress=progress, cancel=cancel, cache=cache, previous_path=previous_path, profile=profile, output_format=output_format, shard_size=shard_size, shard_bytes=shard_bytes, diagnostics=diagnostics)
+    if len(diagnostics):
+        logger.warning(diagnostics.summary())
+    return diagnostics
 
-    # Save file
-    if remove_nulls:
-        result = clean_nones(result)
-    if result is None:
-        raise ValueError("Conversion result is None. Please check input files.")
-    
+def sheet_cache(cache):
+    """
+    SheetCache for a cache option: True for the default folder, False or None
+    for no cache, or an existing SheetCache.
+    """
+
+    if cache is True:
+        return SheetCache()
+    return cache or None
+
+class ConversionCancelled(Exception):
+    """Raised when a conversion stops because its cancel event was set."""
+
+# Number of written Classes and Properties between two progress reports
+PROGRESS_EVERY = 200
+
+def _check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise ConversionCancelled("Conversion cancelled.")
+
+def _map_all_sheets(excel_path, bsdd_template, engine, reader, executor, tables, remove_nulls, progress, cancel, cache=None, profile=None, diagnostics=None):
+    """
+    Maps the seven sheets, serially or in the pool. Reports every finished
+    sheet as progress("sheets", done, 7) and checks for cancellation in between.
+    The warnings of every sheet are added to diagnostics.
+    """
+
+    done = 0
+
+    def sheet_done(key):
+        nonlocal done
+        done += 1
+        if progress is not None:
+            progress("sheets", done, len(SHEET_PARTS))
+        _check_cancel(cancel)
+
+    _check_cancel(cancel)
+    if executor is not None:
+        return map_sheets_in_pool(excel_path, bsdd_template, executor, engine=engine, reader=reader, tables=tables, remove_nulls=remove_nulls, on_sheet=sheet_done, cache=cache, profile=profile, diagnostics=diagnostics)
+
+    mapped = {}
+    sheets = iter_excel(excel_path, reader, cache)
+    if profile is not None:
+        sheets = _profile_loading(sheets, profile)
+    for key, excel_data in sheets:
+        if profile is not None:
+            token = profile.start("map", key)
+        if tables:
+            mapped[key] = map_sheet_table(excel_data, bsdd_template, key)
+            _report(diagnostics, mapped[key].diagnostics)
+        else:
+            mapped[key] = map_sheet(excel_data, bsdd_template, key, engine, remove_nulls, diagnostics)
+        if profile is not None:
+            profile.finish(token, rows=len(mapped[key]))
+        del excel_data
+        sheet_done(key)
+    return mapped
+
+def _profile_loading(sheets, profile):
+    """Records a "load" span for every sheet parsed by the generator."""
+    while True:
+        token = profile.start("load")
+        item = next(sheets, None)
+        if item is None:
+            return
+        profile.finish(token, rows=sheet_rows(item[1]), sheet=item[0])
+        yield item
+
+def _linked_rows(mapped):
+    return sum(len(mapped[key]) for key in ('classproperty', 'classrelation', 'allowedvalue', 'propertyrelation'))
+
+def _track_rows(fields, total, progress, cancel):
+    """
+    Wraps the Classes and Properties of the output so that writing them
+    reports progress("rows", done, total) and can be cancelled between batches.
+    """
+
+    done = 0
+
+    def tracked(items):
+        nonlocal done
+        for item in items:
+            yield item
+            done += 1
+            if done % PROGRESS_EVERY == 0 or done == total:
+                if progress is not None:
+                    progress("rows", done, total)
+                _check_cancel(cancel)
+
+    return [(key, tracked(value) if key in ('Classes', 'Properties') else value) for key, value in fields]
+
+def convert_to_file(excel_path, bsdd_template, output_path, remove_nulls=False, engine="columnar", reader="openpyxl", executor=None, row_counts=None, serializer="auto", compact=False, progress=None, cancel=None, cache=None, previous_path=None, profile=None, output_format="json", shard_size=None, shard_bytes=None, diagnostics=None):
+    """
+    Converts an excel file and writes the bSDD JSON file. With the columnar
+    engine the sheets are kept as converted columns and every Class and
+    Property is built and written only when its turn comes, so the complete
+    dictionary never exists as one Python tree.
+
+    :param excel_path: Path to an excel file
+    :type excel_path: str
+    :param bsdd_template: Parsed JSON template, or the TemplatePlan from plans.load_template
+    :param output_path: Path to output JSON file
+    :type output_path: str
+    :param remove_nulls: Drop empty fields while writing
+    :type remove_nulls: bool
+    :param engine: Mapping engine passed to map_data, "columnar" or "row"
+    :type engine: str
+    :param reader: Excel reader, "openpyxl" or "pandas"
+    :type reader: str
+    :param executor: Optional process pool to parse and map the sheets in
+    :param row_counts: Optional dictionary that receives the number of mapped rows per sheet
+    :type row_counts: dict
+    :param serializer: JSON backend, see bsddconverter.writer
+    :type serializer: str
+    :param compact: Write the JSON without indentation
+    :type compact: bool
+    :param progress: Called as progress(stage, done, total) with stage "sheets" after every sheet, then "rows" while writing
+    :type progress: callable
+    :param cancel: Event (e.g. threading.Event) checked between sheets and row batches
+    :param cache: Optional SheetCache of parsed sheets
+    :type cache: bsddconverter.cache.SheetCache
+    :param previous_path: Earlier output JSON file; if given, only the change set against it is written, see bsddconverter.delta
+    :type previous_path: str
+    :param profile: Optional Profile that records the stages, see bsddconverter.instrument
+    :type profile: bsddconverter.instrument.Profile
+    :param output_format: "json", "shards" or "ndjson", see bsddconverter.writer.write_output
+    :type output_format: str
+    :param shard_size: Most Classes and Properties per part of sharded output
+    :type shard_size: int
+    :param shard_bytes: Most bytes per part of sharded output
+    :type shard_bytes: int
+    :param diagnostics: Diagnostics that receives the warnings of the conversion; without one they are logged
+    :type diagnostics: bsddconverter.diagnostics.Diagnostics
+    :raises ConversionCancelled: if cancel was set; no output file is left behind
+    """
+
+    check_output_format(output_format, shard_size, shard_bytes)
+    if previous_path is not None:
+        # Matching by Code needs the complete new dictionary
+        result = convert_workbook(excel_path, bsdd_template, engine=engine, reader=reader, executor=executor, row_counts=row_counts, remove_nulls=remove_nulls, progress=progress, cancel=cancel, cache=cache, profile=profile, diagnostics=diagnostics)
+        if profile is not None:
+            token = profile.start("write")
+        write_delta(previous_path, result, output_path, serializer=serializer, compact=compact)
+        if profile is not None:
+            profile.finish(token, rows=len(result.get('Classes', ())) + len(result.get('Properties', ())))
+        return
+
+    if engine != "columnar":
+        result = convert_workbook(excel_path, bsdd_template, engine=engine, reader=reader, executor=executor, row_counts=row_counts, remove_nulls=remove_nulls, progress=progress, cancel=cancel, cache=cache, profile=profile, diagnostics=diagnostics)
+        fields = [(key, iter(value) if isinstance(value, list) else value) for key, value in result.items()]
+        total = len(result.get('Classes', ())) + len(result.get('Properties', ()))
+        # Mapped without nulls already
+        write_nulls = False
+    else:
+        tables = _map_all_sheets(excel_path, bsdd_template, engine, reader, executor, True, False, progress, cancel, cache, profile, diagnostics)
+        if row_counts is not None:
+            row_counts.update((key, len(table)) for key, table in tables.items())
+        if profile is not None:
+            token = profile.start("link")
+        fields = stream_bsdd(tables, diagnostics)
+        if profile is not None:
+            profile.finish(token, rows=_linked_rows(tables))
+        total = len(tables['class']) + len(tables['property'])
+        # Nulls are dropped per Class and Property while writing
+        write_nulls = remove_nulls
+
+    if progress is not None or cancel is not None:
+        fields = _track_rows(fields, total, progress, cancel)
+    _make_parent_dir(output_path)
+    if profile is not None:
+        token = profile.start("write")
+    write_output(fields, output_path, output_format, remove_nulls=write_nulls, serializer=serializer, compact=compact, shard_size=shard_size, shard_bytes=shard_bytes)
+    if profile is not None:
+        profile.finish(token, rows=total)
+
+def convert_workbook(excel_path, bsdd_template, engine="columnar", reader="openpyxl", executor=None, row_counts=None, remove_nulls=False, progress=None, cancel=None, cache=None, profile=None, diagnostics=None):
+    """
+    Converts an excel file into the bSDD JSON structure.
+
+    :param excel_path: Path to an excel file
+    :type excel_path: str
+    :param bsdd_template: Parsed JSON template, or the TemplatePlan from plans.load_template
+    :param engine: Mapping engine passed to map_data, "columnar" or "row"
+    :type engine: str
+    :param reader: Excel reader, "openpyxl" or "pandas"
+    :type reader: str
+    :param executor: Optional process pool to parse and map the sheets in
+    :param row_counts: Optional dictionary that receives the number of mapped rows per sheet
+    :type row_counts: dict
+    :param remove_nulls: Leave out empty fields while mapping, see excel2bsdd
+    :type remove_nulls: bool
+    :param progress: Called as progress("sheets", done, 7) after every sheet
+    :type progress: callable
+    :param cancel: Event checked between sheets
+    :param cache: Optional SheetCache of parsed sheets
+    :type cache: bsddconverter.cache.SheetCache
+    :param profile: Optional Profile that records the stages, see bsddconverter.instrument
+    :type profile: bsddconverter.instrument.Profile
+    :param diagnostics: Diagnostics that receives the warnings of the conversion; without one they are logged
+    :type diagnostics: bsddconverter.diagnostics.Diagnostics
+    :raises ConversionCancelled: if cancel was set
+    :return: Resultant JSON structure
+    :rtype: dict
+    """
+
+    mapped = _map_all_sheets(excel_path, bsdd_template, engine, reader, executor, False, remove_nulls, progress, cancel, cache, profile, diagnostics)
+    if row_counts is not None:
+        row_counts.update((key, len(rows)) for key, rows in mapped.items())
+    if profile is None:
+        return assemble_bsdd(mapped, remove_nulls, diagnostics)
+    token = profile.start("link")
+    linked = _linked_rows(mapped)
+    result = assemble_bsdd(mapped, remove_nulls, diagnostics)
+    profile.finish(token, rows=linked)
+    return result
+
+def _make_parent_dir(output_path):
     output_dir = os.path.dirname(output_path)
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True)
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
-
-def load_excel(EXCEL_PATH):
+def load_excel(EXCEL_PATH, reader="openpyxl"):
     """
     Parses an excel file from path. Note: only works on provided template file.
 
-    :param EXCEL_PATH: Path to an excel file 
+    :param EXCEL_PATH: Path to an excel file, or to a directory of CSV or Parquet files
     :type EXCEL_PATH: str
-    :return: Dictionary of Pandas dataframes with parsed Excel data
+    :param reader: "openpyxl" streams the sheets into typed columns, "pandas" uses pd.read_excel,
+        "csv" and "parquet" read a directory of sheet files (picked by the files for a directory)
+    :type reader: str
+    :return: Dictionary of typed columns (openpyxl, csv, parquet) or Pandas dataframes (pandas) with parsed Excel data
     :rtype: dict
     """
 
+    if reader == "openpyxl" and not os.path.isdir(EXCEL_PATH):
+        return load_sheets(EXCEL_PATH)
+    return dict(iter_excel(EXCEL_PATH, reader))
+
+def iter_excel(EXCEL_PATH, reader="openpyxl", cache=None, keys=None):
+    """
+    Parses the template sheets of an excel file one after another, see load_excel.
+
+    :param EXCEL_PATH: Path to an excel file, or to a directory of CSV or Parquet files
+    :type EXCEL_PATH: str
+    :param reader: "openpyxl", "pandas", "csv" or "parquet"
+    :type reader: str
+    :param cache: Optional SheetCache; only the sheets it does not hold are parsed
+    :type cache: bsddconverter.cache.SheetCache
+    :param keys: Only parse these sheet keys, defaults to all
+    :type keys: list
+    :return: (key, sheet) pairs in SHEETS order
+    :rtype: generator
+    """
+
+    _check_reader(reader)
+    if reader in TABLE_READERS or os.path.isdir(EXCEL_PATH):
+        # Table files are read directly; the cache only holds workbook sheets
+        yield from iter_tables(EXCEL_PATH, _table_reader(reader), keys)
+        return
+    if cache is not None:
+        yield from cache.iter_sheets(EXCEL_PATH, reader, lambda missing: iter_excel(EXCEL_PATH, reader, keys=missing))
+        return
+    if reader == "openpyxl":
+        yield from iter_sheets(EXCEL_PATH, keys)
+        return
+
+    excel_df = _open_excel_file(EXCEL_PATH)
+    for key, sheet_name, usecols, text_columns in SHEETS:
+        if keys is None or key in keys:
+            yield key, _read_excel_sheet(excel_df, key)
+
+def load_excel_sheet(EXCEL_PATH, key, reader="openpyxl", cache=None):
+    """
+    Parses a single template sheet of an excel file, see load_excel.
+
+    :param EXCEL_PATH: Path to an excel file, or to a directory of CSV or Parquet files
+    :type EXCEL_PATH: str
+    :param key: Sheet key as used by load_excel, e.g. "classproperty"
+    :type key: str
+    :param reader: "openpyxl", "pandas", "csv" or "parquet"
+    :type reader: str
+    :param cache: Optional SheetCache to take the parsed sheet from
+    :type cache: bsddconverter.cache.SheetCache
+    :return: Typed columns (openpyxl, csv, parquet) or Pandas dataframe (pandas)
+    """
+
+    _check_reader(reader)
+    if reader in TABLE_READERS or os.path.isdir(EXCEL_PATH):
+        return load_table(EXCEL_PATH, key, _table_reader(reader))
+    if cache is not None:
+        return cache.load_sheet(EXCEL_PATH, reader, key, lambda: load_excel_sheet(EXCEL_PATH, key, reader))
+    if reader == "openpyxl":
+        return load_sheet(EXCEL_PATH, key)
+    return _read_excel_sheet(_open_excel_file(EXCEL_PATH), key)
+
+def _check_reader(reader):
+    if reader not in ("openpyxl", "pandas") + TABLE_READERS:
+        raise ValueError(f"Unknown excel reader: '{reader}'. Use 'openpyxl', 'pandas', 'csv' or 'parquet'.")
+
+def _table_reader(reader):
+    # The excel readers on a directory: pick csv or parquet after its files
+    return reader if reader in TABLE_READERS else None
+
+def _open_excel_file(EXCEL_PATH):
     try:
-        excel_df = pd.ExcelFile(EXCEL_PATH)
+        return pd.ExcelFile(EXCEL_PATH)
     except PermissionError:
         raise Exception("Excel file is open. Please close it and try again.")
-    
-    excel = {}
-    excel['dictionary'] = pd.read_excel(excel_df, 'Dictionary', skiprows=6, usecols="C:R", true_values="TRUE", keep_default_na=False, converters={'DictionaryVersion': str})    
-    excel['class'] = pd.read_excel(excel_df, 'Class', skiprows=6, usecols="C:AC", true_values="TRUE", keep_default_na=False, converters={'Uid': str})
-    excel['property'] = pd.read_excel(excel_df, 'Property', skiprows=6, usecols="C:AU", true_values="TRUE", keep_default_na=False)   
-    excel['classproperty'] = pd.read_excel(excel_df, 'ClassProperty', usecols="C:U", skiprows=6, true_values="TRUE", keep_default_na=False)
-    excel['classrelation'] = pd.read_excel(excel_df, 'ClassRelation', usecols="C:H", skiprows=6, true_values="TRUE", keep_default_na=False)
-    excel['allowedvalue'] = pd.read_excel(excel_df, 'AllowedValue', skiprows=6, usecols="C:J", true_values="TRUE", keep_default_na=False) 
-    excel['propertyrelation'] = pd.read_excel(excel_df, 'PropertyRelation', skiprows=6, usecols="C:G", true_values="TRUE", keep_default_na=False)
-    return excel
-
-def map_data(excel_data, bsdd_part_template, name=""):
+
+def _read_excel_sheet(excel_df, key):
+    for sheet_key, sheet_name, usecols, text_columns in SHEETS:
+        if sheet_key == key:
+            converters = {column: str for column in text_columns}
+            return pd.read_excel(excel_df, sheet_name, skiprows=HEADER_ROW - 1, usecols=usecols, true_values="TRUE", keep_default_na=False, converters=converters)
+    raise ValueError(f"Unknown sheet key: '{key}'")
+
+def map_data(excel_data, bsdd_part_template, name="", engine="columnar", remove_nulls=False, diagnostics=None):
     """
     Transforms the input pandas dataframe to JSON only if a property exists in the template
 
-    :param excel_data: Pandas dataframe with parsed Excel data
-    :type excel_data: pd.DataFrame
-    :param json_part: template dictinary from JSON_templates
+    :param excel_data: Pandas dataframe with parsed Excel data, or typed columns from loader.load_sheets
+    :type excel_data: pd.DataFrame or dict
+    :param json_part: template dictinary from JSON_templates, or its compiled RowPlan
     :type json_part: dict
+    :param engine: "columnar" converts each column once, "row" is the original cell-by-cell reference implementation
+    :type engine: str
+    :param remove_nulls: Leave out empty fields while building each row, as clean_nones would. The
+        child lists filled by link_entities (see LINKED_LISTS) are kept until the rows are linked.
+    :type remove_nulls: bool
+    :param diagnostics: Diagnostics that receives the warnings, e.g. columns the template has no field for; without one they are logged
+    :type diagnostics: bsddconverter.diagnostics.Diagnostics
     :return: Resultant list of dictionaries containing each row of the pandas table converted to appropriate dictionary
     :rtype: list
     """
 
-    if isinstance(bsdd_part_template, list):
-        template = deepcopy(bsdd_part_template[0])
+    if isinstance(bsdd_part_template, RowPlan):
+        plan = bsdd_part_template
     else:
-        template = deepcopy(bsdd_part_template)
+        plan = RowPlan(bsdd_part_template)
+
+    if engine == "columnar":
+        return _map_columns(excel_data, plan, name, remove_nulls, diagnostics)
+    if engine == "row":
+        return _map_rows(excel_data, plan.defaults, name, remove_nulls, diagnostics)
+    raise ValueError(f"Unknown mapping engine: '{engine}'. Use 'columnar' or 'row'.")
+
+# Sheet name by the display name map_data is called with
+SHEET_NAMES = {SHEET_PARTS[key][1]: sheet_name for key, sheet_name, usecols, text_columns in SHEETS}
+
+# Workbook row of the first row below the header
+FIRST_ROW = HEADER_ROW + 1
 
-    for k, v in template.items():
-        if isinstance(v, list):
-            template[k] = []
+def _unknown_column(diagnostics, name, column_name, values):
+    """Records a column the template has no field for, with the rows that have a value in it."""
+    filled = (FIRST_ROW + position for position, value in enumerate(values) if value is not None)
+    rows = list(islice(filled, MAX_ROWS))
+    count = len(rows) + sum(1 for _ in filled)
+    message = f"No such property as '{column_name}' in the JSON template! It will NOT be added to the JSON file."
+    diagnostics.add("unknown-column", message, SHEET_NAMES.get(name, name), column_name, rows, count)
+
+def _report(diagnostics, entries):
+    """
+    Adds the entries of Diagnostics.to_list to diagnostics or, if the caller
+    gave none, logs their summary so that they are not lost.
+    """
+
+    if diagnostics is not None:
+        diagnostics.extend(entries)
+    elif entries:
+        found = Diagnostics()
+        found.extend(entries)
+        logger.warning(found.summary())
+
+def _allowed_values_without_origin(diagnostics, count, rows=()):
+    found = Diagnostics()
+    found.add("allowed-value-without-origin", ALLOWED_VALUE_WITHOUT_ORIGIN, "AllowedValue", rows=rows, count=count)
+    _report(diagnostics, found.to_list())
+
+# Lists that link_entities fills with the rows of the relationship sheets
+LINKED_LISTS = ('Classes', 'Properties', 'ClassProperties', 'ClassRelations', 'AllowedValues', 'PropertyRelations')
+
+def _strip_nulls(new_object):
+    """Drops the empty fields of a single mapped row, keeping the LINKED_LISTS for linking."""
+    return {
+        key: drop_empty(val)
+        for key, val in new_object.items()
+        if not is_empty(val) or (key in LINKED_LISTS and isinstance(val, list))
+    }
+
+def _keep_without_nulls(key, value):
+    """Template values kept in rows mapped with remove_nulls."""
+    return (key in LINKED_LISTS and isinstance(value, list)) or not is_empty(value)
+
+def _normalize_blanks(excel_data):
+    """
+    Replaces empty and whitespace-only cells with None, as an object dataframe.
+    """
 
     excel_data = excel_data.replace(r'^\s*$', np.nan, regex=True)
-    excel_data = excel_data.astype(object).replace(np.nan, None)
+    return excel_data.astype(object).replace(np.nan, None)
+
+def _non_blank_rows(excel_data):
+    """
+    Flags the rows that have at least one value, computed once per sheet.
+
+    :param excel_data: Dataframe after _normalize_blanks
+    :type excel_data: pd.DataFrame
+    :return: One boolean per row, False for entirely blank rows
+    :rtype: list
+    """
+
+    return excel_data.notna().any(axis=1).tolist()
+
+def _map_rows(excel_data, template, name="", remove_nulls=False, diagnostics=None):
+    """
+    Reference engine: converts the dataframe row by row and cell by cell.
+    """
+
+    if isinstance(excel_data, dict):
+        excel_data = pd.DataFrame(excel_data, dtype=object)
+    excel_data = _normalize_blanks(excel_data)
+    keep = _non_blank_rows(excel_data)
     new_objects = []
 
-    for index, row in tqdm(excel_data.iterrows(), desc=f"Processing {name}", unit=" items", total=len(excel_data), disable=True):
-        if not excel_data.dropna(how="all").empty:
+    # Columns the template has no field for are reported once per sheet and skipped in the rows
+    found = Diagnostics()
+    for position, column_name in enumerate(excel_data.columns):
+        if column_name not in template and column_name not in ORIGIN_COLUMNS:
+            _unknown_column(found, name, column_name, excel_data.iloc[:, position].tolist())
+    _report(diagnostics, found.to_list())
+
+    for (index, row), keep_row in tqdm(zip(excel_data.iterrows(), keep), desc=f"Processing {name}", unit=" items", total=len(excel_data), disable=True):
+        if keep_row:
             new_object = deepcopy(template)
             for column_name, column_data in row.items():
                 if column_name in template:
@@ -128,13 +553,169 @@ def map_data(excel_data, bsdd_part_template, name=""):
                     new_object[column_name] = column_data
                 elif column_name in ('(Origin Class Code)','(Origin Property Code)','(Origin ClassProperty Code)'):
                     new_object[column_name] = column_data
-                else:
-                    print(f"WARNING! No such property as '{column_name}' in the JSON template! It will NOT be added to the JSON file.")
-                    # new_object[column_name] = column_data
             # bsdd_part_template.append(new_object)
+            if remove_nulls:
+                new_object = _strip_nulls(new_object)
             new_objects.append(new_object)
     return new_objects
 
+def _map_columns(excel_data, plan, name="", remove_nulls=False, diagnostics=None):
+    """
+    Columnar engine: converts every column once with a compiled converter and
+    builds the row dictionaries from the converted column lists.
+    """
+
+    table = map_table(excel_data, plan, name, remove_nulls)
+    _report(diagnostics, table.diagnostics)
+    return list(table)
+
+def map_table(excel_data, plan, name="", remove_nulls=False):
+    """
+    Converts a sheet column by column without building the row dictionaries,
+    see SheetTable.
+
+    :param excel_data: Pandas dataframe with parsed Excel data, or typed columns from loader.load_sheets
+    :type excel_data: pd.DataFrame or dict
+    :param plan: Compiled template of the rows
+    :type plan: plans.RowPlan
+    :param remove_nulls: Build the rows without empty fields, see map_data
+    :type remove_nulls: bool
+    :return: Converted columns of the non-blank rows, with the warnings of the sheet
+    :rtype: SheetTable
+    """
+
+    if isinstance(excel_data, dict):
+        # Typed columns from the streaming loader are already normalised
+        sheet_columns = list(excel_data.items())
+        keep = [any(value is not None for value in row) for row in zip(*excel_data.values())]
+    else:
+        excel_data = _normalize_blanks(excel_data)
+        keep = _non_blank_rows(excel_data)
+        sheet_columns = [(column_name, excel_data.iloc[:, position].tolist()) for position, column_name in enumerate(excel_data.columns)]
+
+    keys = []
+    columns = []
+    shared_lists = []
+    strings = {}
+    diagnostics = Diagnostics()
+    for column_name, values in sheet_columns:
+        if column_name in plan:
+            values = convert_values(column_name, values, plan.converters[column_name])
+        elif column_name not in ORIGIN_COLUMNS:
+            _unknown_column(diagnostics, name, column_name, values)
+            continue
+        values, has_lists = compact_column(list(compress(values, keep)), strings)
+        if has_lists:
+            shared_lists.append(len(columns))
+        keys.append(column_name)
+        columns.append(values)
+    blank_rows = tuple(position for position, keep_row in enumerate(keep) if not keep_row)
+    return SheetTable(plan, keys, columns, sum(keep), remove_nulls, tuple(shared_lists), blank_rows, diagnostics.to_list())
+
+class SheetTable:
+    """
+    Converted columns of one mapped sheet. Iterating gives the same row
+    dictionaries map_data returns, but they are only built when asked for,
+    so the streaming writer never holds all rows of a sheet at once.
+
+    The columns are stored compactly (see columns.compact_column): repeated
+    strings are shared, list values are shared tuples that every built row
+    gets its own list copy of, and constant columns are RepeatedValues.
+
+    :ivar plan: Compiled template of the rows
+    :ivar keys: Names of the mapped columns, in sheet order
+    :ivar columns: Converted values per column, blank rows left out
+    :ivar remove_nulls: Rows are built without empty fields, see map_data
+    :ivar shared_lists: Positions of the columns holding shared list tuples
+    :ivar blank_rows: Positions of the blank rows left out, in the sheet
+    :ivar diagnostics: Warnings of the sheet, as entries of Diagnostics.to_list
+    """
+
+    __slots__ = ("plan", "keys", "columns", "length", "remove_nulls", "shared_lists", "blank_rows", "diagnostics")
+
+    def __init__(self, plan, keys, columns, length, remove_nulls=False, shared_lists=(), blank_rows=(), diagnostics=()):
+        self.plan = plan
+        self.keys = keys
+        self.columns = columns
+        self.length = length
+        self.remove_nulls = remove_nulls
+        self.shared_lists = shared_lists
+        self.blank_rows = blank_rows
+        self.diagnostics = diagnostics
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        rows = zip(*self.columns) if self.columns else [()] * self.length
+        for row in rows:
+            yield self._build(row)
+
+    def _build(self, row):
+        if self.shared_lists:
+            row = list(row)
+            for position in self.shared_lists:
+                row[position] = materialize(row[position])
+        if self.remove_nulls:
+            return self._build_without_nulls(row)
+        new_object = self.plan.new_row()
+        new_object.update(zip(self.keys, row))
+        return new_object
+
+    def _build_without_nulls(self, row):
+        # Empty template values are left out once per sheet, not per row
+        new_object = {}
+        for k, position, default in self.plan.slots(tuple(self.keys), _keep_without_nulls):
+            if position is None:
+                # Copies the template value, emptied lists included
+                new_object[k] = drop_empty(default)
+                continue
+            value = row[position]
+            if is_empty(value):
+                continue
+            if isinstance(value, (list, dict)):
+                value = drop_empty(value)
+            new_object[k] = value
+        return new_object
+
+    def sheet_row(self, position):
+        """Workbook row number of the row at position, counting the blank rows left out."""
+        index = position
+        for blank in self.blank_rows:
+            if blank > index:
+                break
+            index += 1
+        return FIRST_ROW + index
+
+    def column(self, key):
+        """
+        Values of one field for every row, falling back to the template value
+        (or None) for fields the sheet has no column for. List values come as
+        shared tuples, see materialize.
+        """
+
+        if key in self.keys:
+            return self.columns[self.keys.index(key)]
+        return RepeatedValue(self.plan.defaults.get(key), self.length)
+
+    def row(self, position, drop=()):
+        """
+        Builds the dictionary of a single row.
+
+        :param position: Index of the row among the non-blank rows
+        :type position: int
+        :param drop: Fields to leave out, like the origin codes popped by link_entities
+        :type drop: tuple
+        :rtype: dict
+        """
+
+        if not 0 <= position < self.length:
+            raise IndexError("list index out of range")
+        new_object = self._build([values[position] for values in self.columns])
+        for key in drop:
+            new_object.pop(key, None)
+        return new_object
+
 def clean_nones(value):
     """
     Recursively remove all None values from dictionaries and lists, and returns
@@ -152,98 +733,395 @@ def clean_nones(value):
     else:
         return value
 
-def excel2bsdd(excel, bsdd_template):
+class UnresolvedReferenceError(Exception):
     """
-    Goes through all dataframes and appends data to the desired JSON structure
+    Raised when rows of the relationship sheets point at a Class, Property or
+    ClassProperty code that does not exist in the spreadsheet. All problems of
+    a conversion are collected before raising.
 
-    :param excel: Dictionary of Pandas dataframes from load_excel
-    :type excel: dict
-    :return: Resultant JSON structure
-    :rtype: dict
+    :ivar unresolved: List of ``(sheet, code)`` tuples, one per unlinked row
     """
 
-    bsdd_data = map_data(excel['dictionary'], bsdd_template, "dictionary")[0]
+    def __init__(self, unresolved):
+        self.unresolved = unresolved
+        counts = {}
+        for sheet, code in unresolved:
+            counts[(sheet, code)] = counts.get((sheet, code), 0) + 1
+        lines = [f"  {sheet}: '{code}' ({count} row{'s' if count > 1 else ''})" for (sheet, code), count in counts.items()]
+        super().__init__(
+            f"{len(counts)} origin code(s) not found in the spreadsheet, so {len(unresolved)} row(s) couldn't be appended:\n"
+            + "\n".join(lines)
+        )
 
-    # process basic concepts
-    bsdd_data['Classes'] = map_data(excel['class'], bsdd_template['Classes'], "classes")
-    bsdd_data['Properties'] = map_data(excel['property'], bsdd_template['Properties'], "properties")
+ALLOWED_VALUE_WITHOUT_ORIGIN = "Allowed value without origin property or classProperty code! It will NOT be added to the JSON file."
+
+def _index_by_code(items):
+    """
+    Builds a Code -> object index. Like the linear scans it replaces, the first
+    object with a given code wins.
+    """
+
+    index = {}
+    for item in items:
+        index.setdefault(item.get('Code'), item)
+    return index
+
+def link_entities(bsdd_data, cls_props, cls_rels, allowed_vals, prop_rels, diagnostics=None):
+    """
+    Attaches ClassProperties, ClassRelations, AllowedValues and PropertyRelations
+    to their parents using Code indexes built once, instead of scanning all
+    Classes or Properties for every row.
+
+    :param bsdd_data: Mapped dictionary with 'Classes' and 'Properties' filled in
+    :type bsdd_data: dict
+    :param cls_props: Mapped rows of the ClassProperty sheet
+    :type cls_props: list
+    :param cls_rels: Mapped rows of the ClassRelation sheet
+    :type cls_rels: list
+    :param allowed_vals: Mapped rows of the AllowedValue sheet
+    :type allowed_vals: list
+    :param prop_rels: Mapped rows of the PropertyRelation sheet
+    :type prop_rels: list
+    :param diagnostics: Diagnostics that receives the AllowedValues without an origin code; without one they are logged
+    :type diagnostics: bsddconverter.diagnostics.Diagnostics
+    :raises UnresolvedReferenceError: if any origin code has no matching parent
+    """
+
+    classes = _index_by_code(bsdd_data['Classes'])
+    properties = _index_by_code(bsdd_data['Properties'])
+    unresolved = []
 
-    # process ClassProperty
-    cls_props = map_data(excel['classproperty'], bsdd_template['Classes'][0]['ClassProperties'], "class-properties")
     for cls_prop in cls_props:
-        related = cls_prop['(Origin Class Code)']
-        cls_prop.pop("(Origin Class Code)")
-        found_it = False
-        for item in bsdd_data['Classes']:
-            if item["Code"] == related:
-                item['ClassProperties'].append(cls_prop)
-                found_it = True
-                break
-        if not found_it:
-            raise Exception(f"Class '{related}' not found in the spreadsheet, so couldn't append the class property: '{cls_prop}'!")
+        related = cls_prop.pop("(Origin Class Code)", None)
+        item = classes.get(related)
+        if item is None:
+            unresolved.append(("ClassProperty", related))
+        else:
+            item['ClassProperties'].append(cls_prop)
 
-    # process ClassRelation
-    cls_rels = map_data(excel['classrelation'], bsdd_template['Classes'][0]['ClassRelations'], "class-relations")
     for cls_rel in cls_rels:
-        related = cls_rel['(Origin Class Code)']
-        cls_rel.pop("(Origin Class Code)")
-        found_it = False
-        for item in bsdd_data['Classes']:
-            if item["Code"] == related:
-                item['ClassRelations'].append(cls_rel)
-                found_it = True
-                break
-        if not found_it:
-            raise Exception(f"Class '{related}' not found in the spreadsheet, so couldn't append the class relation: '{cls_rel}'!")
+        related = cls_rel.pop("(Origin Class Code)", None)
+        item = classes.get(related)
+        if item is None:
+            unresolved.append(("ClassRelation", related))
+        else:
+            item['ClassRelations'].append(cls_rel)
+
+    # ClassProperty codes are only unique within a class. An AllowedValue is
+    # attached to the first ClassProperty with its code in every class.
+    class_properties = {}
+    for cl in bsdd_data['Classes']:
+        for code, item in _index_by_code(cl['ClassProperties']).items():
+            class_properties.setdefault(code, []).append(item)
 
-    # process AllowedValue
-    allowed_vals = map_data(excel['allowedvalue'], bsdd_template['Properties'][0]['AllowedValues'], "allowed-values")
+    without_origin = 0
     for allowed_val in allowed_vals:
         # Only one of two code columns is possible
-        if allowed_val['(Origin Property Code)']:
-            relToProperty = True
-            related = allowed_val['(Origin Property Code)']
-        elif allowed_val['(Origin ClassProperty Code)']:
-            relToProperty = False
-            related = allowed_val['(Origin ClassProperty Code)']
-        else:
-            print("WARNING! Allowed value without origin property or classProperty code! It will NOT be added to the JSON file.")
-        allowed_val.pop("(Origin Property Code)")
-        allowed_val.pop("(Origin ClassProperty Code)")
-        if relToProperty:
-            # iterate all properties and add AllowedValue if such property is present in the spreadsheet
-            found_it = False
-            for item in bsdd_data['Properties']:
-                if item['Code'] == related:
+        prop_code = allowed_val.pop("(Origin Property Code)", None)
+        cls_prop_code = allowed_val.pop("(Origin ClassProperty Code)", None)
+        if prop_code:
+            item = properties.get(prop_code)
+            if item is None:
+                unresolved.append(("AllowedValue", prop_code))
+            else:
+                item['AllowedValues'].append(allowed_val)
+        elif cls_prop_code:
+            items = class_properties.get(cls_prop_code)
+            if items is None:
+                unresolved.append(("AllowedValue", cls_prop_code))
+            else:
+                for item in items:
                     item['AllowedValues'].append(allowed_val)
-                    found_it = True
-                    break
-            if not found_it:
-                raise Exception(f"Property '{related}' not found in the spreadsheet, so couldn't append the e {allowed_val}!")
         else:
-            # iterate all classes to find the one referenced by the property AllowedValue
-            found_it = False
-            for cl in bsdd_data['Classes']:
-                for item in cl['ClassProperties']:
-                    if item["Code"] == related:
-                        item['AllowedValues'].append(allowed_val)
-                        found_it = True
-                        break
-            if not found_it:
-                raise Exception(f"Class '{related}' not found in the spreadsheet, so couldn't append the e {allowed_val}!")
-
-    # process PropertyRelation
-    prop_rels = map_data(excel['propertyrelation'], bsdd_template['Properties'][0]['PropertyRelations'], "property-relations")
+            without_origin += 1
+
+    if without_origin:
+        # The rows are no longer known here
+        _allowed_values_without_origin(diagnostics, without_origin)
+
     for prop_rel in prop_rels:
-        related = prop_rel['(Origin Property Code)']
-        prop_rel.pop("(Origin Property Code)")
-        found_it = False
-        for item in bsdd_data['Properties']:
-            if item["Code"] == related:
-                item['PropertyRelations'].append(prop_rel)
-                found_it = True
-                break
-        if not found_it:
-            raise Exception(f"Class '{related}' not found in the spreadsheet, so couldn't append the value {prop_rel}!")
+        related = prop_rel.pop("(Origin Property Code)", None)
+        item = properties.get(related)
+        if item is None:
+            unresolved.append(("PropertyRelation", related))
+        else:
+            item['PropertyRelations'].append(prop_rel)
+
+    if unresolved:
+        raise UnresolvedReferenceError(unresolved)
+
+
+# Order in which sheets are handed to a worker pool, usually the largest first
+POOL_ORDER = ('allowedvalue', 'classproperty', 'property', 'class', 'classrelation', 'propertyrelation', 'dictionary')
+
+def map_sheet(excel_data, bsdd_template, key, engine="columnar", remove_nulls=False, diagnostics=None):
+    """
+    Maps one sheet from load_excel with the matching part of the JSON template.
+
+    :param excel_data: Sheet from load_excel
+    :param bsdd_template: Full JSON template, or its TemplatePlan
+    :param key: Sheet key, e.g. "classproperty"
+    :type key: str
+    :param engine: Mapping engine passed to map_data, "columnar" or "row"
+    :type engine: str
+    :param remove_nulls: Leave out empty fields, see map_data
+    :type remove_nulls: bool
+    :param diagnostics: Diagnostics that receives the warnings of the sheet; without one they are logged
+    :type diagnostics: bsddconverter.diagnostics.Diagnostics
+    :return: Mapped rows of the sheet
+    :rtype: list
+    """
+
+    return map_data(excel_data, row_plan(bsdd_template, key), SHEET_PARTS[key][1], engine, remove_nulls, diagnostics)
+
+def map_sheet_table(excel_data, bsdd_template, key):
+    """
+    Like map_sheet with the columnar engine, but returns the converted columns
+    as a SheetTable instead of the row dictionaries.
+    """
+
+    return map_table(excel_data, row_plan(bsdd_template, key), SHEET_PARTS[key][1])
+
+def _map_loaded_sheet(excel_data, plan, name, engine, table, remove_nulls):
+    # Mapped sheet and its diagnostics entries
+    if table:
+        result = map_table(excel_data, plan, name)
+        return result, result.diagnostics
+    diagnostics = Diagnostics()
+    return map_data(excel_data, plan, name, engine, remove_nulls, diagnostics), diagnostics.to_list()
+
+def _load_and_map_sheet(excel_path, key, plan, engine, reader, table=False, remove_nulls=False, cache=None, memory=None):
+    # Runs in a worker process, with only the RowPlan of its sheet. Returns the
+    # result, its diagnostics entries and, with memory True or False, the spans measured here.
+    name = SHEET_PARTS[key][1]
+    if memory is None:
+        excel_data = load_excel_sheet(excel_path, key, reader, cache)
+        return (*_map_loaded_sheet(excel_data, plan, name, engine, table, remove_nulls), None)
+
+    with Profile(memory=memory) as profile:
+        token = profile.start("load", key)
+        excel_data = load_excel_sheet(excel_path, key, reader, cache)
+        profile.finish(token, rows=sheet_rows(excel_data))
+        token = profile.start("map", key)
+        result, entries = _map_loaded_sheet(excel_data, plan, name, engine, table, remove_nulls)
+        profile.finish(token, rows=len(result))
+    return result, entries, profile.spans
+
+def map_sheets_in_pool(excel_path, bsdd_template, executor, engine="columnar", reader="openpyxl", tables=False, remove_nulls=False, on_sheet=None, cache=None, profile=None, diagnostics=None):
+    """
+    Parses and maps the seven sheets of an excel file as separate tasks of a
+    process pool. Results are collected in sheet order, so the outcome is the
+    same as mapping the sheets one after another.
+
+    :param excel_path: Path to an excel file
+    :type excel_path: str
+    :param bsdd_template: Full JSON template, or its TemplatePlan
+    :param executor: concurrent.futures executor to submit the sheets to
+    :param engine: Mapping engine passed to map_data, "columnar" or "row"
+    :type engine: str
+    :param reader: Excel reader, "openpyxl" or "pandas"
+    :type reader: str
+    :param tables: Return a SheetTable per sheet instead of the row dictionaries
+    :type tables: bool
+    :param remove_nulls: Leave out empty fields, see map_data
+    :type remove_nulls: bool
+    :param on_sheet: Called with the key of every collected sheet; if it raises, the remaining sheets are cancelled
+    :type on_sheet: callable
+    :param cache: Optional SheetCache shared by the workers
+    :type cache: bsddconverter.cache.SheetCache
+    :param profile: Optional Profile; the workers measure their sheets and send the spans back
+    :type profile: bsddconverter.instrument.Profile
+    :param diagnostics: Diagnostics that receives the warnings the workers send back; without one they are logged
+    :type diagnostics: bsddconverter.diagnostics.Diagnostics
+    :return: Mapped rows per sheet key
+    :rtype: dict
+    """
+
+    memory = None if profile is None else profile.memory
+    futures = {key: executor.submit(_load_and_map_sheet, excel_path, key, row_plan(bsdd_template, key), engine, reader, tables, remove_nulls, cache, memory) for key in POOL_ORDER}
+    mapped = {}
+    try:
+        for key in SHEET_PARTS:
+            mapped[key], entries, spans = futures[key].result()
+            _report(diagnostics, entries)
+            if profile is not None:
+                for span in spans:
+                    profile.add(span)
+            if on_sheet is not None:
+                on_sheet(key)
+    except BaseException:
+        for future in futures.values():
+            future.cancel()
+        raise
+    return mapped
+
+def assemble_bsdd(mapped, remove_nulls=False, diagnostics=None):
+    """
+    Builds the bSDD dictionary from the mapped rows of every sheet and links
+    the relationship sheets to their parents.
+
+    :param mapped: Mapped rows per sheet key
+    :type mapped: dict
+    :param remove_nulls: The rows were mapped with remove_nulls; drop the child lists that stayed empty
+    :type remove_nulls: bool
+    :param diagnostics: Diagnostics that receives the rows that could not be linked; without one they are logged
+    :type diagnostics: bsddconverter.diagnostics.Diagnostics
+    :return: Resultant JSON structure
+    :rtype: dict
+    """
+
+    bsdd_data = mapped['dictionary'][0]
+
+    # process basic concepts
+    bsdd_data['Classes'] = mapped['class']
+    bsdd_data['Properties'] = mapped['property']
+
+    # process relationships
+    link_entities(bsdd_data, mapped['classproperty'], mapped['classrelation'], mapped['allowedvalue'], mapped['propertyrelation'], diagnostics)
+
+    if remove_nulls:
+        _drop_empty_links(bsdd_data)
+
+    return bsdd_data
+
+def _drop_empty_links(bsdd_data):
+    """Removes the LINKED_LISTS that no row was linked to, the last step of a remove_nulls mapping."""
+    parents = [bsdd_data]
+    for cl in bsdd_data.get('Classes', ()):
+        parents.append(cl)
+        parents.extend(cl.get('ClassProperties', ()))
+    parents.extend(bsdd_data.get('Properties', ()))
+    for parent in parents:
+        for key in LINKED_LISTS:
+            if parent.get(key) == []:
+                del parent[key]
+
+def _children_by_parent(origin_codes, parents, sheet, unresolved):
+    """Groups row positions under the position of their parent, noting unknown codes."""
+    children = {}
+    for position, code in enumerate(origin_codes):
+        parent = parents.get(code)
+        if parent is None:
+            unresolved.append((sheet, code))
+        else:
+            children.setdefault(parent, []).append(position)
+    return children
+
+def _first_positions(codes):
+    positions = {}
+    for position, code in enumerate(codes):
+        positions.setdefault(code, position)
+    return positions
+
+def stream_bsdd(tables, diagnostics=None):
+    """
+    Lazy counterpart of assemble_bsdd. All origin codes are resolved up front
+    (raising like link_entities), but each Class and Property is only built,
+    together with its children, when the returned iterators reach it.
+
+    :param tables: SheetTable per sheet key, see map_sheet_table
+    :type tables: dict
+    :param diagnostics: Diagnostics that receives the AllowedValues without an origin code; without one they are logged
+    :type diagnostics: bsddconverter.diagnostics.Diagnostics
+    :return: Top-level (key, value) pairs of the dictionary; 'Classes' and 'Properties' are iterators
+    :rtype: list
+    :raises UnresolvedReferenceError: if any origin code has no matching parent
+    """
+
+    classes, properties = tables['class'], tables['property']
+    cls_props, cls_rels = tables['classproperty'], tables['classrelation']
+    allowed_vals, prop_rels = tables['allowedvalue'], tables['propertyrelation']
+
+    class_positions = _first_positions(classes.column('Code'))
+    property_positions = _first_positions(properties.column('Code'))
+    unresolved = []
+
+    class_props = _children_by_parent(cls_props.column("(Origin Class Code)"), class_positions, "ClassProperty", unresolved)
+    class_rels = _children_by_parent(cls_rels.column("(Origin Class Code)"), class_positions, "ClassRelation", unresolved)
+
+    # The first ClassProperty with a code in each class receives the
+    # AllowedValues of that code, as in link_entities
+    cls_prop_codes = cls_props.column('Code') if class_props else []
+    value_holders = set()
+    for positions in class_props.values():
+        seen = set()
+        for position in positions:
+            if cls_prop_codes[position] not in seen:
+                seen.add(cls_prop_codes[position])
+                value_holders.add(position)
+    holder_codes = {cls_prop_codes[position] for position in value_holders}
+
+    property_values = {}
+    class_property_values = {}
+    without_origin = []
+    for position, (prop_code, cls_prop_code) in enumerate(zip(allowed_vals.column("(Origin Property Code)"), allowed_vals.column("(Origin ClassProperty Code)"))):
+        if prop_code:
+            parent = property_positions.get(prop_code)
+            if parent is None:
+                unresolved.append(("AllowedValue", prop_code))
+            else:
+                property_values.setdefault(parent, []).append(position)
+        elif cls_prop_code:
+            if cls_prop_code not in holder_codes:
+                unresolved.append(("AllowedValue", cls_prop_code))
+            else:
+                class_property_values.setdefault(cls_prop_code, []).append(position)
+        else:
+            without_origin.append(position)
+
+    if without_origin:
+        rows = [allowed_vals.sheet_row(position) for position in without_origin[:MAX_ROWS]]
+        _allowed_values_without_origin(diagnostics, len(without_origin), rows)
+
+    property_rels = _children_by_parent(prop_rels.column("(Origin Property Code)"), property_positions, "PropertyRelation", unresolved)
+
+    if unresolved:
+        raise UnresolvedReferenceError(unresolved)
+
+    allowed_value_origins = ("(Origin Property Code)", "(Origin ClassProperty Code)")
+
+    def iter_classes():
+        for position in range(len(classes)):
+            item = classes.row(position)
+            for child in class_props.get(position, ()):
+                cls_prop = cls_props.row(child, drop=("(Origin Class Code)",))
+                if child in value_holders:
+                    for value in class_property_values.get(cls_prop_codes[child], ()):
+                        cls_prop['AllowedValues'].append(allowed_vals.row(value, drop=allowed_value_origins))
+                item['ClassProperties'].append(cls_prop)
+            for child in class_rels.get(position, ()):
+                item['ClassRelations'].append(cls_rels.row(child, drop=("(Origin Class Code)",)))
+            yield item
+
+    def iter_properties():
+        for position in range(len(properties)):
+            item = properties.row(position)
+            for child in property_values.get(position, ()):
+                item['AllowedValues'].append(allowed_vals.row(child, drop=allowed_value_origins))
+            for child in property_rels.get(position, ()):
+                item['PropertyRelations'].append(prop_rels.row(child, drop=("(Origin Property Code)",)))
+            yield item
+
+    fields = dict(tables['dictionary'].row(0))
+    fields['Classes'] = iter_classes()
+    fields['Properties'] = iter_properties()
+    return list(fields.items())
+
+def excel2bsdd(excel, bsdd_template, engine="columnar", remove_nulls=False, diagnostics=None):
+    """
+    Goes through all dataframes and appends data to the desired JSON structure
+
+    :param excel: Dictionary of sheets from load_excel
+    :type excel: dict
+    :param engine: Mapping engine passed to map_data, "columnar" or "row"
+    :type engine: str
+    :param remove_nulls: Leave out empty fields while mapping; the result equals clean_nones of the full result
+    :type remove_nulls: bool
+    :param diagnostics: Diagnostics that receives the warnings of the conversion; without one they are logged
+    :type diagnostics: bsddconverter.diagnostics.Diagnostics
+    :return: Resultant JSON structure
+    :rtype: dict
+    """
 
-    return bsdd_data
\ No newline at end of file
+    mapped = {key: map_sheet(excel[key], bsdd_template, key, engine, remove_nulls, diagnostics) for key in SHEET_PARTS}
+    return assemble_bsdd(mapped, remove_nulls, diagnostics)
@@ -0,0 +1,190 @@
+"""
+Compiled template plans.
+
+The JSON template describes every entity type (Class, Property,
+ClassProperty, ...) by one example object. A RowPlan holds what mapping a
+sheet needs from that object: key order, default values, which keys are
+lists or dictionaries and the converter of every column. Rows are created
+from a plan with a shallow dict copy instead of a deepcopy of the template.
+
+load_template caches the compiled plans by the hash of the template file, so
+converting many workbooks with the same template compiles it only once.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from copy import deepcopy
+from bsddconverter.converters import column_converter
+
+# Template part and display name used to map each sheet
+SHEET_PARTS = {
+    'dictionary': ((), "dictionary"),
+    'class': (('Classes',), "classes"),
+    'property': (('Properties',), "properties"),
+    'classproperty': (('Classes', 0, 'ClassProperties'), "class-properties"),
+    'classrelation': (('Classes', 0, 'ClassRelations'), "class-relations"),
+    'allowedvalue': (('Properties', 0, 'AllowedValues'), "allowed-values"),
+    'propertyrelation': (('Properties', 0, 'PropertyRelations'), "property-relations"),
+}
+
+# Number of compiled templates kept by load_template
+CACHE_SIZE = 16
+
+_cache = OrderedDict()
+
+
+def template_part(bsdd_template, key):
+    """
+    Returns the part of the JSON template that describes the rows of a sheet.
+
+    :param bsdd_template: Full JSON template
+    :type bsdd_template: dict
+    :param key: Sheet key, e.g. "classproperty"
+    :type key: str
+    """
+
+    part = bsdd_template
+    for step in SHEET_PARTS[key][0]:
+        part = part[step]
+    return part
+
+class RowPlan:
+    """
+    Compiled template of one entity type.
+
+    :ivar keys: Template keys, in output order
+    :ivar defaults: Template values, with list values emptied
+    :ivar list_keys: Keys whose value is a list, fresh for every row
+    :ivar dict_keys: Keys whose value is a dictionary, copied for every row
+    :ivar converters: Column name -> compiled converter, see converters.column_converter
+    """
+
+    def __init__(self, bsdd_part_template):
+        if isinstance(bsdd_part_template, list):
+            template = deepcopy(bsdd_part_template[0])
+        else:
+            template = deepcopy(bsdd_part_template)
+
+        for k, v in template.items():
+            if isinstance(v, list):
+                template[k] = []
+
+        self.keys = tuple(template)
+        self.defaults = template
+        self.list_keys = tuple(k for k, v in template.items() if isinstance(v, list))
+        self.dict_keys = tuple(k for k, v in template.items() if isinstance(v, dict))
+        self._compile()
+
+    def _compile(self):
+        self.converters = {k: column_converter(k) for k in self.keys}
+        self._slots = {}
+
+    def __getstate__(self):
+        # Converters are closures; they are compiled again after unpickling
+        state = self.__dict__.copy()
+        del state['converters'], state['_slots']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    def __contains__(self, key):
+        return key in self.defaults
+
+    def new_row(self):
+        """Returns a row with the template values, sharing nothing with other rows."""
+        row = self.defaults.copy()
+        for k in self.list_keys:
+            row[k] = []
+        for k in self.dict_keys:
+            row[k] = deepcopy(self.defaults[k])
+        return row
+
+    def slots(self, column_keys, keep):
+        """
+        Lists the fields of a row built from the given sheet columns, in
+        dictionary order, as (key, column position or None, template value).
+        Template values for which ``keep(key, value)`` is False are left out.
+        Cached per column layout.
+
+        :param column_keys: Names of the mapped sheet columns
+        :type column_keys: tuple
+        :param keep: Decides which template values to keep
+        :type keep: callable
+        :rtype: list
+        """
+
+        cache_key = (column_keys, keep)
+        if cache_key not in self._slots:
+            positions = {k: position for position, k in enumerate(column_keys)}
+            slots = []
+            for k in self.keys + tuple(k for k in column_keys if k not in self.defaults):
+                if k in positions:
+                    slots.append((k, positions[k], None))
+                elif keep(k, self.defaults[k]):
+                    slots.append((k, None, self.defaults[k]))
+            self._slots[cache_key] = slots
+        return self._slots[cache_key]
+
+class TemplatePlan:
+    """
+    Compiled JSON template: the template itself and a RowPlan per sheet.
+
+    :ivar template: The parsed JSON template
+    :ivar rows: Sheet key -> RowPlan
+    """
+
+    def __init__(self, bsdd_template):
+        self.template = bsdd_template
+        self.rows = {key: RowPlan(template_part(bsdd_template, key)) for key in SHEET_PARTS}
+
+def compile_template(bsdd_template):
+    """
+    Compiles a parsed JSON template.
+
+    :param bsdd_template: Full JSON template
+    :type bsdd_template: dict
+    :rtype: TemplatePlan
+    """
+
+    return TemplatePlan(bsdd_template)
+
+def load_template(template_path):
+    """
+    Reads and compiles a JSON template file. The result is cached by the
+    SHA-256 of the file content, so an unchanged template is not parsed or
+    compiled again. The returned plan is shared and must not be modified.
+
+    :param template_path: Path to JSON template file
+    :type template_path: str
+    :rtype: TemplatePlan
+    """
+
+    with open(template_path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+
+    plan = _cache.get(digest)
+    if plan is None:
+        plan = compile_template(json.loads(content.decode("utf-8")))
+        _cache[digest] = plan
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(digest)
+    return plan
+
+def row_plan(bsdd_template, key):
+    """
+    RowPlan for a sheet from a compiled or a plain JSON template.
+
+    :param bsdd_template: TemplatePlan, or the full JSON template
+    :param key: Sheet key, e.g. "classproperty"
+    :type key: str
+    :rtype: RowPlan
+    """
+
+    if isinstance(bsdd_template, TemplatePlan):
+        return bsdd_template.rows[key]
+    return RowPlan(template_part(bsdd_template, key))
@@ -0,0 +1,441 @@
+"""
+Local conversion service.
+
+``bsdd-converter serve`` keeps a pool of worker processes that have pandas,
+openpyxl and the converter imported and the given templates compiled, and
+accepts conversions over HTTP on the local machine. Jobs wait in a bounded
+queue and run on as many workers at a time as the pool has. Nothing is
+downloaded or sent anywhere: the service only listens on 127.0.0.1 by
+default, and paths in a job are paths on the machine running the service.
+
+API (JSON in and out)::
+
+    POST   /jobs        {"excel_path": ..., "template_path": ..., "output_path": ...,
+                         "options": {"remove_nulls": true, ...}}  -> 202, the job
+    GET    /jobs        all jobs still remembered
+    GET    /jobs/<id>   one job
+    DELETE /jobs/<id>   cancels a job that has not started yet
+    GET    /health      pool size, queued and running jobs
+
+A job has an "id", a "status" ("queued", "running", "done", "failed" or
+"cancelled"), its paths and options, submission/start/finish times, the
+rows per sheet and the stage spans of bsddconverter.instrument when done,
+or the error when failed. Options are the keyword arguments of
+mapper.run_excel2bsdd_conversion listed in JOB_OPTIONS.
+
+``bsdd-converter submit`` is the client: it sends a job, waits for it and
+exits with 0 or 1 like ``convert``.
+
+As jobs write files wherever the user may, web pages must not be able to
+submit them: POST bodies must be sent as ``application/json``, which
+browsers do not send cross-origin without asking, and the Host header must
+name the address the service listens on, which defeats DNS rebinding. With
+a token, every request also needs the header ``Authorization: Bearer
+<token>``; ``serve`` makes up a token and prints it unless one is given.
+"""
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_SERVER = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+# Keyword arguments of run_excel2bsdd_conversion a job may set, with the
+# JSON types of their values; None allows null
+JOB_OPTIONS = {
+    "remove_nulls": (bool,),
+    "engine": (str,),
+    "reader": (str,),
+    "serializer": (str,),
+    "compact": (bool,),
+    "cache": (bool,),
+    "previous_path": (str, None),
+    "output_format": (str,),
+    "shard_size": (int, None),
+    "shard_bytes": (int, None),
+}
+TYPE_NAMES = {bool: "true or false", str: "a string", int: "an integer", None: "null"}
+# Addresses on which the Host header cannot be checked
+ANY_ADDRESS = ("", "0.0.0.0", "::")
+# Finished jobs remembered for status requests
+KEEP_FINISHED = 1000
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is full."""
+
+def _check_option(name, value):
+    types = JOB_OPTIONS[name]
+    if value is None and None in types:
+        return
+    classes = tuple(type_ for type_ in types if type_ is not None)
+    # JSON true and false are not integers
+    if not isinstance(value, classes) or (isinstance(value, bool) and bool not in types):
+        expected = " or ".join(TYPE_NAMES[type_] for type_ in types)
+        raise ValueError(f"Option '{name}' must be {expected}, not {json.dumps(value)}.")
+
+def _warm_worker(template_paths):
+    # Pool initializer: imports the conversion stack and compiles the
+    # templates once per worker process, instead of once per job
+    from bsddconverter.mapper import run_excel2bsdd_conversion  # noqa: F401
+    from bsddconverter.plans import load_template
+    for template_path in template_paths:
+        load_template(template_path)
+
+def _run_job(excel_path, template_path, output_path, options):
+    # Runs in a worker process
+    from bsddconverter.mapper import run_excel2bsdd_conversion
+    spans = []
+    diagnostics = run_excel2bsdd_conversion(excel_path, template_path, output_path, observer=spans.append, **options)
+    rows = {span["sheet"]: span["rows"] for span in spans if span["name"] == "map"}
+    return {"rows": rows, "spans": spans, "diagnostics": diagnostics.to_list()}
+
+class ConversionService:
+    """
+    Job queue in front of a pool of warm worker processes.
+
+    :ivar workers: Number of worker processes, which is also the number of jobs running at a time
+    :ivar max_queue: Most jobs waiting to start
+    :ivar template_paths: Templates compiled by every worker at start-up
+    """
+
+    def __init__(self, workers=None, max_queue=100, template_paths=(), keep_finished=KEEP_FINISHED):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.template_paths = [os.path.abspath(path) for path in template_paths]
+        self.keep_finished = keep_finished
+        self._jobs = {}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._threads = []
+
+    def start(self):
+        """Starts the worker processes and the threads that hand them jobs."""
+        self._executor = self._new_pool()
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._dispatch, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def close(self):
+        """Stops taking jobs, lets the running ones finish and stops the workers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _new_pool(self):
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker, initargs=(self.template_paths,))
+        # Start every worker now rather than with the first jobs
+        for future in [executor.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+        return executor
+
+    def submit(self, excel_path, template_path, output_path, options=None):
+        """
+        Queues a conversion.
+
+        :param excel_path: Path to an excel file
+        :type excel_path: str
+        :param template_path: Path to JSON template file
+        :type template_path: str
+        :param output_path: Path to output JSON file
+        :type output_path: str
+        :param options: Keyword arguments of run_excel2bsdd_conversion, see JOB_OPTIONS
+        :type options: dict
+        :return: The job
+        :rtype: dict
+        :raises ValueError: for missing paths, unknown options or option values of the wrong type
+        :raises QueueFullError: if max_queue jobs are already waiting
+        """
+
+        if options is not None and not isinstance(options, dict):
+            raise ValueError("'options' must be an object")
+        options = dict(options or {})
+        for name, value in (("excel_path", excel_path), ("template_path", template_path), ("output_path", output_path)):
+            if not isinstance(value, str) or not value:
+                raise ValueError(f"'{name}' must be a path")
+        unknown = sorted(set(options) - set(JOB_OPTIONS))
+        if unknown:
+            raise ValueError(f"Unknown option(s): {', '.join(unknown)}. Use: {', '.join(JOB_OPTIONS)}.")
+        for name, value in options.items():
+            _check_option(name, value)
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "excel_path": excel_path,
+            "template_path": template_path,
+            "output_path": output_path,
+            "options": options,
+            "submitted": time.time(),
+            "started": None,
+            "finished": None,
+            "rows": None,
+            "spans": None,
+            "diagnostics": None,
+            "error": None,
+        }
+        with self._lock:
+            try:
+                self._queue.put_nowait(job["id"])
+            except queue.Full:
+                raise QueueFullError(f"{self.max_queue} jobs are already waiting, try again later.")
+            self._jobs[job["id"]] = job
+            return dict(job)
+
+    def job(self, job_id):
+        """Returns a copy of a job, or None if it is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else dict(job)
+
+    def jobs(self):
+        """Returns copies of all remembered jobs, oldest first."""
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()]
+
+    def cancel(self, job_id):
+        """
+        Cancels a queued job. Running jobs are not interrupted.
+
+        :return: The job, or None if it is unknown
+        :rtype: dict
+        """
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] == "queued":
+                job["status"] = "cancelled"
+                job["finished"] = time.time()
+            return dict(job)
+
+    def health(self):
+        """Pool size and the number of jobs per status."""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"status": "ok", "workers": self.workers, "max_queue": self.max_queue, "jobs": counts}
+
+    def _dispatch(self):
+        # One thread per worker process, so at most `workers` jobs run at a time
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            with self._lock:
+                job = self._jobs[job_id]
+                if job["status"] != "queued":
+                    continue
+                job["status"] = "running"
+                job["started"] = time.time()
+                executor = self._executor
+            try:
+                result = executor.submit(_run_job, job["excel_path"], job["template_path"], job["output_path"], job["options"]).result()
+                update = {"status": "done", **result}
+            except BrokenProcessPool as e:
+                # A worker died, e.g. out of memory; later jobs get a new pool
+                update = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+                with self._lock:
+                    if self._executor is executor:
+                        executor.shutdown(wait=False)
+                        self._executor = self._new_pool()
+            except Exception as e:
+                update = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+            with self._lock:
+                job.update(update, finished=time.time())
+                self._forget_finished()
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["finished"] is not None]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+class _Handler(BaseHTTPRequestHandler):
+    # Set on the subclass made by make_server
+    service = None
+    token = None
+    # Accepted Host headers, None for any
+    hosts = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _reply_job(self, job):
+        if job is None:
+            self._reply(404, {"error": "unknown job"})
+        else:
+            self._reply(200, job)
+
+    def _authorized(self):
+        if self.hosts is not None and (self.headers.get("Host") or "").lower() not in self.hosts:
+            self._reply(403, {"error": "wrong Host header"})
+            return False
+        if self.token is None or secrets.compare_digest(self.headers.get("Authorization") or "", f"Bearer {self.token}"):
+            return True
+        self._reply(401, {"error": "missing or wrong token"})
+        return False
+
+    def _job_id(self):
+        parts = self.path.rstrip("/").split("/")
+        if len(parts) == 3 and parts[1] == "jobs":
+            return parts[2]
+        return None
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == "/health":
+            self._reply(200, self.service.health())
+        elif self.path.rstrip("/") == "/jobs":
+            self._reply(200, self.service.jobs())
+        elif self._job_id() is not None:
+            self._reply_job(self.service.job(self._job_id()))
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if self.path.rstrip("/") != "/jobs":
+            self._reply(404, {"error": "not found"})
+            return
+        if (self.headers.get("Content-Type") or "").split(";")[0].strip().lower() != "application/json":
+            self._reply(415, {"error": "send the job as application/json"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            job = self.service.submit(request.get("excel_path"), request.get("template_path"), request.get("output_path"), request.get("options"))
+        except (ValueError, AttributeError) as e:
+            self._reply(400, {"error": str(e)})
+        except QueueFullError as e:
+            self._reply(503, {"error": str(e)})
+        else:
+            self._reply(202, job)
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        self._reply_job(self.service.cancel(self._job_id()) if self._job_id() is not None else None)
+
+def _accepted_hosts(host, port):
+    # Host headers naming the address the server listens on
+    if host in ANY_ADDRESS:
+        return None
+    names = (host, "localhost") if host == DEFAULT_HOST else (host,)
+    return frozenset((f"[{name}]:{port}" if ":" in name else f"{name}:{port}").lower() for name in names)
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+    """
+    Creates the HTTP server of a started ConversionService; call
+    serve_forever on it. Port 0 picks a free port, see server_address.
+    Requests must name host and port in their Host header (127.0.0.1 may
+    also be called localhost), unless host is an any-address like 0.0.0.0.
+    """
+
+    handler = type("Handler", (_Handler,), {"service": service, "token": token})
+    server = ThreadingHTTPServer((host, port), handler)
+    handler.hosts = _accepted_hosts(host, server.server_address[1])
+    return server
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, max_queue=100, template_paths=(), token=None):
+    """Runs the service until interrupted. Without a token, a random one is made up and printed."""
+    token = token or secrets.token_urlsafe(24)
+    with ConversionService(workers, max_queue, template_paths) as service:
+        server = make_server(service, host, port, token)
+        print(f"Conversion service on http://{server.server_address[0]}:{server.server_address[1]} with {service.workers} worker(s)")
+        print(f"Token: {token}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+def _request(server, method, path, body=None, token=None):
+    data = None if body is None else json.dumps(body).encode("utf-8")
+    request = urllib.request.Request(server.rstrip("/") + path, data=data, method=method)
+    request.add_header("Content-Type", "application/json")
+    if token:
+        request.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read())["error"]
+        except (ValueError, KeyError):
+            message = e.reason
+        raise Exception(f"Conversion service: {message} (HTTP {e.code})")
+    except urllib.error.URLError as e:
+        raise Exception(f"Conversion service not reachable at {server}: {e.reason}")
+
+def submit_job(excel_path, template_path, output_path, server=DEFAULT_SERVER, token=None, **options):
+    """
+    Sends a conversion to a running service. Relative paths are made absolute,
+    as the service may run in another folder.
+
+    :return: The queued job
+    :rtype: dict
+    """
+
+    paths = {"excel_path": excel_path, "template_path": template_path, "output_path": output_path}
+    if options.get("previous_path"):
+        options["previous_path"] = os.path.abspath(options["previous_path"])
+    body = {name: os.path.abspath(path) for name, path in paths.items()}
+    body["options"] = options
+    return _request(server, "POST", "/jobs", body, token)
+
+def get_job(job_id, server=DEFAULT_SERVER, token=None):
+    """Returns the current state of a job."""
+    return _request(server, "GET", f"/jobs/{job_id}", token=token)
+
+def wait_for_job(job_id, server=DEFAULT_SERVER, token=None, poll_seconds=0.2, timeout=None):
+    """
+    Polls a job until it is done, failed or cancelled.
+
+    :return: The finished job
+    :rtype: dict
+    :raises TimeoutError: if timeout seconds pass first
+    """
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        job = get_job(job_id, server, token)
+        if job["status"] not in ("queued", "running"):
+            return job
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"Job {job_id} is still {job['status']}")
+        time.sleep(poll_seconds)
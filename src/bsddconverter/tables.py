@@ -0,0 +1,209 @@
+"""
+Template sheets from a directory of CSV or Parquet files.
+
+Large dictionaries are often exported from a database or a script rather
+than typed into the workbook. Such exports can skip Excel: a directory holds
+one file per template sheet, named like the sheet ("Dictionary.csv",
+"Class.csv", "ClassProperty.parquet", ...). The first CSV row, or the Parquet
+column names, is the header row of the template sheet (row 7); the
+instruction rows and the two leading columns of the workbook are left out.
+A missing file is read as an empty sheet.
+
+The files are read in chunks of CHUNK_ROWS rows, CSV with the pandas C
+parser and Parquet with pyarrow (``pip install pyarrow``), and every column
+is typed by loader.normalize_column, so the tables are typed exactly like
+the cells of a workbook:
+
+* CSV fields are first typed like Excel types an entered value: TRUE and
+  FALSE become booleans, plain numbers become numbers, the rest is text;
+* DictionaryVersion and Uid are kept as text;
+* date columns hold Excel date serials, converted like date cells, or ISO
+  dates such as 2024-05-01 or 2024-05-01T12:30:00 (text or Parquet
+  timestamps), converted like date formatted cells.
+"""
+import os
+import re
+from datetime import datetime
+from bsddconverter.loader import convert_cell, normalize_column, SHEETS
+
+# Readers of table directories, and the extension of their files
+TABLE_READERS = ("csv", "parquet")
+TABLE_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet"}
+
+# Rows read at a time
+CHUNK_ROWS = 50000
+
+# Numbers as Excel writes them to CSV; "007" or "1_000" stay text
+_INTEGER = re.compile(r'-?(?:0|[1-9]\d*)')
+_DECIMAL = re.compile(r'-?(?:(?:0|[1-9]\d*)(?:\.\d+)?|\.\d+)(?:[eE][+-]?\d+)?')
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}(?:$|[ T])')
+
+
+def _sheet_file(directory, sheet_name, reader):
+    """Path of the file of a sheet; the name is matched case-insensitively."""
+    extension = TABLE_EXTENSIONS[reader]
+    wanted = (sheet_name + extension).lower()
+    for name in sorted(os.listdir(directory)):
+        if name.lower() == wanted:
+            return os.path.join(directory, name)
+    return None
+
+def table_reader(directory):
+    """
+    Reader of a table directory: "csv" or "parquet", after the files it holds.
+
+    :param directory: Directory with one file per template sheet
+    :type directory: str
+    :rtype: str
+    :raises FileNotFoundError: if the directory holds no sheet file
+    """
+
+    for reader in TABLE_READERS:
+        if any(_sheet_file(directory, sheet_name, reader) for _, sheet_name, _, _ in SHEETS):
+            return reader
+    names = ", ".join(sheet_name for _, sheet_name, _, _ in SHEETS)
+    raise FileNotFoundError(f"No template sheets found in {directory}: expected CSV or Parquet files named {names}")
+
+def _typed_cell(value):
+    """
+    Types a CSV field like Excel types an entered value, so the column is
+    then typed like a column of workbook cells: booleans, plain numbers and
+    ISO dates; everything else stays text.
+    """
+
+    if not value:
+        return value
+    upper = value.upper()
+    if upper == "TRUE":
+        return True
+    if upper == "FALSE":
+        return False
+    if _INTEGER.fullmatch(value):
+        return int(value)
+    if _DECIMAL.fullmatch(value):
+        return convert_cell(float(value))
+    if _ISO_DATE.match(value):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return value
+
+def _read_csv_columns(path, text_columns, delimiter=","):
+    import pandas as pd
+
+    columns = {}
+    chunks = pd.read_csv(path, sep=delimiter, dtype=str, keep_default_na=False, encoding="utf-8-sig", chunksize=CHUNK_ROWS)
+    for chunk in chunks:
+        for name in chunk.columns:
+            values = chunk[name].tolist()
+            if name not in text_columns:
+                values = [_typed_cell(value) for value in values]
+            columns.setdefault(name, []).extend(values)
+    if not columns:
+        # A header without rows yields no chunk
+        header = pd.read_csv(path, sep=delimiter, dtype=str, nrows=0, encoding="utf-8-sig")
+        columns = {name: [] for name in header.columns}
+    return columns
+
+def _read_parquet_columns(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet files needs pyarrow: pip install pyarrow")
+
+    parquet = pq.ParquetFile(path)
+    columns = {name: [] for name in parquet.schema_arrow.names}
+    for batch in parquet.iter_batches(batch_size=CHUNK_ROWS):
+        for name, values in zip(batch.schema.names, batch.columns):
+            values = [convert_cell(value) for value in values.to_pylist()]
+            if "Date" in name:
+                # Dates stored as text
+                values = [_typed_cell(value) if isinstance(value, str) else value for value in values]
+            columns[name].extend(values)
+    return columns
+
+def _drop_trailing_blank_rows(columns):
+    # The workbook loaders drop them too; they would change the column types
+    length = max((len(values) for values in columns.values()), default=0)
+    while length and all(values[length - 1] == "" for values in columns.values()):
+        length -= 1
+    return {name: values[:length] for name, values in columns.items()}
+
+def read_table(path, reader, text_columns=(), delimiter=","):
+    """
+    Reads one sheet file into typed columns, like loader.read_sheet.
+
+    :param path: Path to a CSV or Parquet file
+    :type path: str
+    :param reader: "csv" or "parquet"
+    :type reader: str
+    :param text_columns: Columns to keep as text
+    :type text_columns: tuple
+    :param delimiter: Field delimiter of CSV files
+    :type delimiter: str
+    :return: Column name -> list of values, in file order
+    :rtype: dict
+    """
+
+    if reader == "csv":
+        columns = _read_csv_columns(path, text_columns, delimiter)
+    else:
+        columns = _read_parquet_columns(path)
+    columns = _drop_trailing_blank_rows(columns)
+    return {name: normalize_column(values, as_text=name in text_columns) for name, values in columns.items()}
+
+def _check_reader(directory, reader):
+    if not os.path.isdir(directory):
+        raise NotADirectoryError(f"Not a directory of CSV or Parquet files: {directory}")
+    if reader is None:
+        return table_reader(directory)
+    if reader not in TABLE_READERS:
+        raise ValueError(f"Unknown table reader: '{reader}'. Use 'csv' or 'parquet'.")
+    return reader
+
+def load_table(directory, key, reader=None, delimiter=","):
+    """
+    Reads a single template sheet from a table directory.
+
+    :param directory: Directory with one file per template sheet
+    :type directory: str
+    :param key: Sheet key as used by load_excel, e.g. "classproperty"
+    :type key: str
+    :param reader: "csv", "parquet" or None to pick it after the files
+    :type reader: str
+    :param delimiter: Field delimiter of CSV files
+    :type delimiter: str
+    :return: Typed columns of the sheet
+    :rtype: dict
+    """
+
+    reader = _check_reader(directory, reader)
+    for sheet_key, sheet_name, usecols, text_columns in SHEETS:
+        if sheet_key == key:
+            path = _sheet_file(directory, sheet_name, reader)
+            return read_table(path, reader, text_columns, delimiter) if path else {}
+    raise ValueError(f"Unknown sheet key: '{key}'")
+
+def iter_tables(directory, reader=None, keys=None, delimiter=","):
+    """
+    Reads the template sheets of a table directory one after another.
+
+    :param directory: Directory with one file per template sheet
+    :type directory: str
+    :param reader: "csv", "parquet" or None to pick it after the files
+    :type reader: str
+    :param keys: Only read these sheet keys, defaults to all
+    :type keys: list
+    :param delimiter: Field delimiter of CSV files
+    :type delimiter: str
+    :return: (key, typed columns) per sheet, in SHEETS order
+    :rtype: generator
+    """
+
+    reader = _check_reader(directory, reader)
+    for key, sheet_name, usecols, text_columns in SHEETS:
+        if keys is not None and key not in keys:
+            continue
+        path = _sheet_file(directory, sheet_name, reader)
+        yield key, read_table(path, reader, text_columns, delimiter) if path else {}
@@ -0,0 +1,307 @@
+"""
+Referential integrity check of a workbook, without converting it.
+
+Only the code and reference columns of the seven sheets are read, straight
+from the XML of the sheets, which takes a fraction of the time openpyxl needs
+to read every cell of a large workbook. The codes
+of every sheet are collected into sets first, then every reference is looked
+up once, so all broken references are found in one pass:
+
+* Class: duplicate Codes, ParentClassCode without a Class
+* Property: duplicate Codes
+* ClassProperty: (Origin Class Code) and PropertyCode without a Class or
+  Property, rows with neither PropertyCode nor PropertyUri
+* ClassRelation: (Origin Class Code), RelatedClassUri pointing into this
+  dictionary at a Class that does not exist
+* AllowedValue: (Origin Property Code) and (Origin ClassProperty Code)
+  without a Property or ClassProperty, rows with neither
+* PropertyRelation: (Origin Property Code), RelatedPropertyUri pointing into
+  this dictionary at a Property that does not exist
+
+Every problem is a dictionary with the sheet name, Excel row number, column,
+value and a message, see format_problems.
+"""
+import zipfile
+from itertools import compress
+from xml.etree.ElementTree import iterparse
+from openpyxl.reader.strings import read_string_table
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import from_ISO8601
+from bsddconverter.loader import column_names, convert_cell, is_blank, normalize_column, sheet_parts, HEADER_ROW, MAIN_NS, SHEETS
+
+# Columns read per sheet key
+KEY_COLUMNS = {
+    'dictionary': ('OrganizationCode', 'DictionaryCode', 'DictionaryVersion', 'UseOwnUri', 'DictionaryUri'),
+    'class': ('Code', 'ParentClassCode'),
+    'property': ('Code',),
+    'classproperty': ('(Origin Class Code)', 'Code', 'PropertyCode', 'PropertyUri'),
+    'classrelation': ('(Origin Class Code)', 'RelatedClassUri'),
+    'allowedvalue': ('(Origin Property Code)', '(Origin ClassProperty Code)'),
+    'propertyrelation': ('(Origin Property Code)', 'RelatedPropertyUri'),
+}
+
+# Namespace of dictionaries hosted by bSDD
+BSDD_URI = "https://identifier.buildingsmart.org/uri"
+
+_ROW, _CELL = f"{MAIN_NS}row", f"{MAIN_NS}c"
+_VALUE, _INLINE = f"{MAIN_NS}v", f"{MAIN_NS}is"
+_TEXT, _RUN_TEXT = f"{MAIN_NS}t", f"{MAIN_NS}r/{MAIN_NS}t"
+
+
+def _cell_value(cell, strings):
+    # Value of a cell like openpyxl's data_only reader gives it, except that
+    # numbers formatted as dates stay numbers: codes are never dates
+    if cell is None:
+        return None
+    kind = cell.get("t", "n")
+    if kind == "inlineStr":
+        child = cell.find(_INLINE)
+        if child is None:
+            return None
+        # The text and the text of the formatted runs, like openpyxl's Text.content
+        return "".join(node.text or "" for node in [child.find(_TEXT), *child.findall(_RUN_TEXT)] if node is not None)
+    value = cell.findtext(_VALUE) or None
+    if value is None:
+        return None
+    if kind == "n":
+        return float(value) if "." in value or "E" in value or "e" in value else int(value)
+    if kind == "s":
+        return strings[int(value)]
+    if kind == "b":
+        return bool(int(value))
+    if kind == "d":
+        return from_ISO8601(value)
+    return value
+
+def _iter_rows(source):
+    """Yields (row number, {column number: cell element}) for every row of a sheet."""
+    number = 0
+    for event, element in iterparse(source):
+        if element.tag != _ROW:
+            continue
+        number = int(element.get("r") or number + 1)
+        cells = {}
+        column = 0
+        for cell in element.iter(_CELL):
+            reference = cell.get("r")
+            column = column_index_from_string(reference.rstrip("0123456789")) if reference else column + 1
+            cells[column] = cell
+        yield number, cells
+        element.clear()
+
+def read_key_columns(source, strings, usecols, names, text_columns=()):
+    """
+    Reads only some columns of a template sheet, with the Excel row number of
+    every non-blank row, straight from the sheet XML. Values are typed like
+    loader.read_sheet types them, and rows are blank when all their cells in
+    ``usecols`` are, as in the conversion.
+
+    :param source: XML part of the sheet, as a file object
+    :param strings: Shared strings of the workbook
+    :type strings: list
+    :param usecols: Excel column range, e.g. "C:R"
+    :type usecols: str
+    :param names: Columns to read; columns missing from the sheet are left out
+    :type names: tuple
+    :param text_columns: Columns to keep as text
+    :type text_columns: tuple
+    :return: Row numbers of the non-blank rows, and column name -> values of those rows
+    :rtype: tuple
+    """
+
+    first, last = (column_index_from_string(column) for column in usecols.split(":"))
+    positions = None
+    numbers = []
+    cells = []
+    kept = 0
+    for number, row in _iter_rows(source):
+        if number < HEADER_ROW:
+            continue
+        if positions is None:
+            if number > HEADER_ROW:
+                row = {}
+            header = [convert_cell(_cell_value(row.get(column), strings)) for column in range(first, last + 1)]
+            positions = {name: first + offset for offset, name in enumerate(column_names(header, first)) if name in names}
+            if number == HEADER_ROW:
+                continue
+        # Rows missing from the XML are empty rows
+        while len(numbers) + HEADER_ROW + 1 < number:
+            numbers.append(None)
+            cells.append(("",) * len(positions))
+        # Cells are only read until one with a value is found
+        blank = all(is_blank(convert_cell(_cell_value(cell, strings))) for column, cell in row.items() if first <= column <= last)
+        numbers.append(None if blank else number)
+        cells.append(tuple(convert_cell(_cell_value(row.get(column), strings)) for column in positions.values()))
+        if not blank or any(_cell_value(cell, strings) not in (None, "") for cell in row.values()):
+            kept = len(numbers)
+    if positions is None:
+        return [], {}
+    # Blank rows before the last filled one are typed with the column, as in read_sheet
+    del numbers[kept:], cells[kept:]
+
+    keep = [number is not None for number in numbers]
+    columns = {}
+    for position, name in enumerate(positions):
+        values = normalize_column([row[position] for row in cells], as_text=name in text_columns)
+        columns[name] = list(compress(values, keep))
+    return list(compress(numbers, keep)), columns
+
+def read_keys(EXCEL_PATH):
+    """
+    Reads the KEY_COLUMNS of every template sheet.
+
+    :param EXCEL_PATH: Path to an excel file
+    :type EXCEL_PATH: str
+    :return: Sheet key -> (sheet name, row numbers, columns); None for missing sheets
+    :rtype: dict
+    """
+
+    try:
+        archive = zipfile.ZipFile(EXCEL_PATH)
+    except PermissionError:
+        raise Exception("Excel file is open. Please close it and try again.")
+    with archive:
+        parts = sheet_parts(archive)[0]
+        strings = []
+        if "xl/sharedStrings.xml" in archive.namelist():
+            with archive.open("xl/sharedStrings.xml") as source:
+                strings = read_string_table(source)
+        sheets = {}
+        for key, sheet_name, usecols, text_columns in SHEETS:
+            if sheet_name not in parts:
+                sheets[key] = None
+                continue
+            with archive.open(parts[sheet_name]) as source:
+                numbers, columns = read_key_columns(source, strings, usecols, KEY_COLUMNS[key], text_columns)
+            sheets[key] = (sheet_name, numbers, columns)
+        return sheets
+
+def _column(sheet, name):
+    sheet_name, numbers, columns = sheet
+    return columns.get(name, [None] * len(numbers))
+
+def _problem(sheet, number, column, value, message):
+    return {"sheet": sheet[0], "row": number, "column": column, "value": value, "message": message}
+
+def _code_rows(sheet, problems, column="Code"):
+    """Row number of every Code of a sheet, noting duplicates."""
+    rows = {}
+    for number, code in zip(sheet[1], _column(sheet, column)):
+        if code is None:
+            continue
+        first = rows.setdefault(code, number)
+        if first != number:
+            problems.append(_problem(sheet, number, column, code, f"duplicate Code, first used in row {first}"))
+    return rows
+
+def _check_origins(sheet, column, codes, parent, problems, optional=False):
+    for number, code in zip(sheet[1], _column(sheet, column)):
+        if code is None:
+            if not optional:
+                problems.append(_problem(sheet, number, column, None, f"no {parent} code filled in"))
+        elif code not in codes:
+            problems.append(_problem(sheet, number, column, code, f"no {parent} with this Code"))
+
+def _check_uris(sheet, column, prefixes, codes, parent, problems):
+    # Codes end the URI as text, also the ones read as numbers
+    codes = {str(code) for code in codes}
+    for number, uri in zip(sheet[1], _column(sheet, column)):
+        if uri is None:
+            problems.append(_problem(sheet, number, column, None, "no URI filled in"))
+            continue
+        for prefix in prefixes:
+            if isinstance(uri, str) and uri.startswith(prefix) and uri[len(prefix):] not in codes:
+                problems.append(_problem(sheet, number, column, uri, f"no {parent} with Code '{uri[len(prefix):]}' in this dictionary"))
+
+def dictionary_uris(dictionary):
+    """
+    URIs under which the dictionary of the workbook is published: the bSDD
+    namespace of its organization, code and version, and its own URI if
+    UseOwnUri is set.
+
+    :param dictionary: Columns of the Dictionary sheet, see read_keys
+    :type dictionary: dict
+    :rtype: list
+    """
+
+    row = {name: values[0] for name, values in dictionary.items() if values}
+    uris = []
+    if all(row.get(name) is not None for name in ('OrganizationCode', 'DictionaryCode', 'DictionaryVersion')):
+        uris.append(f"{BSDD_URI}/{row['OrganizationCode']}/{row['DictionaryCode']}/{row['DictionaryVersion']}")
+    if row.get('UseOwnUri') and isinstance(row.get('DictionaryUri'), str):
+        uris.append(row['DictionaryUri'].rstrip("/"))
+    return uris
+
+def check_references(EXCEL_PATH):
+    """
+    Checks every code reference between the sheets of a workbook.
+
+    :param EXCEL_PATH: Path to an excel file
+    :type EXCEL_PATH: str
+    :return: Problems, sorted by sheet and row
+    :rtype: list
+    """
+
+    sheets = read_keys(EXCEL_PATH)
+    problems = []
+    for key, sheet_name, usecols, text_columns in SHEETS:
+        if sheets[key] is None:
+            problems.append({"sheet": sheet_name, "row": None, "column": None, "value": None, "message": "sheet is missing"})
+            sheets[key] = (sheet_name, [], {})
+        elif key == 'dictionary' and not sheets[key][1]:
+            problems.append({"sheet": sheet_name, "row": None, "column": None, "value": None, "message": "no dictionary row filled in"})
+
+    classes, properties = sheets['class'], sheets['property']
+    cls_props, cls_rels = sheets['classproperty'], sheets['classrelation']
+    allowed_vals, prop_rels = sheets['allowedvalue'], sheets['propertyrelation']
+    uris = dictionary_uris(sheets['dictionary'][2])
+
+    class_codes = _code_rows(classes, problems)
+    property_codes = _code_rows(properties, problems)
+    _check_origins(classes, 'ParentClassCode', class_codes, "Class", problems, optional=True)
+
+    _check_origins(cls_props, '(Origin Class Code)', class_codes, "Class", problems)
+    _check_origins(cls_props, 'PropertyCode', property_codes, "Property", problems, optional=True)
+    for number, code, uri in zip(cls_props[1], _column(cls_props, 'PropertyCode'), _column(cls_props, 'PropertyUri')):
+        if code is None and uri is None:
+            problems.append(_problem(cls_props, number, 'PropertyCode', None, "neither PropertyCode nor PropertyUri filled in"))
+
+    _check_origins(cls_rels, '(Origin Class Code)', class_codes, "Class", problems)
+    _check_uris(cls_rels, 'RelatedClassUri', [f"{uri}/class/" for uri in uris], class_codes, "Class", problems)
+
+    # ClassProperty codes are only unique within a class, any of them will do
+    cls_prop_codes = set(code for code in _column(cls_props, 'Code') if code is not None)
+    _check_origins(allowed_vals, '(Origin Property Code)', property_codes, "Property", problems, optional=True)
+    for number, prop_code, cls_prop_code in zip(allowed_vals[1], _column(allowed_vals, '(Origin Property Code)'), _column(allowed_vals, '(Origin ClassProperty Code)')):
+        if prop_code is None and cls_prop_code is None:
+            problems.append(_problem(allowed_vals, number, '(Origin Property Code)', None, "neither origin Property nor ClassProperty code filled in"))
+        elif prop_code is None and cls_prop_code not in cls_prop_codes:
+            problems.append(_problem(allowed_vals, number, '(Origin ClassProperty Code)', cls_prop_code, "no ClassProperty with this Code"))
+
+    _check_origins(prop_rels, '(Origin Property Code)', property_codes, "Property", problems)
+    _check_uris(prop_rels, 'RelatedPropertyUri', [f"{uri}/prop/" for uri in uris], property_codes, "Property", problems)
+
+    order = [sheet_name for key, sheet_name, usecols, text_columns in SHEETS]
+    problems.sort(key=lambda problem: (order.index(problem["sheet"]), problem["row"] or 0))
+    return problems
+
+def format_problems(problems):
+    """
+    Formats the problems of check_references as a report, one line each.
+
+    :param problems: Problems from check_references
+    :type problems: list
+    :rtype: str
+    """
+
+    if not problems:
+        return "No broken references found."
+    lines = [f"{len(problems)} problem(s) found:"]
+    for problem in problems:
+        where = problem["sheet"] if problem["row"] is None else f"{problem['sheet']} row {problem['row']}"
+        if problem["column"] is not None:
+            where += f", {problem['column']}"
+            if problem["value"] is not None:
+                where += f" '{problem['value']}'"
+        lines.append(f"  {where}: {problem['message']}")
+    return "\n".join(lines)
@@ -0,0 +1,429 @@
+"""
+Streaming JSON writer.
+
+Writes a bSDD dictionary to disk one top-level field, and one Class or
+Property, at a time. Empty fields are dropped per object, so neither the
+document string nor a cleaned copy of the whole tree is ever built.
+
+Serializers: "json" (the standard library) writes exactly the text of
+``json.dump(..., ensure_ascii=False, indent=2)``. "orjson" and "ujson" are
+much faster C encoders; "auto" picks orjson when it is installed and falls
+back to "json" otherwise. All backends produce the same document once it is
+parsed again: they only differ in how floats are spelled (``1e-07`` against
+``1e-7``). The one exception are NaN and Infinity, which are not valid JSON;
+"json" writes them as ``NaN``/``Infinity``, orjson as ``null`` and ujson
+refuses them. Blank cells never reach the writer as NaN.
+
+``compact=True`` writes the document without any whitespace, for uploads to
+the bSDD API; parsed, it is the same document as the pretty one.
+
+Very large dictionaries can also be written in two other formats, see
+write_output:
+
+* "shards": the Classes and Properties are spread over numbered part files
+  (``data-0001.json``, ...), each a complete import document with the same
+  dictionary fields, holding at most a number of Classes and Properties or
+  a number of bytes. The output file itself lists the parts::
+
+      {"Format": 1, "Classes": 2400, "Properties": 310, "Parts": [
+        {"File": "data-0001.json", "Classes": 1000, "Properties": 0, "Bytes": 4190221}, ...]}
+
+* "ndjson": one JSON object per line, the dictionary fields first, then
+  every Class and then every Property. ``data.index.json`` next to it gives
+  the byte offset and length of every line by Code, so one Class can be read
+  without parsing the rest::
+
+      {"Format": 1, "Data": "data.ndjson", "Header": [0, 412],
+       "Classes": {"SIGN": [413, 5120], ...}, "Properties": {...}}
+"""
+import json
+import os
+from collections.abc import Iterator
+from itertools import chain
+
+INDENT = "  "
+SERIALIZERS = ("auto", "orjson", "ujson", "json")
+OUTPUT_FORMATS = ("json", "shards", "ndjson")
+# Version of the shard manifest and of the NDJSON index
+MANIFEST_FORMAT = 1
+INDEX_FORMAT = 1
+_END = object()
+
+
+def is_empty(value):
+    """True for the values clean_nones drops: None, "" and []."""
+    # Same test as clean_nones, without comparing dicts against a list
+    return value is None or (isinstance(value, (str, list)) and not value)
+
+def drop_empty(value):
+    """
+    Recursively removes None, "" and [] from dictionaries and lists, like
+    mapper.clean_nones. Lists that only become empty after cleaning are kept.
+    """
+
+    if isinstance(value, list):
+        return [drop_empty(x) for x in value if not is_empty(x)]
+    if isinstance(value, dict):
+        return {key: drop_empty(val) for key, val in value.items() if not is_empty(val)}
+    return value
+
+def resolve_serializer(serializer="auto"):
+    """
+    Returns the name of the backend used for a serializer option.
+
+    :param serializer: "auto", "orjson", "ujson" or "json"
+    :type serializer: str
+    :return: "orjson", "ujson" or "json"
+    :rtype: str
+    """
+
+    if serializer not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer: '{serializer}'. Use one of: {', '.join(SERIALIZERS)}.")
+    if serializer != "auto":
+        return serializer
+    try:
+        import orjson  # noqa: F401
+        return "orjson"
+    except ImportError:
+        return "json"
+
+def _encoder(serializer, compact):
+    """Returns a function serializing a value on its own, as UTF-8 bytes."""
+    serializer = resolve_serializer(serializer)
+    if serializer == "orjson":
+        import orjson
+        option = 0 if compact else orjson.OPT_INDENT_2
+        return lambda value: orjson.dumps(value, option=option)
+    if serializer == "ujson":
+        import ujson
+        indent = 0 if compact else 2
+        return lambda value: ujson.dumps(value, ensure_ascii=False, indent=indent, escape_forward_slashes=False).encode("utf-8")
+    if compact:
+        return lambda value: json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return lambda value: json.dumps(value, ensure_ascii=False, indent=2).encode("utf-8")
+
+def _layout(compact):
+    """
+    Byte strings around the fields and list elements, as the encoders place
+    them. Line ends are the platform's, like json.dump into a text file.
+    """
+
+    if compact:
+        return {"newline": b"", "indent": b"", "key_separator": b":"}
+    return {"newline": os.linesep.encode(), "indent": INDENT.encode(), "key_separator": b": "}
+
+def _encode_items(items, remove_nulls, dumps, layout):
+    """Yields the text of every element of a list at nesting level one."""
+    nested = layout["newline"] + layout["indent"] * 2
+    for item in items:
+        if remove_nulls:
+            if is_empty(item):
+                continue
+            item = drop_empty(item)
+        text = dumps(item)
+        if layout["newline"]:
+            text = text.replace(b"\n", nested)
+        yield text
+
+def _iter_encoded(texts, layout):
+    """Yields the chunks of a list at nesting level one from its encoded elements."""
+    newline, indent = layout["newline"], layout["indent"]
+    nested = newline + indent * 2
+    first = True
+    for text in texts:
+        yield (b"[" if first else b",") + nested + text
+        first = False
+    yield b"[]" if first else newline + indent + b"]"
+
+def _iter_array(items, remove_nulls, dumps, layout):
+    """Yields the chunks of a list value at nesting level one, element by element."""
+    return _iter_encoded(_encode_items(items, remove_nulls, dumps, layout), layout)
+
+class _Encoded(list):
+    """Elements of a list field that are already encoded, see write_shards."""
+
+def iter_document(fields, remove_nulls=False, serializer="json", compact=False):
+    """
+    Yields the UTF-8 text of a JSON object in chunks.
+
+    :param fields: (key, value) pairs of the object. Values that are iterators
+        are written as lists, one element at a time.
+    :type fields: iterable
+    :param remove_nulls: Drop empty fields, as clean_nones does
+    :type remove_nulls: bool
+    :param serializer: JSON backend, see SERIALIZERS
+    :type serializer: str
+    :param compact: Leave out all whitespace instead of indenting by two spaces
+    :type compact: bool
+    """
+
+    dumps = _encoder(serializer, compact)
+    layout = _layout(compact)
+    newline, indent = layout["newline"], layout["indent"]
+    nested = newline + indent
+    first = True
+    for key, value in fields:
+        if isinstance(value, _Encoded):
+            if remove_nulls and not value:
+                continue
+            chunks = _iter_encoded(value, layout)
+        elif isinstance(value, Iterator):
+            head = next(value, _END)
+            if head is _END:
+                if remove_nulls:
+                    continue
+                chunks = iter((b"[]",))
+            else:
+                chunks = _iter_array(chain((head,), value), remove_nulls, dumps, layout)
+        else:
+            if remove_nulls:
+                if is_empty(value):
+                    continue
+                value = drop_empty(value)
+            text = dumps(value)
+            if newline:
+                text = text.replace(b"\n", nested)
+            chunks = iter((text,))
+        yield (b"{" if first else b",") + nested + dumps(key) + layout["key_separator"] + next(chunks)
+        yield from chunks
+        first = False
+    yield b"{}" if first else newline + b"}"
+
+def write_document(fields, output_path, remove_nulls=False, serializer="json", compact=False):
+    """
+    Writes a JSON object to a file incrementally, see iter_document. The file
+    only appears once it is complete.
+
+    :param fields: (key, value) pairs of the object, list values may be iterators
+    :type fields: iterable
+    :param output_path: Path to output JSON file
+    :type output_path: str
+    :param remove_nulls: Drop empty fields
+    :type remove_nulls: bool
+    :param serializer: JSON backend, see SERIALIZERS
+    :type serializer: str
+    :param compact: Write without whitespace
+    :type compact: bool
+    """
+
+    _write_atomically(iter_document(fields, remove_nulls, serializer, compact), output_path)
+
+def _write_atomically(chunks, output_path):
+    # Written next to the target and renamed at the end, so a failed or
+    # cancelled conversion never leaves a truncated file behind
+    partial_path = output_path + ".part"
+    try:
+        with open(partial_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(partial_path, output_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+def write_bsdd(bsdd_data, output_path, remove_nulls=False, serializer="json", compact=False):
+    """
+    Writes an assembled bSDD dictionary, streaming its Classes and Properties.
+
+    :param bsdd_data: Resultant JSON structure
+    :type bsdd_data: dict
+    :param output_path: Path to output JSON file
+    :type output_path: str
+    :param remove_nulls: Drop empty fields
+    :type remove_nulls: bool
+    :param serializer: JSON backend, see SERIALIZERS
+    :type serializer: str
+    :param compact: Write without whitespace
+    :type compact: bool
+    """
+
+    fields = [(key, iter(value) if isinstance(value, list) else value) for key, value in bsdd_data.items()]
+    write_document(fields, output_path, remove_nulls, serializer, compact)
+
+def check_output_format(output_format, shard_size=None, shard_bytes=None):
+    """Raises ValueError for an unknown output format or shards without a limit."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: '{output_format}'. Use one of: {', '.join(OUTPUT_FORMATS)}.")
+    if output_format == "shards" and not shard_size and not shard_bytes:
+        raise ValueError("Sharded output needs a number of Classes and Properties or of bytes per part.")
+
+def write_output(fields, output_path, output_format="json", remove_nulls=False, serializer="json", compact=False, shard_size=None, shard_bytes=None):
+    """
+    Writes a JSON object in one of the OUTPUT_FORMATS.
+
+    :param fields: (key, value) pairs of the object; list values that are iterators are streamed
+    :type fields: iterable
+    :param output_path: Path to output JSON file; the manifest for "shards"
+    :type output_path: str
+    :param output_format: "json", "shards" or "ndjson", see the module docstring
+    :type output_format: str
+    :param remove_nulls: Drop empty fields
+    :type remove_nulls: bool
+    :param serializer: JSON backend, see SERIALIZERS
+    :type serializer: str
+    :param compact: Write without whitespace; NDJSON is always compact
+    :type compact: bool
+    :param shard_size: Most Classes and Properties in one part
+    :type shard_size: int
+    :param shard_bytes: Most bytes in one part
+    :type shard_bytes: int
+    """
+
+    check_output_format(output_format, shard_size, shard_bytes)
+    if output_format == "shards":
+        write_shards(fields, output_path, shard_size, shard_bytes, remove_nulls, serializer, compact)
+    elif output_format == "ndjson":
+        write_ndjson(fields, output_path, remove_nulls, serializer)
+    else:
+        write_document(fields, output_path, remove_nulls, serializer, compact)
+
+def part_path(output_path, number):
+    """Path of a part of a sharded output: data.json -> data-0001.json."""
+    root, ext = os.path.splitext(output_path)
+    return f"{root}-{number:04d}{ext or '.json'}"
+
+def _previous_parts(output_path):
+    # Parts listed by an earlier manifest at the same path
+    try:
+        with open(output_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        return {os.path.join(os.path.dirname(output_path), part["File"]) for part in manifest["Parts"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        return set()
+
+def write_shards(fields, output_path, shard_size=None, shard_bytes=None, remove_nulls=False, serializer="json", compact=False):
+    """
+    Writes a JSON object as numbered part files and a manifest, see the module
+    docstring. Every list field given as an iterator is spread over the parts;
+    all other fields are repeated in every part. A single element larger than
+    shard_bytes gets a part of its own. Parts of an earlier manifest at
+    output_path that are not written again are removed.
+
+    :param fields: (key, value) pairs of the object
+    :type fields: iterable
+    :param output_path: Path of the manifest
+    :type output_path: str
+    :param shard_size: Most list elements in one part
+    :type shard_size: int
+    :param shard_bytes: Most bytes in one part
+    :type shard_bytes: int
+    :return: Paths of the parts
+    :rtype: list
+    """
+
+    check_output_format("shards", shard_size, shard_bytes)
+    dumps = _encoder(serializer, compact)
+    layout = _layout(compact)
+    fields = list(fields)
+    arrays = [key for key, value in fields if isinstance(value, Iterator)]
+    # Bytes an element adds to its list: separator, line break and indent
+    separator = 1 + len(layout["newline"] + layout["indent"] * 2)
+
+    def render(part):
+        part_fields = [(key, _Encoded(part[key]) if key in part else value) for key, value in fields]
+        return iter_document(part_fields, remove_nulls, serializer, compact)
+
+    base_sizes = {}
+    def base_size(filled):
+        # Size of a part whose filled lists hold one empty element, less that element
+        if filled not in base_sizes:
+            part = {key: [b""] if key in filled else [] for key in arrays}
+            base_sizes[filled] = sum(len(chunk) for chunk in render(part)) - separator * len(filled)
+        return base_sizes[filled]
+
+    previous = _previous_parts(output_path)
+    parts = []
+    part = {key: [] for key in arrays}
+    used = 0
+
+    def flush():
+        path = part_path(output_path, len(parts) + 1)
+        _write_atomically(render(part), path)
+        counts = {key: len(part[key]) for key in arrays}
+        parts.append(dict(File=os.path.basename(path), **counts, Bytes=os.path.getsize(path)))
+
+    values = dict(fields)
+    for key in arrays:
+        for text in _encode_items(values[key], remove_nulls, dumps, layout):
+            count = sum(len(texts) for texts in part.values())
+            if count:
+                filled = frozenset(name for name in arrays if part[name] or name == key)
+                full = shard_size and count >= shard_size
+                if shard_bytes and base_size(filled) + used + separator + len(text) > shard_bytes:
+                    full = True
+                if full:
+                    flush()
+                    part = {name: [] for name in arrays}
+                    used = 0
+            part[key].append(text)
+            used += separator + len(text)
+    if not parts or any(part.values()):
+        flush()
+
+    totals = {key: sum(entry[key] for entry in parts) for key in arrays}
+    manifest = dict(Format=MANIFEST_FORMAT, **totals, Parts=parts)
+    write_document(list(manifest.items()), output_path, serializer="json")
+
+    paths = [os.path.join(os.path.dirname(output_path), entry["File"]) for entry in parts]
+    for path in previous - set(paths):
+        if os.path.exists(path):
+            os.remove(path)
+    return paths
+
+def ndjson_index_path(output_path):
+    """Path of the index of an NDJSON output: data.ndjson -> data.index.json."""
+    return os.path.splitext(output_path)[0] + ".index.json"
+
+def write_ndjson(fields, output_path, remove_nulls=False, serializer="json"):
+    """
+    Writes a JSON object as NDJSON with an index of byte offsets, see the
+    module docstring. Lines end with a single line feed on every platform.
+
+    :param fields: (key, value) pairs of the object; the elements of iterator values get a line each
+    :type fields: iterable
+    :param output_path: Path of the NDJSON file
+    :type output_path: str
+    :param remove_nulls: Drop empty fields
+    :type remove_nulls: bool
+    :param serializer: JSON backend, see SERIALIZERS
+    :type serializer: str
+    :return: Path of the index
+    :rtype: str
+    """
+
+    dumps = _encoder(serializer, compact=True)
+    fields = list(fields)
+    index = {"Format": INDEX_FORMAT, "Data": os.path.basename(output_path)}
+
+    def lines():
+        header = {}
+        for key, value in fields:
+            if isinstance(value, Iterator) or (remove_nulls and is_empty(value)):
+                continue
+            header[key] = drop_empty(value) if remove_nulls else value
+        line = dumps(header) + b"\n"
+        index["Header"] = [0, len(line) - 1]
+        offset = len(line)
+        yield line
+
+        for key, value in fields:
+            if not isinstance(value, Iterator):
+                continue
+            # Duplicate codes point at the first line with the code
+            offsets = index[key] = {}
+            for item in value:
+                if remove_nulls:
+                    if is_empty(item):
+                        continue
+                    item = drop_empty(item)
+                line = dumps(item) + b"\n"
+                if isinstance(item, dict):
+                    offsets.setdefault(str(item.get("Code")), [offset, len(line) - 1])
+                offset += len(line)
+                yield line
+
+    _write_atomically(lines(), output_path)
+    index_path = ndjson_index_path(output_path)
+    write_document(list(index.items()), index_path, serializer="json", compact=True)
+    return index_path
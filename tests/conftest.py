@@ -0,0 +1,27 @@
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--runslow", action="store_true", help="also run the wall-clock tests marked slow")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: wall-clock test, only run with --runslow")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--runslow"):
+        return
+    skip = pytest.mark.skip(reason="wall-clock test, run with --runslow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def sheet_cache_dir(tmp_path_factory):
+    # Conversions cache parsed sheets by default; keep them out of the user's cache folder.
+    # Session-wide, so worker processes started by module fixtures see it too.
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("BSDD_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+        yield
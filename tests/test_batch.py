@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter import batch
+from bsddconverter.batch import _convert_one, run_batch
+from bsddconverter.cli import main
+from bsddconverter.mapper import run_excel2bsdd_conversion
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+
+def test_batch_reports_failures_without_stopping(tmp_path):
+    broken = tmp_path / "broken.xlsx"
+    broken.write_text("not a workbook")
+    output_dir = tmp_path / "out"
+
+    summary = run_batch([TEST_EXCEL, str(broken)], TEST_TEMPLATE, str(output_dir), workers=2)
+
+    assert (summary["converted"], summary["failed"]) == (1, 1)
+    good, bad = summary["files"]
+    assert good["status"] == "ok" and good["rows"]["class"] > 0
+    assert bad["status"] == "failed" and bad["error"]
+    assert json.loads((output_dir / "batch-summary.json").read_text(encoding="utf-8")) == summary
+
+    serial = tmp_path / "serial.json"
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(serial))
+    assert (output_dir / "test_excel_dd.json").read_bytes() == serial.read_bytes()
+
+
+def _convert_or_crash(excel_path, *args):
+    if "crash" in os.path.basename(excel_path):
+        os._exit(1)
+    return _convert_one(excel_path, *args)
+
+def test_a_dying_worker_fails_only_its_workbook(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "_convert_one", _convert_or_crash)
+    crash, other = tmp_path / "crash.xlsx", tmp_path / "other.xlsx"
+    for path in (crash, other):
+        with open(TEST_EXCEL, "rb") as f:
+            path.write_bytes(f.read())
+    reports = []
+
+    summary = run_batch([TEST_EXCEL, str(crash), str(other)], TEST_TEMPLATE, str(tmp_path / "out"), workers=2, on_report=reports.append, cache=False)
+
+    assert [report["status"] for report in summary["files"]] == ["ok", "failed", "ok"]
+    assert "BrokenProcessPool" in summary["files"][1]["error"]
+    assert reports == summary["files"]
+
+
+def test_cli_convert_and_batch_exit_codes(tmp_path):
+    output = tmp_path / "single.json"
+    assert main(["convert", TEST_EXCEL, TEST_TEMPLATE, str(output)]) == 0
+    assert output.exists()
+    assert main(["batch", str(tmp_path / "missing-*.xlsx"), "--template", TEST_TEMPLATE, "--output-dir", str(tmp_path / "out")]) == 1
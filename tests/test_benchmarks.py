@@ -0,0 +1,43 @@
+import json
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+from generate_workbook import generate_workbook
+from run_benchmarks import run_benchmarks
+from bsddconverter.mapper import run_excel2bsdd_conversion
+
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+
+def test_generated_workbook_converts(tmp_path):
+    excel_path = str(tmp_path / "bench.xlsx")
+    counts = generate_workbook(excel_path, classes=30, properties=8, class_properties=3, allowed_values=2, class_relations=2, property_relations=1)
+    assert counts == {'dictionary': 1, 'class': 30, 'property': 8, 'classproperty': 90, 'classrelation': 60, 'allowedvalue': 16, 'propertyrelation': 8}
+
+    outputs = []
+    for reader in ("openpyxl", "pandas"):
+        output_path = str(tmp_path / f"{reader}.json")
+        run_excel2bsdd_conversion(excel_path, TEST_TEMPLATE, output_path, reader=reader, cache=False)
+        with open(output_path, encoding="utf-8") as f:
+            outputs.append(json.load(f))
+    assert outputs[0] == outputs[1]
+
+    result = outputs[0]
+    assert len(result['Classes']) == 30 and len(result['Properties']) == 8
+    assert all(len(item['ClassProperties']) == 3 and len(item['ClassRelations']) == 2 for item in result['Classes'])
+    assert result['Classes'][1]['ParentClassCode'] == "C0"
+    assert result['Classes'][1]['ActivationDateUtc'] == "2024-01-02T00:00:00"
+
+
+def test_benchmark_results_file(tmp_path):
+    output_path = str(tmp_path / "results.json")
+    custom = {"classes": 20, "properties": 5, "class_properties": 2, "allowed_values": 1, "class_relations": 1, "property_relations": 1}
+    run_benchmarks(scales=(), output_path=output_path, custom=custom)
+
+    with open(output_path, encoding="utf-8") as f:
+        results = json.load(f)
+    scale, = results["scales"]
+    assert scale["name"] == "custom" and scale["rows"]["classproperty"] == 40
+    for stage in ("load_excel", "map_data.classproperty", "excel2bsdd.link", "clean_nones", "serialize", "convert_to_file"):
+        assert scale["stages"][stage]["seconds"] >= 0
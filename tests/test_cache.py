@@ -0,0 +1,104 @@
+import os
+import sys
+import tempfile
+import time
+import zipfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter import cache as cache_module
+from bsddconverter.cache import SheetCache, sheet_digests, STALE_SECONDS
+from bsddconverter.mapper import iter_excel, run_excel2bsdd_conversion
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+
+def _recording_reader(excel_path, reader, read_keys):
+    def read_sheets(keys):
+        read_keys.extend(keys)
+        return iter_excel(excel_path, reader, keys=keys)
+    return read_sheets
+
+def _edit_property_relation(source, target):
+    # Fills an empty cell of the PropertyRelation sheet, leaving the other parts untouched
+    with zipfile.ZipFile(source) as original, zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as copy:
+        for item in original.infolist():
+            data = original.read(item.filename)
+            if item.filename == "xl/worksheets/sheet8.xml":
+                data = data.replace(b'<c r="C27"/>', b'<c r="C27" t="inlineStr"><is><t>extra_code</t></is></c>')
+            copy.writestr(item, data)
+
+
+def test_cached_conversion_is_identical(tmp_path):
+    cache = SheetCache(str(tmp_path / "cache"))
+    first, second, uncached = (str(tmp_path / name) for name in ("first.json", "second.json", "uncached.json"))
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, first, cache=cache)
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, second, cache=cache)
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, uncached, cache=False)
+
+    with open(uncached, "rb") as f:
+        expected = f.read()
+    for path in (first, second):
+        with open(path, "rb") as f:
+            assert f.read() == expected
+
+
+def test_only_changed_sheets_are_read_again(tmp_path):
+    cache = SheetCache(str(tmp_path / "cache"))
+    for reader in ("openpyxl", "pandas"):
+        read_keys = []
+        list(cache.iter_sheets(TEST_EXCEL, reader, _recording_reader(TEST_EXCEL, reader, read_keys)))
+        assert len(read_keys) == 7
+
+        read_keys = []
+        list(cache.iter_sheets(TEST_EXCEL, reader, _recording_reader(TEST_EXCEL, reader, read_keys)))
+        assert read_keys == []
+
+    edited = str(tmp_path / "edited.xlsx")
+    _edit_property_relation(TEST_EXCEL, edited)
+    before, after = sheet_digests(TEST_EXCEL, "openpyxl"), sheet_digests(edited, "openpyxl")
+    assert [key for key in before if before[key] != after[key]] == ['propertyrelation']
+
+    read_keys = []
+    sheets = dict(cache.iter_sheets(edited, "openpyxl", _recording_reader(edited, "openpyxl", read_keys)))
+    assert read_keys == ['propertyrelation']
+    assert sheets == dict(iter_excel(edited, "openpyxl"))
+    assert 'extra_code' in sheets['propertyrelation']['(Origin Property Code)']
+
+
+def test_cache_stays_within_its_size_limit(tmp_path):
+    directory = tmp_path / "cache"
+    cache = SheetCache(str(directory), max_bytes=20000)
+    list(iter_excel(TEST_EXCEL, "openpyxl", cache))
+    sizes = [path.stat().st_size for path in directory.rglob("*") if path.is_file()]
+    assert sizes and sum(sizes) <= 20000
+
+    # A corrupt entry is parsed again instead of failing
+    for path in directory.rglob("*.pkl"):
+        path.write_bytes(b"broken")
+    assert dict(iter_excel(TEST_EXCEL, "openpyxl", cache)) == dict(iter_excel(TEST_EXCEL, "openpyxl"))
+
+
+def test_other_writers_are_left_alone(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    cache = SheetCache(str(directory), max_bytes=0)
+    # Being written by another process, and left behind by a crashed one
+    writing, crashed = directory / "sheets" / "ab" / "x.tmp", directory / "sheets" / "ab" / "y.tmp"
+    writing.parent.mkdir(parents=True)
+    for path in (writing, crashed):
+        path.write_bytes(b"0" * 1000)
+    old = time.time() - STALE_SECONDS - 1
+    os.utime(crashed, (old, old))
+    cache._put("sheets", "ab12", {"a": [1]})
+    cache.evict()
+    assert writing.exists() and not crashed.exists()
+    assert list(directory.rglob("*.pkl")) == []
+
+    # The temporary file is removed by another process's clear() before it is renamed
+    mkstemp = tempfile.mkstemp
+    def mkstemp_then_removed(**kwargs):
+        handle, path = mkstemp(**kwargs)
+        os.remove(path)
+        return handle, path
+    monkeypatch.setattr(cache_module.tempfile, "mkstemp", mkstemp_then_removed)
+    cache._put("sheets", "cd34", {"a": [1]})
+    assert cache._get("sheets", "cd34") is None
@@ -0,0 +1,81 @@
+import os
+import random
+import sys
+from ast import literal_eval
+from datetime import datetime
+import pandas as pd
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.converters import column_converter, convert_date_column, parse_list
+
+LIST_CELLS = [
+    "['IfcWall']", '["IfcWall", "IfcSlab"]', "['m']", "[ 'a' , 'b' , ]", "[\n'a',\n'b'\n]",
+    "[1, -2, +3, 00, 1.5, .5, 1., 1e3, -2.5E-2, True, False, None]", "['a, b', \"it's\", '[x]']",
+    "[ ]", "['ä', '中文']", "['a' 'b']", "['x\\'y']", "[u'a']", "[1_000]", "[0x1F]",
+    "[[1, 2], ['a']]", "[{'a': 1}]", "[(1, 2)]", "[-1j]",
+]
+INVALID_CELLS = ["[01]", "[a]", "['a'", "[1 2]", "['a\nb']", "[,]", "[True False]"]
+
+
+def _expected(value):
+    content = literal_eval(value)
+    return content if isinstance(content, list) else value
+
+
+@pytest.mark.parametrize("value", LIST_CELLS)
+def test_parse_list_matches_literal_eval(value):
+    result = parse_list(value)
+    expected = _expected(value)
+    assert result == expected
+    assert [type(item) for item in result] == [type(item) for item in expected]
+
+
+@pytest.mark.parametrize("value", INVALID_CELLS)
+def test_parse_list_raises_like_literal_eval(value):
+    with pytest.raises(Exception) as expected:
+        literal_eval(value)
+    with pytest.raises(type(expected.value)):
+        parse_list(value)
+
+
+def test_parse_list_empty_and_random_lists():
+    assert parse_list("[]") is None
+
+    rng = random.Random(7)
+    atoms = ["'Ifc'", '"m"', "'a b'", "''", "0", "12", "-3", "4.25", "1e-7", "True", "None", "'x,y'"]
+    for _ in range(500):
+        items = [rng.choice(atoms) for _ in range(rng.randint(0, 4))]
+        separator = rng.choice([",", ", ", " ,", ",\n"])
+        value = "[" + rng.choice(["", " "]) + separator.join(items) + rng.choice(["", ",", " "]) * bool(items) + "]"
+        if value == "[]":
+            continue
+        assert parse_list(value) == _expected(value), value
+
+
+def test_parse_list_results_are_not_shared():
+    first = parse_list("['IfcWall', 'IfcSlab']")
+    first.append("IfcBeam")
+    assert parse_list("['IfcWall', 'IfcSlab']") == ["IfcWall", "IfcSlab"]
+
+    nested = parse_list("[['a'], {'b': 1}]")
+    nested[0].append("c")
+    nested[1]["b"] = 2
+    assert parse_list("[['a'], {'b': 1}]") == [["a"], {"b": 1}]
+
+
+def test_date_column_matches_cell_by_cell_conversion():
+    convert = column_converter("ActivationDateUtc")
+    rng = random.Random(3)
+    values = [rng.choice([44927, 45000, 45000.5]) for _ in range(200)] + [rng.uniform(0, 80000) for _ in range(200)]
+    values += [pd.Timestamp(datetime(2024, 5, 1, 12, 30)), pd.Timestamp(datetime(2024, 5, 1)), 1, 1.0, True, 0, 0.0, -0.0, "", None, False]
+    assert convert_date_column(values, convert) == [convert(value) for value in values]
+    assert [type(value) for value in convert_date_column(values, convert)] == [type(convert(value)) for value in values]
+
+
+def test_date_column_errors_match_cell_by_cell_conversion():
+    convert = column_converter("RevisionDateUtc")
+    for bad in (["45000", 45000], [45000, 3e6]):
+        with pytest.raises(Exception) as expected:
+            [convert(value) for value in bad]
+        with pytest.raises(type(expected.value)):
+            convert_date_column(bad, convert)
@@ -0,0 +1,91 @@
+import copy
+import json
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.cli import main
+from bsddconverter.delta import apply_delta, diff_bsdd
+from bsddconverter.mapper import run_excel2bsdd_conversion
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+
+def _dictionary():
+    return {
+        "DictionaryCode": "test",
+        "DictionaryVersion": "1.0",
+        "Classes": [
+            {"Code": "C1", "Name": "One", "ClassProperties": [{"Code": "P1", "PropertyCode": "p1"}, {"Code": "P2", "PropertyCode": "p2"}]},
+            {"Code": "C2", "Name": "Two", "ClassProperties": []},
+            {"Code": "C3", "Name": "Three", "ClassProperties": []},
+        ],
+        "Properties": [
+            {"Code": "p1", "Name": "Width", "AllowedValues": [{"Code": "a", "Value": "A"}]},
+            {"Code": "p2", "Name": "Height", "AllowedValues": []},
+        ],
+    }
+
+
+def test_delta_lists_changes_by_code():
+    previous = _dictionary()
+    current = copy.deepcopy(previous)
+    current["DictionaryVersion"] = "1.1"
+    current["Classes"][0]["Name"] = "First"
+    del current["Classes"][0]["ClassProperties"][1]
+    del current["Classes"][2]
+    current["Classes"].append({"Code": "C4", "Name": "Four", "ClassProperties": []})
+    current["Properties"][0]["AllowedValues"].append({"Code": "b", "Value": "B"})
+
+    delta = diff_bsdd(previous, current)
+    assert delta["Dictionary"] == {"Fields": {"DictionaryVersion": "1.1"}}
+    assert delta["Classes"] == {
+        "Added": [{"Code": "C4", "Name": "Four", "ClassProperties": []}],
+        "Changed": [{"Code": "C1", "ClassProperties": {"Removed": ["P2"]}, "Fields": {"Name": "First"}}],
+        "Removed": ["C3"],
+    }
+    assert delta["Properties"] == {"Changed": [{"Code": "p1", "AllowedValues": {"Added": [{"Code": "b", "Value": "B"}]}}]}
+    assert diff_bsdd(previous, previous) == {"DeltaFormat": 1}
+
+    rebuilt = apply_delta(previous, delta)
+    assert json.dumps(rebuilt) == json.dumps(current)
+    assert previous == _dictionary()
+
+
+def test_delta_keeps_order_and_unindexed_lists():
+    previous = _dictionary()
+    current = copy.deepcopy(previous)
+    current["Classes"].reverse()
+    current["Classes"][0] = {"Name": "Three", "Code": "C3", "ClassProperties": [], "Status": "Active"}
+    current["Properties"][1]["AllowedValues"] = [{"Value": "no code"}]
+    del current["DictionaryCode"]
+
+    delta = diff_bsdd(previous, current)
+    assert delta["Classes"]["Order"] == ["C3", "C2", "C1"]
+    assert delta["Properties"]["Changed"][0]["AllowedValues"] == {"Replace": [{"Value": "no code"}]}
+    assert json.dumps(apply_delta(previous, delta)) == json.dumps(current)
+
+
+def test_delta_conversion_rebuilds_the_full_output(tmp_path):
+    full = str(tmp_path / "full.json")
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, full, remove_nulls=True)
+    with open(full, encoding="utf-8") as f:
+        previous = json.load(f)
+    # Pretend the previous release had one Class less and another name
+    removed = previous["Classes"].pop()
+    previous["Classes"][0]["Name"] = "Old name"
+    previous_path = str(tmp_path / "previous.json")
+    with open(previous_path, "w", encoding="utf-8") as f:
+        json.dump(previous, f)
+
+    delta_path = str(tmp_path / "delta.json")
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, delta_path, remove_nulls=True, previous_path=previous_path)
+    with open(delta_path, encoding="utf-8") as f:
+        delta = json.load(f)
+    assert set(delta) == {"DeltaFormat", "Classes"}
+    assert [item["Code"] for item in delta["Classes"]["Added"]] == [removed["Code"]]
+
+    rebuilt = str(tmp_path / "rebuilt.json")
+    assert main(["apply-delta", previous_path, delta_path, rebuilt]) == 0
+    with open(full, "rb") as f, open(rebuilt, "rb") as g:
+        assert f.read() == g.read()
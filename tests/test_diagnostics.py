@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+import sys
+import pytest
+from openpyxl import load_workbook
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.diagnostics import Diagnostics
+from bsddconverter.mapper import load_excel, map_data, run_excel2bsdd_conversion
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+
+def _set(worksheet, row, column_name, value):
+    header = [cell.value for cell in worksheet[7]]
+    worksheet.cell(row=row, column=header.index(column_name) + 1).value = value
+
+
+@pytest.fixture(scope="module")
+def workbook_with_problems(tmp_path_factory):
+    workbook = load_workbook(TEST_EXCEL)
+    # A misspelled header: the column has a value in all 12 Class rows
+    _set(workbook["Class"], 7, "Definition", "Defnition")
+    _set(workbook["AllowedValue"], 12, "(Origin Property Code)", None)
+    _set(workbook["AllowedValue"], 15, "(Origin Property Code)", None)
+    excel_path = str(tmp_path_factory.mktemp("diagnostics") / "problems.xlsx")
+    workbook.save(excel_path)
+    return excel_path
+
+
+def test_warnings_are_aggregated_per_sheet_and_column(workbook_with_problems, tmp_path, caplog):
+    output_path = str(tmp_path / "out.json")
+    with caplog.at_level(logging.WARNING, logger="bsddconverter.mapper"):
+        diagnostics = run_excel2bsdd_conversion(workbook_with_problems, TEST_TEMPLATE, output_path, cache=False)
+    entries = diagnostics.to_list()
+    assert [(entry["code"], entry["sheet"], entry["column"], entry["count"], entry["rows"]) for entry in entries] == [
+        ("unknown-column", "Class", "Defnition", 12, list(range(8, 18))),
+        ("allowed-value-without-origin", "AllowedValue", None, 2, [12, 15]),
+    ]
+    assert len(caplog.records) == 1
+    assert caplog.records[0].getMessage() == diagnostics.summary()
+    assert "WARNING: Class, column 'Defnition': No such property as 'Defnition'" in diagnostics.summary()
+    assert "(12 cells in rows 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, ...)" in diagnostics.summary()
+    assert "(2 rows: 12, 15)" in diagnostics.summary()
+
+    # Workers send the warnings of their sheets back
+    assert run_excel2bsdd_conversion(workbook_with_problems, TEST_TEMPLATE, output_path, cache=False, workers=2).to_list() == entries
+    # The row engine links dictionaries, whose sheet rows are no longer known
+    by_row = run_excel2bsdd_conversion(workbook_with_problems, TEST_TEMPLATE, output_path, cache=False, engine="row").to_list()
+    assert by_row[0] == entries[0]
+    assert (by_row[1]["count"], by_row[1]["rows"]) == (2, [])
+
+    assert len(run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, output_path, cache=False)) == 0
+
+
+def test_warnings_are_logged_without_a_collector(workbook_with_problems, caplog):
+    with open(TEST_TEMPLATE, encoding="utf-8") as f:
+        template = json.load(f)
+    excel = load_excel(workbook_with_problems)
+    for engine in ("columnar", "row"):
+        caplog.clear()
+        with caplog.at_level(logging.WARNING, logger="bsddconverter.mapper"):
+            map_data(excel["class"], template["Classes"], "classes", engine=engine)
+        assert [record.getMessage().split(" (")[0] for record in caplog.records] == [
+            "WARNING: Class, column 'Defnition': No such property as 'Defnition' in the JSON template! It will NOT be added to the JSON file."
+        ]
+
+
+def test_diagnostics_merge_and_order():
+    diagnostics = Diagnostics(max_rows=3)
+    diagnostics.add("note", "Just so you know", severity="info")
+    diagnostics.add("unknown-column", "Not in the template", "Class", "X", rows=[8, 9])
+    diagnostics.add("unknown-column", "Not in the template", "Class", "X", rows=[10, 11], count=5)
+    other = Diagnostics()
+    other.add("broken", "Cannot be read", "Property", severity="error", count=1)
+    diagnostics.extend(other.to_list())
+
+    assert [entry["code"] for entry in diagnostics] == ["broken", "unknown-column", "note"]
+    assert diagnostics.to_list()[1]["count"] == 7 and diagnostics.to_list()[1]["rows"] == [8, 9, 10]
+    assert diagnostics.count() == 8 and diagnostics.count("error") == 1
+    assert diagnostics.summary(limit=1) == "ERROR: Property: Cannot be read (1 row)\n... and 2 more"
+    assert Diagnostics().summary() == "No warnings."
+    with pytest.raises(ValueError):
+        diagnostics.add("x", "y", severity="fatal")
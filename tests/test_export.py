@@ -0,0 +1,54 @@
+import os
+import sys
+from datetime import datetime
+from openpyxl import load_workbook
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.cli import main
+from bsddconverter.export import cell_value, iter_sheet_rows, write_excel
+from bsddconverter.mapper import run_excel2bsdd_conversion
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_export_round_trips_through_the_converter(tmp_path):
+    for remove_nulls in (False, True):
+        original = str(tmp_path / f"original-{remove_nulls}.json")
+        run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, original, remove_nulls=remove_nulls, cache=False)
+        for reference in (None, TEST_EXCEL):
+            excel_path = str(tmp_path / f"export-{remove_nulls}-{reference is None}.xlsx")
+            args = ["export", original, excel_path] + (["--reference", reference] if reference else [])
+            assert main(args) == 0
+            again = str(tmp_path / "again.json")
+            run_excel2bsdd_conversion(excel_path, TEST_TEMPLATE, again, remove_nulls=remove_nulls, cache=False)
+            assert _read(again) == _read(original)
+
+    workbook = load_workbook(excel_path, read_only=True)
+    assert [cell.value for cell in next(workbook["AllowedValue"].iter_rows(min_row=7, max_row=7))][:5] == [None, None, "(Origin Property Code)", "(Origin ClassProperty Code)", "Value"]
+    workbook.close()
+
+
+def test_allowed_values_of_class_properties_are_written_once_per_code(tmp_path):
+    values = [{"Code": "R", "Value": "Red"}]
+    bsdd_data = {"Classes": [
+        {"Code": "A", "ClassProperties": [{"Code": "colour", "PropertyCode": "P", "AllowedValues": values}]},
+        {"Code": "B", "ClassProperties": [{"Code": "colour", "PropertyCode": "P", "AllowedValues": values}]},
+    ], "Properties": [{"Code": "P", "AllowedValues": [{"Code": "x", "Value": "X"}]}]}
+    rows = {key: list(items) for key, items in iter_sheet_rows(bsdd_data)}
+    assert [row["Code"] for row in rows["classproperty"]] == ["colour", "colour"]
+    assert [(row.get("(Origin Property Code)"), row.get("(Origin ClassProperty Code)"), row["Code"]) for row in rows["allowedvalue"]] == [("P", None, "x"), (None, "colour", "R")]
+    assert write_excel(bsdd_data, str(tmp_path / "out" / "small.xlsx"))["allowedvalue"] == 2
+
+
+def test_cell_values():
+    assert cell_value("RelatedIfcEntityNamesList", ["IfcWall", "IfcSlab"]) == "['IfcWall', 'IfcSlab']"
+    assert cell_value("ReplacedObjectCodes", [None]) is None
+    assert cell_value("ActivationDateUtc", "2024-05-01T12:30:00") == datetime(2024, 5, 1, 12, 30)
+    assert cell_value("ActivationDateUtc", "2024-05-01T12:30:00+02:00") == datetime(2024, 5, 1, 10, 30)
+    assert cell_value("Definition", "bell \x07") == "bell "
+    assert cell_value("IsRequired", True) is True
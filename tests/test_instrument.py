@@ -0,0 +1,51 @@
+import json
+import os
+import pstats
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.cli import main
+from bsddconverter.instrument import Profile
+from bsddconverter.mapper import run_excel2bsdd_conversion
+from bsddconverter.plans import SHEET_PARTS
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+
+def test_observer_receives_a_span_per_stage_and_sheet(tmp_path):
+    spans = []
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(tmp_path / "out.json"), cache=False, observer=spans.append)
+
+    names = [(span["name"], span["sheet"]) for span in spans]
+    expected = [(stage, key) for key in SHEET_PARTS for stage in ("load", "map")] + [("link", None), ("write", None)]
+    assert names == expected
+    for span in spans:
+        assert span["wall_seconds"] >= 0 and span["cpu_seconds"] >= 0
+        assert span["peak_memory_bytes"] is None
+
+    rows = {(span["name"], span["sheet"]): span["rows"] for span in spans}
+    with open(tmp_path / "out.json", encoding="utf-8") as f:
+        result = json.load(f)
+    assert rows[("map", "class")] == len(result["Classes"])
+    assert rows[("write", None)] == len(result["Classes"]) + len(result["Properties"])
+
+
+def test_profile_traces_memory_in_workers(tmp_path):
+    profile = Profile(memory=True)
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(tmp_path / "out.json"), workers=2, engine="row", cache=False, observer=profile)
+    assert sorted(span["sheet"] for span in profile.spans if span["name"] == "map") == sorted(SHEET_PARTS)
+    assert all(span["peak_memory_bytes"] > 0 for span in profile.spans)
+    assert profile.total()["peak_memory_bytes"] == max(span["peak_memory_bytes"] for span in profile.spans)
+    assert "total" in profile.report()
+
+
+def test_cli_profile_outputs(tmp_path, capsys):
+    spans_path, stats_path = str(tmp_path / "spans.json"), str(tmp_path / "hot.prof")
+    argv = ["convert", TEST_EXCEL, TEST_TEMPLATE, str(tmp_path / "out.json"), "--profile", "--profile-output", spans_path, "--cprofile", stats_path]
+    assert main(argv) == 0
+    assert "write" in capsys.readouterr().err
+
+    with open(spans_path, encoding="utf-8") as f:
+        assert json.load(f)["total"]["peak_memory_bytes"] > 0
+    functions = [function for (filename, line, function) in pstats.Stats(stats_path).stats]
+    assert "write_document" in functions and "load_sheet" not in functions
@@ -0,0 +1,75 @@
+import datetime
+import json
+import os
+import sys
+import openpyxl
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.loader import SHEETS, HEADER_ROW
+from bsddconverter.mapper import load_excel, map_data, excel2bsdd
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+# Columns whose cell types exercise the pandas type inference the streaming
+# reader has to reproduce
+TRICKY_COLUMNS = {
+    'ints': [1, 2, 3],
+    'ints_floats': [1, 2.5, 3],
+    'ints_blank': [1, None, 3],
+    'number_text': ['1', '2', '3'],
+    'number_text_blank': ['1', None, '3'],
+    'int_and_text': [1, 'a', 3],
+    'bools': [True, False, True],
+    'bools_blank': [True, None, False],
+    'bool_and_int': [True, 1, 0],
+    'true_text': ['TRUE', 'FALSE', 'TRUE'],
+    'dates': [datetime.datetime(2020, 1, 1), datetime.datetime(2021, 1, 1), datetime.datetime(2022, 1, 1, 12)],
+    'dates_blank': [datetime.datetime(2020, 1, 1), None, None],
+    'date_and_text': [datetime.datetime(2020, 1, 1), 'x', None],
+    'whitespace': ['  ', 'x', ' '],
+    'error': ['#N/A', 1, 2],
+    'lists': ['["a"]', '[]', None],
+    'Uid': [1, None, 'x'],
+    'DictionaryVersion': [1.5, 2, None],
+}
+
+
+def _typed(rows):
+    return [[(key, type(value).__name__, repr(value)) for key, value in row.items()] for row in rows]
+
+
+def test_readers_give_identical_conversion():
+    with open(TEST_TEMPLATE, encoding="utf-8") as f:
+        template = json.load(f)
+
+    streamed = excel2bsdd(load_excel(TEST_EXCEL, reader="openpyxl"), template)
+    parsed = excel2bsdd(load_excel(TEST_EXCEL, reader="pandas"), template)
+    assert json.dumps(streamed) == json.dumps(parsed)
+
+
+def test_readers_type_tricky_cells_identically(tmp_path):
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for key, sheet_name, usecols, text_columns in SHEETS:
+        sheet = workbook.create_sheet(sheet_name)
+        for row in range(1, HEADER_ROW):
+            sheet.cell(row=row, column=1, value=f"Instructions {row}")
+        # pandas needs the sheet to be as wide as the column range
+        sheet.cell(row=1, column=openpyxl.utils.column_index_from_string(usecols.split(":")[1]), value="end")
+        for offset, (name, values) in enumerate(TRICKY_COLUMNS.items()):
+            sheet.cell(row=HEADER_ROW, column=3 + offset, value=name)
+            for position, value in enumerate(values):
+                if value is not None:
+                    sheet.cell(row=HEADER_ROW + 1 + position, column=3 + offset, value=value)
+        # Blank row inside the column range, kept because column A has content
+        sheet.cell(row=HEADER_ROW + 5, column=1, value="note")
+    path = tmp_path / "tricky.xlsx"
+    workbook.save(path)
+
+    template = {name: None for name in TRICKY_COLUMNS}
+    streamed = load_excel(str(path), reader="openpyxl")
+    parsed = load_excel(str(path), reader="pandas")
+    for key, sheet_name, usecols, text_columns in SHEETS:
+        # Narrower column ranges only see a subset of the columns
+        expected = map_data(parsed[key], template, key)
+        assert _typed(map_data(streamed[key], template, key)) == _typed(expected)
@@ -0,0 +1,169 @@
+import glob
+import json
+import os
+import random
+import sys
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.converters import is_int_column
+from bsddconverter.columns import RepeatedValue
+from bsddconverter.mapper import load_excel, map_data, map_sheet_table, excel2bsdd, link_entities, run_excel2bsdd_conversion, clean_nones, UnresolvedReferenceError, LINKED_LISTS
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+TEST_WORKBOOKS = sorted(glob.glob("tests/data/*.xlsx"))
+
+SHEET_TEMPLATES = {
+    'dictionary': lambda tpl: tpl,
+    'class': lambda tpl: tpl['Classes'],
+    'property': lambda tpl: tpl['Properties'],
+    'classproperty': lambda tpl: tpl['Classes'][0]['ClassProperties'],
+    'classrelation': lambda tpl: tpl['Classes'][0]['ClassRelations'],
+    'allowedvalue': lambda tpl: tpl['Properties'][0]['AllowedValues'],
+    'propertyrelation': lambda tpl: tpl['Properties'][0]['PropertyRelations'],
+}
+
+
+@pytest.fixture(scope="module")
+def template():
+    with open(TEST_TEMPLATE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def excel():
+    return load_excel(TEST_EXCEL)
+
+
+@pytest.mark.parametrize("sheet", list(SHEET_TEMPLATES))
+def test_columnar_engine_matches_row_engine(excel, template, sheet):
+    part = SHEET_TEMPLATES[sheet](template)
+    row = map_data(excel[sheet], part, sheet, engine="row")
+    columnar = map_data(excel[sheet], part, sheet, engine="columnar")
+
+    # Compare serialized output so key order counts as well
+    assert json.dumps(columnar) == json.dumps(row)
+
+
+def test_columnar_engine_matches_row_engine_end_to_end(excel, template):
+    row = excel2bsdd(excel, template, engine="row")
+    columnar = excel2bsdd(excel, template, engine="columnar")
+    assert json.dumps(columnar) == json.dumps(row)
+
+
+def test_sheet_table_shares_values_but_not_row_lists(template):
+    columns = {
+        'Code': ['A', 'B', 'C', None],
+        'Name': ['Wall', ''.join(['Wa', 'll']), 'Slab', None],
+        'Definition': [None, None, None, None],
+        'RelatedIfcEntityNamesList': ["['IfcWall']", "['IfcWall']", None, None],
+    }
+    table = map_sheet_table(columns, template, 'class')
+    assert len(table) == 3
+    assert isinstance(table.column('Definition'), RepeatedValue)
+    assert isinstance(table.column('Description'), RepeatedValue)
+    assert table.column('Name')[0] is table.column('Name')[1]
+
+    rows = list(table)
+    assert rows == map_data(columns, template['Classes'], 'class', engine="row")
+    assert rows[0]['RelatedIfcEntityNamesList'] == ['IfcWall']
+    assert rows[0]['RelatedIfcEntityNamesList'] is not rows[1]['RelatedIfcEntityNamesList']
+    assert table.row(0)['RelatedIfcEntityNamesList'] is not rows[0]['RelatedIfcEntityNamesList']
+
+
+def _linked_dictionary():
+    return {
+        'Classes': [
+            {'Code': 'A', 'ClassProperties': [], 'ClassRelations': []},
+            {'Code': 'B', 'ClassProperties': [], 'ClassRelations': []},
+        ],
+        'Properties': [
+            {'Code': 'P', 'AllowedValues': [], 'PropertyRelations': []},
+        ],
+    }
+
+
+def test_link_entities_attaches_children():
+    bsdd_data = _linked_dictionary()
+    cls_props = [
+        {'(Origin Class Code)': 'A', 'Code': 'CP', 'AllowedValues': []},
+        {'(Origin Class Code)': 'B', 'Code': 'CP', 'AllowedValues': []},
+    ]
+    allowed_vals = [
+        {'(Origin Property Code)': 'P', '(Origin ClassProperty Code)': None, 'Code': '1'},
+        {'(Origin Property Code)': None, '(Origin ClassProperty Code)': 'CP', 'Code': '2'},
+    ]
+    prop_rels = [{'(Origin Property Code)': 'P', 'RelationType': 'HasReference'}]
+
+    link_entities(bsdd_data, cls_props, [], allowed_vals, prop_rels)
+
+    class_a, class_b = bsdd_data['Classes']
+    assert class_a['ClassProperties'] == [{'Code': 'CP', 'AllowedValues': [{'Code': '2'}]}]
+    # ClassProperty codes are per class, so both classes receive the value
+    assert class_b['ClassProperties'] == [{'Code': 'CP', 'AllowedValues': [{'Code': '2'}]}]
+    assert bsdd_data['Properties'][0]['AllowedValues'] == [{'Code': '1'}]
+    assert bsdd_data['Properties'][0]['PropertyRelations'] == [{'RelationType': 'HasReference'}]
+
+
+def test_link_entities_reports_all_unresolved_codes():
+    bsdd_data = _linked_dictionary()
+    cls_props = [
+        {'(Origin Class Code)': 'X', 'Code': 'X-1', 'AllowedValues': []},
+        {'(Origin Class Code)': 'X', 'Code': 'X-2', 'AllowedValues': []},
+    ]
+    cls_rels = [{'(Origin Class Code)': 'Y', 'RelationType': 'IsChildOf'}]
+    prop_rels = [{'(Origin Property Code)': 'Z', 'RelationType': 'HasReference'}]
+
+    with pytest.raises(UnresolvedReferenceError) as excinfo:
+        link_entities(bsdd_data, cls_props, cls_rels, [], prop_rels)
+
+    assert excinfo.value.unresolved == [
+        ("ClassProperty", 'X'),
+        ("ClassProperty", 'X'),
+        ("ClassRelation", 'Y'),
+        ("PropertyRelation", 'Z'),
+    ]
+    assert "'X' (2 rows)" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("reader", ["openpyxl", "pandas"])
+def test_worker_pool_matches_serial_conversion(tmp_path, reader):
+    serial = tmp_path / "serial.json"
+    pooled = tmp_path / "pooled.json"
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(serial), reader=reader)
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(pooled), reader=reader, workers=2)
+    assert pooled.read_bytes() == serial.read_bytes()
+
+
+@pytest.mark.parametrize("engine", ["columnar", "row"])
+@pytest.mark.parametrize("reader", ["openpyxl", "pandas"])
+@pytest.mark.parametrize("workbook", TEST_WORKBOOKS)
+def test_remove_nulls_while_mapping_equals_clean_nones(template, workbook, reader, engine):
+    excel = load_excel(workbook, reader=reader)
+    expected = clean_nones(excel2bsdd(excel, template, engine=engine))
+    excel = load_excel(workbook, reader=reader)
+    assert json.dumps(excel2bsdd(excel, template, engine=engine, remove_nulls=True)) == json.dumps(expected)
+
+
+def _without_empty_links(rows):
+    return [{key: val for key, val in row.items() if not (key in LINKED_LISTS and val == [])} for row in rows]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("sheet", list(SHEET_TEMPLATES))
+def test_remove_nulls_holds_for_shuffled_cells(excel, template, sheet, seed):
+    # Rows rebuilt from random cells of the test workbook, with extra blanks and list cells
+    rng = random.Random(seed)
+    list_cells = ["[]", "[None]", "['', 'a']", "[[], None]"]
+    columns = {}
+    for name, values in excel[sheet].items():
+        pool = list(values) + [None, None]
+        # List cells only make sense in text columns
+        if "Date" not in name and not is_int_column(name) and all(isinstance(value, str) for value in values if value is not None):
+            pool += list_cells
+        columns[name] = [rng.choice(pool) for _ in range(30)]
+
+    part = SHEET_TEMPLATES[sheet](template)
+    for engine in ("columnar", "row"):
+        expected = clean_nones(map_data(columns, part, sheet, engine=engine))
+        assert _without_empty_links(map_data(columns, part, sheet, engine=engine, remove_nulls=True)) == expected
@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import pandas as pd
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.mapper import map_data
+
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+# Generous limits: linear engines finish well below them, while a per-row
+# rescan of the sheet (O(n^2)) needs many minutes for 100k rows.
+ROWS = 100_000
+TIME_LIMITS = {"columnar": 30, "row": 120}
+
+
+def _class_property_sheet(n):
+    """Synthetic ClassProperty sheet shaped like load_excel output, with blank rows mixed in."""
+    sheet = pd.DataFrame({
+        '(Origin Class Code)': [f"C{i // 10}" for i in range(n)],
+        'Code': [f"C{i // 10}-P{i % 10}" for i in range(n)],
+        'PropertyCode': [f"P{i % 10}" for i in range(n)],
+        'PropertyUri': [''] * n,
+        'Description': [''] * n,
+        'PropertySet': ['Pset_Common'] * n,
+        'Unit': ['m'] * n,
+        'PredefinedValue': [''] * n,
+        'IsRequired': [True, ''] * (n // 2),
+        'IsWritable': [False] * n,
+        'SortNumber': list(range(n)),
+    }, dtype=object)
+    sheet.iloc[::1000] = ''
+    return sheet
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("engine", ["columnar", "row"])
+def test_map_data_scales_linearly(engine):
+    with open(TEST_TEMPLATE, encoding="utf-8") as f:
+        template = json.load(f)
+    sheet = _class_property_sheet(ROWS)
+
+    start = time.perf_counter()
+    result = map_data(sheet, template['Classes'][0]['ClassProperties'], "class-properties", engine=engine)
+    elapsed = time.perf_counter() - start
+
+    assert len(result) == ROWS - ROWS // 1000, "entirely blank rows should be skipped"
+    assert elapsed < TIME_LIMITS[engine], f"{engine} engine took {elapsed:.1f}s for {ROWS} rows"
+
+
+# Dataframe methods that scan a whole sheet
+SHEET_SCANS = ("dropna", "notna", "isna", "replace", "astype", "apply", "any", "all")
+
+
+@pytest.mark.parametrize("engine", ["columnar", "row"])
+def test_map_data_scans_each_sheet_a_constant_number_of_times(engine, monkeypatch):
+    # The timing-free check of test_map_data_scales_linearly: a whole-sheet
+    # scan per row, like the old dropna in the row loop, makes the number of
+    # scans grow with the sheet
+    with open(TEST_TEMPLATE, encoding="utf-8") as f:
+        template = json.load(f)
+    calls = []
+    for method in SHEET_SCANS:
+        original = getattr(pd.DataFrame, method)
+        def counted(self, *args, _original=original, _method=method, **kwargs):
+            calls.append(_method)
+            return _original(self, *args, **kwargs)
+        monkeypatch.setattr(pd.DataFrame, method, counted)
+
+    scans = []
+    for rows in (2_000, 8_000):
+        sheet = _class_property_sheet(rows)
+        calls.clear()
+        result = map_data(sheet, template['Classes'][0]['ClassProperties'], "class-properties", engine=engine)
+        assert len(result) == rows - rows // 1000
+        scans.append(sorted(calls))
+    assert scans[0] == scans[1]
+    assert len(scans[0]) < 20
+
+
+# Budget for `import bsddconverter.gui` (cumulative, microseconds). The GUI
+# modules alone take a few tens of milliseconds; pulling pandas back in at
+# import time costs well over half a second.
+IMPORT_TIME_LIMIT_US = 250_000
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "tqdm")
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def _run_python(*args):
+    env = dict(os.environ, PYTHONPATH=SRC)
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, check=True)
+
+
+def _import_time_us(module):
+    """Cumulative import time of a module as reported by -X importtime, in a fresh interpreter."""
+    report = _run_python("-X", "importtime", "-c", f"import {module}").stderr
+    for line in report.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    raise AssertionError(f"{module} not found in the import time report")
+
+
+@pytest.mark.parametrize("module", ["bsddconverter.gui", "bsddconverter.cli"])
+def test_entry_points_import_without_heavy_dependencies(module):
+    if module == "bsddconverter.gui":
+        pytest.importorskip("tkinter")
+    check = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    assert _run_python("-c", check).stdout.strip() == ""
+
+
+@pytest.mark.slow
+def test_gui_import_time():
+    pytest.importorskip("tkinter")
+    # Best of three, to ignore a cold disk cache
+    elapsed = min(_import_time_us("bsddconverter.gui") for _ in range(3))
+    assert elapsed < IMPORT_TIME_LIMIT_US, f"import bsddconverter.gui took {elapsed / 1000:.0f} ms"
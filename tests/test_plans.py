@@ -0,0 +1,41 @@
+import json
+import os
+import pickle
+import shutil
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.plans import load_template, RowPlan
+
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+
+def test_load_template_is_cached_by_content(tmp_path):
+    path = tmp_path / "template.json"
+    shutil.copy(TEST_TEMPLATE, path)
+    first = load_template(str(path))
+    assert load_template(str(path)) is first
+    # Another file with the same content shares the compiled plan
+    assert load_template(TEST_TEMPLATE) is first
+
+    template = json.loads(path.read_text(encoding="utf-8"))
+    template['ModelVersion'] = "2.1"
+    path.write_text(json.dumps(template), encoding="utf-8")
+    changed = load_template(str(path))
+    assert changed is not first
+    assert changed.rows['dictionary'].defaults['ModelVersion'] == "2.1"
+
+
+def test_row_plan_rows_share_nothing():
+    plan = load_template(TEST_TEMPLATE).rows['class']
+    first, second = plan.new_row(), plan.new_row()
+    first['ClassProperties'].append({'Code': 'CP'})
+    assert second['ClassProperties'] == [] and plan.defaults['ClassProperties'] == []
+    assert list(first) == list(plan.keys)
+
+
+def test_row_plan_survives_pickling():
+    plan = load_template(TEST_TEMPLATE).rows['classproperty']
+    copy = pickle.loads(pickle.dumps(plan))
+    assert isinstance(copy, RowPlan)
+    assert copy.converters['SortNumber'](3.0) == 3
+    assert copy.new_row() == plan.new_row()
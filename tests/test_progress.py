@@ -0,0 +1,54 @@
+import os
+import queue
+import sys
+import threading
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.gui import convert_in_background
+from bsddconverter.mapper import run_excel2bsdd_conversion, ConversionCancelled
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+
+def _drain(events):
+    items = []
+    while not events.empty():
+        items.append(events.get_nowait())
+    return items
+
+
+@pytest.mark.parametrize("engine", ["columnar", "row"])
+def test_background_conversion_reports_progress(tmp_path, engine):
+    events = queue.Queue()
+    output = tmp_path / "output.json"
+    convert_in_background(TEST_EXCEL, TEST_TEMPLATE, str(output), False, events, threading.Event())
+
+    items = _drain(events)
+    assert items[-1] == ("done", 0, None)
+    progress = items[:-1]
+    sheets = [event[2] for event in progress if event[1] == "sheets"]
+    assert sheets == list(range(1, 8))
+    rows = [event for event in progress if event[1] == "rows"]
+    assert rows and rows[-1][2] == rows[-1][3]
+    assert output.exists()
+
+
+def test_cancel_stops_between_sheets_and_leaves_no_file(tmp_path):
+    cancel = threading.Event()
+    output = tmp_path / "output.json"
+    seen = []
+
+    def progress(stage, done, total):
+        seen.append((stage, done))
+        if done == 2:
+            cancel.set()
+
+    with pytest.raises(ConversionCancelled):
+        run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(output), progress=progress, cancel=cancel)
+    assert seen == [("sheets", 1), ("sheets", 2)]
+    assert os.listdir(tmp_path) == []
+
+    events = queue.Queue()
+    convert_in_background(TEST_EXCEL, TEST_TEMPLATE, str(output), False, events, cancel)
+    assert _drain(events) == [("cancelled",)]
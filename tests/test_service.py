@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.cli import main
+from bsddconverter.mapper import run_excel2bsdd_conversion
+from bsddconverter.plans import SHEET_PARTS
+from bsddconverter.service import ConversionService, QueueFullError, get_job, make_server, submit_job, wait_for_job
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+
+@pytest.fixture(scope="module")
+def server():
+    with ConversionService(workers=1, max_queue=5, template_paths=[TEST_TEMPLATE]) as service:
+        http = make_server(service, port=0, token="secret")
+        thread = threading.Thread(target=http.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{http.server_address[1]}"
+        http.shutdown()
+        http.server_close()
+
+
+def test_jobs_convert_like_the_library(server, tmp_path):
+    expected_path = str(tmp_path / "expected.json")
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, expected_path, remove_nulls=True, cache=False)
+
+    job = submit_job(TEST_EXCEL, TEST_TEMPLATE, str(tmp_path / "out.json"), server=server, token="secret", remove_nulls=True, cache=False)
+    assert job["status"] == "queued"
+    job = wait_for_job(job["id"], server=server, token="secret", timeout=60)
+    assert job["status"] == "done", job["error"]
+    assert sorted(job["rows"]) == sorted(SHEET_PARTS)
+    with open(expected_path, "rb") as expected, open(tmp_path / "out.json", "rb") as result:
+        assert result.read() == expected.read()
+
+    failed = submit_job(str(tmp_path / "missing.xlsx"), TEST_TEMPLATE, str(tmp_path / "x.json"), server=server, token="secret")
+    failed = wait_for_job(failed["id"], server=server, token="secret", timeout=60)
+    assert failed["status"] == "failed" and "FileNotFoundError" in failed["error"]
+
+
+def test_requests_are_checked(server):
+    with pytest.raises(Exception, match="401"):
+        get_job("x", server=server)
+    with pytest.raises(Exception, match="404"):
+        get_job("x", server=server, token="secret")
+    with pytest.raises(Exception, match="Unknown option"):
+        submit_job(TEST_EXCEL, TEST_TEMPLATE, "out.json", server=server, token="secret", workers=4)
+    with pytest.raises(Exception, match="Option 'cache' must be true or false"):
+        submit_job(TEST_EXCEL, TEST_TEMPLATE, "out.json", server=server, token="secret", cache="no")
+    with pytest.raises(Exception, match="Option 'shard_size' must be an integer or null"):
+        submit_job(TEST_EXCEL, TEST_TEMPLATE, "out.json", server=server, token="secret", shard_size=True)
+
+
+def _status(url, body, headers):
+    request = urllib.request.Request(url, data=body, method="POST", headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_browser_requests_are_refused(server):
+    body = json.dumps({"excel_path": "a.xlsx", "template_path": "t.json", "output_path": "out.json"}).encode("utf-8")
+    auth = {"Authorization": "Bearer secret"}
+    # A cross-origin form or fetch without preflight can only send text/plain
+    assert _status(server + "/jobs", body, {**auth, "Content-Type": "text/plain"}) == 415
+    # DNS rebinding: the page's own host name
+    port = server.rsplit(":", 1)[1]
+    assert _status(server + "/jobs", body, {**auth, "Content-Type": "application/json", "Host": f"evil.example:{port}"}) == 403
+    assert _status(server + "/jobs", b"{}", {**auth, "Content-Type": "application/json", "Host": f"localhost:{port}"}) == 400
+
+
+def test_queue_limit_and_cancel(tmp_path):
+    service = ConversionService(workers=1, max_queue=2)
+    # Not started: jobs stay queued
+    first = service.submit(TEST_EXCEL, TEST_TEMPLATE, str(tmp_path / "a.json"))
+    service.submit(TEST_EXCEL, TEST_TEMPLATE, str(tmp_path / "b.json"))
+    with pytest.raises(QueueFullError):
+        service.submit(TEST_EXCEL, TEST_TEMPLATE, str(tmp_path / "c.json"))
+    assert service.cancel(first["id"])["status"] == "cancelled"
+
+    with service:
+        pass
+    statuses = [job["status"] for job in service.jobs()]
+    assert statuses == ["cancelled", "done"]
+    assert not os.path.exists(tmp_path / "a.json") and os.path.exists(tmp_path / "b.json")
+
+
+def test_submit_command(server, tmp_path, capsys):
+    output_path = str(tmp_path / "out.json")
+    assert main(["submit", TEST_EXCEL, TEST_TEMPLATE, output_path, "--server", server, "--token", "secret"]) == 0
+    with open(output_path, encoding="utf-8") as f:
+        assert json.load(f)["Classes"]
+    assert main(["submit", TEST_EXCEL, TEST_TEMPLATE, output_path, "--server", "http://127.0.0.1:9", "--token", "secret"]) == 1
+    assert "not reachable" in capsys.readouterr().err
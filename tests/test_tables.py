@@ -0,0 +1,84 @@
+import csv
+import os
+import sys
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+from generate_workbook import generate_workbook
+from bsddconverter.loader import SHEETS, HEADER_ROW
+from bsddconverter.mapper import load_excel, run_excel2bsdd_conversion
+from bsddconverter.tables import iter_tables, read_table
+
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+
+def _export_csv(excel_path, directory):
+    # Saves every template sheet as CSV, like "Save As CSV" in Excel
+    os.makedirs(directory)
+    workbook = load_workbook(excel_path, read_only=True, data_only=True)
+    for key, sheet_name, usecols, text_columns in SHEETS:
+        first, last = (column_index_from_string(column) for column in usecols.split(":"))
+        with open(os.path.join(directory, f"{sheet_name}.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            for row in workbook[sheet_name].iter_rows(min_row=HEADER_ROW, min_col=first, max_col=last, values_only=True):
+                writer.writerow(["" if value is None else str(value).upper() if isinstance(value, bool) else value for value in row])
+    workbook.close()
+
+def _convert(source, tmp_path, name, **kwargs):
+    output_path = str(tmp_path / f"{name}.json")
+    run_excel2bsdd_conversion(source, TEST_TEMPLATE, output_path, cache=False, **kwargs)
+    with open(output_path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_table_directories_convert_like_the_workbook(tmp_path):
+    excel_path = str(tmp_path / "bench.xlsx")
+    generate_workbook(excel_path, classes=30, properties=8, class_properties=3, allowed_values=2, class_relations=2, property_relations=1)
+    csv_dir = str(tmp_path / "csv")
+    _export_csv(excel_path, csv_dir)
+
+    expected = _convert(excel_path, tmp_path, "xlsx")
+    assert _convert(csv_dir, tmp_path, "csv") == expected
+    assert _convert(csv_dir, tmp_path, "csv_pool", reader="csv", workers=2) == expected
+
+    pytest.importorskip("pyarrow")
+    parquet_dir = tmp_path / "parquet"
+    parquet_dir.mkdir()
+    for key, sheet_name, usecols, text_columns in SHEETS:
+        frame = pd.read_csv(os.path.join(csv_dir, f"{sheet_name}.csv"), true_values=["TRUE"], false_values=["FALSE"], dtype={column: str for column in text_columns})
+        frame.to_parquet(parquet_dir / f"{sheet_name}.parquet")
+    assert _convert(str(parquet_dir), tmp_path, "parquet") == expected
+
+
+def test_csv_fields_are_typed_like_cells(tmp_path):
+    path = tmp_path / "Class.csv"
+    path.write_text(
+        "Code,Uid,IsRequired,Number,ActivationDateUtc,Name\n"
+        "007,007,TRUE,1,45000,1.50\n"
+        "x,,,2.5,2024-05-01,abc\n"
+        "y,1,false,,2024-05-01T12:30:00,\n"
+        ",,,,,\n"
+        ",,,,,\n", encoding="utf-8")
+    columns = read_table(str(path), "csv", text_columns=("Uid",))
+    assert columns["Code"] == ["007", "x", "y"]
+    assert columns["Uid"] == ["007", None, "1"]
+    assert columns["IsRequired"] == [True, None, False]
+    assert columns["Number"] == [1.0, 2.5, None]
+    assert columns["ActivationDateUtc"] == [45000, pd.Timestamp("2024-05-01"), pd.Timestamp("2024-05-01 12:30")]
+    assert columns["Name"] == [1.5, "abc", None]
+
+    # Missing sheet files are empty sheets
+    assert dict(iter_tables(str(tmp_path), keys=["class", "property"])) == {"class": columns, "property": {}}
+    assert load_excel(str(tmp_path))["dictionary"] == {}
+
+
+def test_table_directory_errors(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No template sheets"):
+        load_excel(str(tmp_path))
+    with pytest.raises(ValueError, match="Unknown excel reader"):
+        load_excel(str(tmp_path), reader="xml")
+    with pytest.raises(NotADirectoryError):
+        load_excel("tests/data/test_excel_dd.xlsx", reader="csv")
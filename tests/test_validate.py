@@ -0,0 +1,51 @@
+import os
+import sys
+from itertools import compress
+from openpyxl import load_workbook
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.cli import main
+from bsddconverter.loader import load_sheets
+from bsddconverter.validate import check_references, dictionary_uris, format_problems, read_keys
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+
+
+def test_key_columns_match_the_loader():
+    sheets = load_sheets(TEST_EXCEL)
+    for key, (sheet_name, numbers, columns) in read_keys(TEST_EXCEL).items():
+        loaded = sheets[key]
+        keep = [any(value is not None for value in row) for row in zip(*loaded.values())]
+        assert len(numbers) == sum(keep)
+        for name, values in columns.items():
+            assert values == list(compress(loaded[name], keep)), (key, name)
+
+
+def _set(worksheet, row, column_name, value):
+    header = [cell.value for cell in worksheet[7]]
+    worksheet.cell(row=row, column=header.index(column_name) + 1).value = value
+
+
+def test_broken_references_are_all_reported(tmp_path):
+    uri = dictionary_uris(read_keys(TEST_EXCEL)['dictionary'][2])[0]
+    workbook = load_workbook(TEST_EXCEL)
+    workbook["ClassProperty"].insert_rows(9)
+    _set(workbook["ClassProperty"], 10, "PropertyCode", "nope")
+    _set(workbook["Class"], 9, "ParentClassCode", "MISSING")
+    _set(workbook["ClassRelation"], 9, "RelatedClassUri", f"{uri}/class/GHOST")
+    _set(workbook["AllowedValue"], 8, "(Origin Property Code)", "ghost")
+    _set(workbook["PropertyRelation"], 8, "(Origin Property Code)", None)
+    excel_path = str(tmp_path / "broken.xlsx")
+    workbook.save(excel_path)
+
+    problems = check_references(excel_path)
+    assert [(problem["sheet"], problem["row"], problem["column"], problem["value"]) for problem in problems] == [
+        ("Class", 9, "ParentClassCode", "MISSING"),
+        ("ClassProperty", 10, "PropertyCode", "nope"),
+        ("ClassRelation", 9, "RelatedClassUri", f"{uri}/class/GHOST"),
+        ("AllowedValue", 8, "(Origin Property Code)", "ghost"),
+        ("PropertyRelation", 8, "(Origin Property Code)", None),
+    ]
+    assert "ClassProperty row 10, PropertyCode 'nope': no Property with this Code" in format_problems(problems)
+
+    assert main(["validate", excel_path]) == 1
+    assert main(["validate", TEST_EXCEL]) == 0
@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from bsddconverter.mapper import load_excel, excel2bsdd, clean_nones, convert_to_file, run_excel2bsdd_conversion
+from bsddconverter.writer import iter_document, ndjson_index_path, resolve_serializer, write_shards, SERIALIZERS
+
+TEST_EXCEL = "tests/data/test_excel_dd.xlsx"
+TEST_TEMPLATE = "tests/data/bsdd-import-model.json"
+
+DOCUMENTS = [
+    {},
+    {"Classes": []},
+    {"Classes": [None, "", []]},
+    {"Classes": [{"Code": None, "Units": [None]}], "Name": "", "Number": 0, "Nested": {"List": []}, "Text": "ü\n"},
+]
+
+
+@pytest.mark.parametrize("remove_nulls", [False, True])
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_streamed_text_matches_json_dump(document, remove_nulls):
+    fields = [(key, iter(value) if isinstance(value, list) else value) for key, value in document.items()]
+    expected = clean_nones(document) if remove_nulls else document
+    text = b"".join(iter_document(fields, remove_nulls, serializer="json")).decode("utf-8")
+    assert text == json.dumps(expected, ensure_ascii=False, indent=2)
+
+
+@pytest.mark.parametrize("remove_nulls", [False, True])
+def test_streamed_conversion_matches_tree(tmp_path, remove_nulls):
+    with open(TEST_TEMPLATE, encoding="utf-8") as f:
+        template = json.load(f)
+    result = excel2bsdd(load_excel(TEST_EXCEL), template)
+    if remove_nulls:
+        result = clean_nones(result)
+
+    output = tmp_path / "streamed.json"
+    convert_to_file(TEST_EXCEL, template, str(output), remove_nulls=remove_nulls, serializer="json")
+    assert output.read_text(encoding="utf-8") == json.dumps(result, ensure_ascii=False, indent=2)
+
+
+def _installed(module):
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("serializer", [name for name in SERIALIZERS if name in ("auto", "json") or _installed(name)])
+def test_serializers_write_the_same_document(tmp_path, serializer, compact):
+    reference = tmp_path / "reference.json"
+    output = tmp_path / "output.json"
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(reference), serializer="json")
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(output), serializer=serializer, compact=compact)
+
+    with open(reference, encoding="utf-8") as f, open(output, encoding="utf-8") as g:
+        assert json.load(g) == json.load(f)
+    if compact:
+        assert b"\n" not in output.read_bytes()
+
+
+def test_unknown_serializer_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_serializer("yaml")
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_shards_hold_the_whole_document(tmp_path, compact):
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(tmp_path / "full.json"), serializer="json", cache=False)
+    with open(tmp_path / "full.json", encoding="utf-8") as f:
+        full = json.load(f)
+
+    part_counts = []
+    for limits in ({"shard_bytes": 20000}, {"shard_size": 7}):
+        manifest_path = str(tmp_path / "shards" / "data.json")
+        run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, manifest_path, serializer="json", compact=compact, cache=False, output_format="shards", **limits)
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        assert (manifest["Classes"], manifest["Properties"]) == (len(full["Classes"]), len(full["Properties"]))
+
+        joined = {"Classes": [], "Properties": []}
+        for part in manifest["Parts"]:
+            path = tmp_path / "shards" / part["File"]
+            assert os.path.getsize(path) == part["Bytes"]
+            # Only an element larger than the budget gets a larger part
+            assert part["Bytes"] <= limits.get("shard_bytes", part["Bytes"]) or part["Classes"] + part["Properties"] == 1
+            assert part["Classes"] + part["Properties"] <= limits.get("shard_size", 10 ** 6)
+            with open(path, encoding="utf-8") as f:
+                document = json.load(f)
+            assert {key: value for key, value in document.items() if key not in joined} == {key: value for key, value in full.items() if key not in joined}
+            for key in joined:
+                joined[key] += document[key]
+        assert joined == {key: full[key] for key in joined}
+        part_counts.append(len(manifest["Parts"]))
+    # Parts of the earlier, longer run are removed
+    assert part_counts[0] > part_counts[1]
+    assert sorted(os.listdir(tmp_path / "shards")) == sorted(["data.json"] + [part["File"] for part in manifest["Parts"]])
+
+
+def test_shards_of_an_empty_list_and_oversized_elements(tmp_path):
+    manifest_path = str(tmp_path / "data.json")
+    paths = write_shards([("Name", "x"), ("Classes", iter([{"Code": "A" * 100}, {"Code": "B"}]))], manifest_path, shard_bytes=50)
+    assert [json.load(open(path, encoding="utf-8"))["Classes"] for path in paths] == [[{"Code": "A" * 100}], [{"Code": "B"}]]
+
+    paths = write_shards([("Name", "x"), ("Classes", iter([]))], manifest_path, shard_size=3)
+    assert [json.load(open(path, encoding="utf-8")) for path in paths] == [{"Name": "x", "Classes": []}]
+
+
+@pytest.mark.parametrize("remove_nulls", [False, True])
+def test_ndjson_index_points_at_every_line(tmp_path, remove_nulls):
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(tmp_path / "full.json"), remove_nulls=remove_nulls, cache=False)
+    with open(tmp_path / "full.json", encoding="utf-8") as f:
+        full = json.load(f)
+
+    output_path = str(tmp_path / "data.ndjson")
+    run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, output_path, remove_nulls=remove_nulls, cache=False, output_format="ndjson")
+    with open(ndjson_index_path(output_path), encoding="utf-8") as f:
+        index = json.load(f)
+    with open(output_path, "rb") as f:
+        data = f.read()
+    assert data.count(b"\n") == 1 + len(full["Classes"]) + len(full["Properties"])
+
+    def read(offset, length):
+        return json.loads(data[offset:offset + length])
+
+    header = read(*index["Header"])
+    assert header == {key: value for key, value in full.items() if key not in ("Classes", "Properties")}
+    for key in ("Classes", "Properties"):
+        assert len(index[key]) == len(full[key])
+        for item in full[key]:
+            assert read(*index[key][item["Code"]]) == item
+
+
+def test_sharded_change_sets_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(tmp_path / "out.json"), output_format="shards")
+    with pytest.raises(ValueError):
+        run_excel2bsdd_conversion(TEST_EXCEL, TEST_TEMPLATE, str(tmp_path / "out.json"), output_format="ndjson", previous_path=TEST_TEMPLATE)